@@ -0,0 +1,119 @@
+import numpy as np
+
+# ---------------------------------------------------------
+# APPROXIMATE NEAREST NEIGHBOURS (Candidate generation)
+# ---------------------------------------------------------
+# IVF-style clustered index over the L2-normalized feature rows:
+#   - spherical k-means splits the catalog into `n_lists` clusters,
+#   - a query only looks at the members of its `n_probe` closest clusters,
+#   - the best `n_candidates` of those (by cosine) go to the exact hybrid re-rank.
+# Recall against brute force is measured at build time and n_probe can be
+# raised automatically until a target recall is reached.
+
+
+class ClusteredIndex:
+    def __init__(self, vectors, n_lists=None, n_probe=8, n_candidates=300, n_iter=10, seed=0):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = len(self.vectors)
+        self.n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        self.n_probe = max(1, min(self.n_lists, n_probe))
+        self.n_candidates = n_candidates
+        self.recall = None
+        self._fit(n_iter, seed)
+
+    @classmethod
+    def from_arrays(cls, vectors, centroids, order, offsets, n_probe, n_candidates, recall=None):
+        """Rebuilds a fitted index from saved arrays (see artifacts.py) without re-clustering."""
+        index = cls.__new__(cls)
+        index.vectors = vectors
+        index.centroids = centroids
+        index.order = order
+        index.offsets = offsets
+        index.n_lists = len(centroids)
+        index.n_probe = n_probe
+        index.n_candidates = n_candidates
+        index.recall = recall
+        return index
+
+    def _fit(self, n_iter, seed):
+        rng = np.random.default_rng(seed)
+        n = len(self.vectors)
+        centroids = self.vectors[rng.choice(n, self.n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assign = (self.vectors @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, self.vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Empty clusters keep their previous centroid
+            centroids = np.where(empty[:, None], centroids, sums / np.where(norms > 0, norms, 1))
+
+        assign = (self.vectors @ centroids.T).argmax(axis=1)
+        self.centroids = centroids
+        # Inverted lists in CSR form: members of list c are order[offsets[c]:offsets[c + 1]]
+        self.order = np.argsort(assign, kind="stable").astype(np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=self.n_lists))]).astype(np.int64)
+
+    def assign(self, row, vector):
+        """
+        A copy of the index with one normalized vector added (row == N) or replaced, filed
+        under its closest list. Centroids stay fixed, so this is O(N) array work instead of re-clustering.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        vectors = np.array(self.vectors)
+        if row == len(vectors):
+            vectors = np.vstack([vectors, vector[None, :]])
+        else:
+            vectors[row] = vector
+        lists = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))
+        assign = np.empty(len(vectors), dtype=np.int64)
+        assign[self.order] = lists
+        assign[row] = int((self.centroids @ vector).argmax())
+
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=self.n_lists))]).astype(np.int64)
+        return ClusteredIndex.from_arrays(vectors, self.centroids, order, offsets, self.n_probe, self.n_candidates, self.recall)
+
+    def candidates(self, query, n_candidates=None, n_probe=None):
+        """Row positions (ascending) of the approximate nearest neighbours of one normalized query vector."""
+        n_candidates = n_candidates or self.n_candidates
+        n_probe = min(self.n_lists, n_probe or self.n_probe)
+        query = np.asarray(query, dtype=np.float32)
+
+        list_scores = self.centroids @ query
+        probe = np.argpartition(-list_scores, n_probe - 1)[:n_probe] if n_probe < self.n_lists else np.arange(self.n_lists)
+        members = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+
+        if len(members) > n_candidates:
+            sims = self.vectors[members] @ query
+            members = members[np.argpartition(-sims, n_candidates - 1)[:n_candidates]]
+        return np.sort(members)
+
+    def measure_recall(self, k=10, n_queries=200, seed=0):
+        """Mean fraction of the brute-force cosine top-k that candidates() returns, over sampled queries."""
+        n = len(self.vectors)
+        if n == 0:
+            return 1.0
+        rng = np.random.default_rng(seed)
+        queries = self.vectors[rng.choice(n, min(n_queries, n), replace=False)]
+        # Perturb catalog rows so queries look like (averaged) user profiles rather than exact items
+        queries = np.abs(queries + rng.normal(0, 0.1, queries.shape).astype(np.float32))
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        k = min(k, n)
+        hits = []
+        for q in queries:
+            sims = self.vectors @ q
+            exact = np.argpartition(-sims, k - 1)[:k]
+            hits.append(np.isin(exact, self.candidates(q)).mean())
+        self.recall = float(np.mean(hits))
+        return self.recall
+
+    def tune(self, target_recall, k=10):
+        """Doubles n_probe until measured recall@k reaches target_recall (or every list is probed)."""
+        recall = self.measure_recall(k)
+        while recall < target_recall and self.n_probe < self.n_lists:
+            self.n_probe = min(self.n_lists, self.n_probe * 2)
+            recall = self.measure_recall(k)
+        return recall
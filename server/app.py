@@ -1,152 +1,255 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, has_request_context, stream_with_context
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
+import numpy as np
 import os
-import random
+import hmac
+import zlib
+from catalog import GENRE_FEATURE_MAP, attribute_mask, filter_mask, genre_label_mask, lookup, lookup_rows, game_record, feature_profile
+from storage import open_storage
+from engine import RecommenderEngine
+from profiles import ProfileStore
+from cache import ResultCache, SnapshotResponses
+from collab import BackgroundTrainer
+from snapshots import SnapshotManager
+from updates import CatalogUpdater
+from metrics import METRICS
+from auth import AuthBusy, AuthPool
+from listing import float_arg, multi_arg, page, parse_list_query, records
+from export import frame_batches, ndjson, row_slices
 
 app = Flask(__name__)
-CORS(app)
+# Paging headers of the list endpoints (see listing.py) must be readable by the frontend
+CORS(app, expose_headers=["X-Total-Count", "X-Next-Cursor"])
 bcrypt = Bcrypt(app)
+# Request counts / latency histograms per route (METRICS_ENABLED=0 disables), served at /metrics
+METRICS.install(app)
 
 # ---------------------------------------------------------
-# HELPER: Safe CSV Reading (Prevents EmptyDataError)
+# 1. LOAD DATASETS + 2. PRE-COMPUTE MATRICES (see engine.py, snapshots.py)
 # ---------------------------------------------------------
-def safe_read_csv(filepath, default_columns):
-    """
-    Reads a CSV safely. If file is missing OR EMPTY, returns an empty DataFrame with default_columns.
-    """
-    if not os.path.exists(filepath):
-        return pd.DataFrame(columns=default_columns)
-    
-    try:
-        # Check if file is empty (0 bytes)
-        if os.path.getsize(filepath) == 0:
-             return pd.DataFrame(columns=default_columns)
-             
-        return pd.read_csv(filepath)
-    except pd.errors.EmptyDataError:
-        return pd.DataFrame(columns=default_columns)
-    except Exception as e:
-        print(f"Warning: Could not read {filepath}: {e}")
-        return pd.DataFrame(columns=default_columns)
-
-# ---------------------------------------------------------
-# 1. LOAD DATASETS
-# ---------------------------------------------------------
-def load_data():
-    """Helper to load data with safe fallbacks"""
-    data = {}
-    try:
-        # Core Data
-        data["games"] = pd.read_csv("dataset/games.csv")
-        data["features"] = pd.read_csv("dataset/game_features.csv")
-        data["text"] = pd.read_csv("dataset/game_text.csv")
-        data["metadata"] = pd.read_csv("dataset/game_metadata.csv")
-        
-        # User Interactions
-        if os.path.exists("dataset/user_interactions.csv"):
-            data["interactions"] = pd.read_csv("dataset/user_interactions.csv")
-        elif os.path.exists("dataset/ratings.csv"):
-            # Fallback for older dataset versions
-            df = pd.read_csv("dataset/ratings.csv")
-            df["playtime"] = 0
-            data["interactions"] = df
-        else:
-             data["interactions"] = pd.DataFrame(columns=["user_id", "game_id", "rating", "playtime"])
-
-        # Accounts
-        if os.path.exists("dataset/users_accounts.csv"):
-            data["accounts"] = pd.read_csv("dataset/users_accounts.csv")
-        else:
-            data["accounts"] = pd.DataFrame(columns=["username", "password_hash"])
-
-        # User Preferences (Saved Survey Answers)
-        if os.path.exists("dataset/users.csv"):
-            data["users"] = pd.read_csv("dataset/users.csv")
-        else:
-            cols = ["user_id"] + list(data["features"].columns.drop("game_id", errors='ignore'))
-            data["users"] = pd.DataFrame(columns=cols)
-
-    except Exception as e:
-        print(f"CRITICAL DATA LOAD ERROR: {e}")
-        # Initialize empties to prevent crash
-        data["games"] = pd.DataFrame(columns=["game_id", "title"])
-        data["features"] = pd.DataFrame()
-        data["text"] = pd.DataFrame()
-        data["metadata"] = pd.DataFrame()
-        data["interactions"] = pd.DataFrame(columns=["user_id", "game_id", "rating", "playtime"])
-        data["accounts"] = pd.DataFrame(columns=["username", "password_hash"])
-        data["users"] = pd.DataFrame(columns=["user_id"])
-    
-    return data
-
-DB = load_data()
-
-# ---------------------------------------------------------
-# 2. PRE-COMPUTE MATRICES
-# ---------------------------------------------------------
-def compute_matrices(db):
-    matrices = {}
-    
-    # Feature Matrix
-    if not db["features"].empty:
-        feat_mat = db["features"].set_index("game_id").sort_index()
-        matrices["feature_matrix"] = feat_mat
-        matrices["content_sim"] = pd.DataFrame(
-            cosine_similarity(feat_mat), index=feat_mat.index, columns=feat_mat.index
-        )
-    
-    # Text Matrix
-    if not db["text"].empty:
-        tfidf = TfidfVectorizer(stop_words='english')
-        text_sorted = db["text"].set_index("game_id").reindex(db["features"].set_index("game_id").index).fillna('')
-        tfidf_matrix = tfidf.fit_transform(text_sorted['description'])
-        matrices["text_sim"] = pd.DataFrame(
-            cosine_similarity(tfidf_matrix), index=text_sorted.index, columns=text_sorted.index
-        )
-    return matrices
-
-MATRICES = compute_matrices(DB)
+DATASET_DIR = os.environ.get("DATASET_DIR", "dataset")
+
+# User-owned tables (ratings, survey answers, library, accounts) live behind a
+# storage backend: CSV by default, SQLite with STORAGE_BACKEND=sqlite. The CSV backend applies
+# rating and library writes in memory and group-commits them to a journal (see journal.py).
+STORE = open_storage(DATASET_DIR)
+
+# The web app builds everything up front; offline jobs use RecommenderEngine directly
+INITIAL_ENGINE = RecommenderEngine(DATASET_DIR, store=STORE, lazy_collab=False).load()
+
+# Per-user profiles (liked-feature sums, ratings, survey filters), kept in sync by the write routes
+PROFILES = ProfileStore.from_tables(INITIAL_ENGINE.catalog, INITIAL_ENGINE.interaction_frames(), STORE.all_preferences())
+
+# Finished /recommend responses (RECOMMEND_CACHE_SIZE=0 disables). User entries are keyed by the
+# profile version and dropped on that user's writes; the global popularity signal drifts with
+# everyone's ratings, so it is only as fresh as RECOMMEND_CACHE_TTL (seconds).
+RESULTS = ResultCache(
+    max_entries=int(os.environ.get("RECOMMEND_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("RECOMMEND_CACHE_TTL", 30)),
+)
+
+# Snapshot-only responses (the /games catalog), serialized once per snapshot with a gzip
+# variant and an ETag (see cache.SnapshotResponses)
+PREPARED = SnapshotResponses()
+
+# Tables + matrices + catalog are served from immutable snapshots (see snapshots.py). A new one is
+# built in the background when the catalog CSVs change (polled every SNAPSHOT_POLL_INTERVAL seconds,
+# 0 disables) or on POST /admin/reload, and swapped in atomically; every swap drops cached results.
+SNAPSHOTS = SnapshotManager(
+    lambda: RecommenderEngine(DATASET_DIR, store=STORE, lazy_collab=False).load(aggregates=False),
+    DATASET_DIR,
+    initial=INITIAL_ENGINE,
+    profiles=PROFILES,
+    interval=float(os.environ.get("SNAPSHOT_POLL_INTERVAL", 5)),
+    on_swap=lambda engine: RESULTS.clear(),
+).start()
+
+# Matrix-factorization model: the first one trains on a background thread at startup (scoring
+# uses popularity until it is swapped in); /rate etc. fold the user in immediately; a full
+# retrain runs every COLLAB_RETRAIN_INTERVAL seconds (0 disables).
+COLLAB_TRAINER = BackgroundTrainer(
+    lambda: SNAPSHOTS.current.train_collab(), SNAPSHOTS.swap_collab,
+    interval=float(os.environ.get("COLLAB_RETRAIN_INTERVAL", 3600)),
+)
+if INITIAL_ENGINE.collab_settings["mode"] != "off":
+    COLLAB_TRAINER.start(immediate=True)
+
+# Runtime catalog edits (/admin/games), each published as a new snapshot
+CATALOG_UPDATER = CatalogUpdater(SNAPSHOTS)
+# bcrypt hashes/checks run on a bounded pool (AUTH_WORKERS at once, AUTH_QUEUE_LIMIT waiting,
+# AUTH_TIMEOUT seconds at most) so a login burst can't take every request thread (see auth.py)
+AUTH_WORKERS = int(os.environ.get("AUTH_WORKERS", 2))
+AUTH = AuthPool(
+    bcrypt,
+    workers=AUTH_WORKERS,
+    queue_limit=int(os.environ.get("AUTH_QUEUE_LIMIT", AUTH_WORKERS)),
+    timeout=float(os.environ.get("AUTH_TIMEOUT", 10)),
+)
+# Admin and /export/* routes require this token in X-Admin-Token. Without one they are
+# refused, unless ADMIN_OPEN=1 explicitly opens them (local development only)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+ADMIN_OPEN = os.environ.get("ADMIN_OPEN", "0").lower() in ("1", "true", "yes")
+# Rows (games / interactions / users) per chunk of the streamed /export/* responses
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 1000))
+# Most requests one /recommend/batch call may carry (larger batches get a 400)
+RECOMMEND_BATCH_LIMIT = int(os.environ.get("RECOMMEND_BATCH_LIMIT", 1000))
+# Mixed into the per-survey sampling seed (change it to draw different seed games)
+SURVEY_SEED = os.environ.get("SURVEY_SEED", "0")
+
+@app.before_request
+def bind_snapshot():
+    # The whole request sees one snapshot, even if a reload swaps in a new one meanwhile
+    g.engine = SNAPSHOTS.current
+
+def snapshot():
+    """The engine snapshot this request started with (the current one outside a request)."""
+    if has_request_context() and "engine" in g:
+        return g.engine
+    return SNAPSHOTS.current
 
 # ---------------------------------------------------------
 # 3. LOGIC
 # ---------------------------------------------------------
-def get_hybrid_scores(prefs, alpha=0.4, beta=0.4, gamma=0.2):
-    if "feature_matrix" not in MATRICES: return pd.Series()
-    feat_mat = MATRICES["feature_matrix"]
-    
-    # User Profile
-    user_profile = [float(prefs.get(col, 0)) for col in feat_mat.columns]
-    content_scores = cosine_similarity([user_profile], feat_mat)[0]
-    content_series = pd.Series(content_scores, index=feat_mat.index)
-
-    # Collaborative
-    collab_series = pd.Series(0, index=feat_mat.index)
-    if not DB["interactions"].empty:
-        avg = DB["interactions"].groupby("game_id")["rating"].mean()
-        if avg.max() > 0: avg = avg / 5.0
-        collab_series = avg.reindex(feat_mat.index).fillna(0)
-
-    # Text
-    text_series = pd.Series(0, index=feat_mat.index)
-    if "text_sim" in MATRICES:
-        best_id = content_series.idxmax()
-        if best_id in MATRICES["text_sim"].index:
-            text_series = MATRICES["text_sim"][best_id]
-
-    final_scores = (alpha * content_series) + (beta * collab_series) + (gamma * text_series)
-    
-    # Normalize
-    if final_scores.max() != final_scores.min():
-        final_scores = (final_scores - final_scores.min()) / (final_scores.max() - final_scores.min())
-    
-    # Round to stabilize sorting
-    final_scores = final_scores.round(6)
+def build_request_profile(user_id=None, genres=None, platforms=None, modes=None):
+    """
+    Profile vector + active filters for one recommendation request.
+    Logged-in users are profiled from their liked games and saved survey filters;
+    guests (or users without history) from the genres they picked.
+    """
+    guest_genres = genres or []
+    profile = {
+        "user_id": user_id,
+        "prefs": {},
+        "ratings": {},  # game_id -> explicit rating (None for survey seeds)
+        "has_history": False,
+        "version": 0,
+        # Active Filters
+        "genres": guest_genres,
+        "platforms": platforms or [],
+        "modes": modes or [],
+        "cold_start": False,
+    }
+
+    # --- CASE A: LOGGED IN USER ---
+    if user_id:
+        # 1. History + liked-feature profile + saved filters, all from the in-memory profile store
+        user_profile = PROFILES.snapshot(user_id)
+        if user_profile is not None:
+            profile["version"] = user_profile["version"]
+            if user_profile["has_history"]:
+                profile["has_history"] = True
+                profile["ratings"] = user_profile["ratings"]
+                profile["prefs"] = user_profile["prefs"]
+
+            # 2. Filters from Preferences
+            filters = user_profile["filters"]
+            if filters["genres"]: profile["genres"] = filters["genres"]
+            if filters["platforms"]: profile["platforms"] = filters["platforms"]
+            if filters["modes"]: profile["modes"] = filters["modes"]
+
+    # --- CASE B: GUEST PROFILE BUILDING ---
+    if not profile["has_history"] and guest_genres:
+        for g in guest_genres:
+            feat = GENRE_FEATURE_MAP.get(g)
+            if feat: profile["prefs"][feat] = 1.0 
+
+    if user_id and not profile["has_history"] and not guest_genres:
+        profile["cold_start"] = True
+
+    return profile
+
+def profile_mask(profile, exclude_rated=False):
+    """Genre / platform / mode filters of a profile as one boolean mask over the catalog."""
+    exclude_ids = None
+    if exclude_rated and profile["has_history"]:
+        exclude_ids = list(profile["ratings"])
+    return filter_mask(snapshot().catalog, profile["genres"], profile["platforms"], profile["modes"], exclude_ids=exclude_ids)
+
+def build_recommendations(scores, profile):
+    """Response entries (details, explanation, the user's own rating) for a top-k score Series."""
+    return attach_ratings(recommendation_details(scores, profile), profile)
+
+def recommendation_details(scores, profile):
+    """Catalog details + explanation for each game of a top-k score Series (rating left as None)."""
+    prefs = profile["prefs"]
+    recommended_games = []
+    catalog = snapshot().catalog
+    feature_list = catalog["feature_cols"]
+    feat_index = {f: i for i, f in enumerate(feature_list)}
+
+    for game_id in scores.index:
+        row = lookup(catalog, game_id)
+        game_feats = catalog["features"][row]
+
+        explanations = []
+        for feat in feature_list:
+            if feat in prefs and prefs[feat] >= 0.5 and game_feats[feat_index[feat]] >= 1:
+                explanations.append(feat.replace("_", " ").title())
         
-    return final_scores.sort_values(ascending=False).head(10)
+        expl_text = f"Because you like {', '.join(explanations[:3])} games." if explanations else "Recommended based on your choices."
+
+        recommended_games.append({
+            "game_id": int(game_id),
+            "title": catalog["titles"][row],
+            "score": float(scores[game_id]),
+            "image": catalog["images"][row],
+            "description": catalog["descriptions"][row],
+            "explanation": expl_text,
+            "rating": None 
+        })
+
+    return recommended_games
+
+def attach_ratings(recommended_games, profile):
+    """Fills in the user's own explicit rating of each recommended game."""
+    if profile["user_id"] and profile["has_history"]:
+        for rec in recommended_games:
+            rating = profile["ratings"].get(rec["game_id"])
+            if rating is not None:
+                rec["rating"] = int(rating)
+
+    return recommended_games
+
+def recommend_cache_key(user_id, genres, platforms, modes, exclude_rated):
+    """Normalized /recommend request: filter order and duplicates don't change the result."""
+    norm = lambda values: tuple(sorted({str(v) for v in values or []}))
+    version = PROFILES.version(user_id) if user_id else 0
+    if not isinstance(user_id, (str, int, type(None))): user_id = str(user_id)
+    return (user_id, version, norm(genres), norm(platforms), norm(modes), bool(exclude_rated))
+
+def invalidate_user_results(*frames, user_id=None):
+    """Drops cached results of every user appearing in the given interaction frames (and user_id)."""
+    users = {str(user_id)} if user_id is not None else set()
+    for frame in frames:
+        if frame is not None and "user_id" in frame.columns:
+            users.update(frame["user_id"].astype(str))
+    for uid in users:
+        RESULTS.invalidate(uid)
+
+def apply_interaction_changes(removed=None, added=None):
+    """
+    Syncs the in-memory aggregates and user profiles with rows removed from / added to
+    user_interactions.csv. Only the changed rows are touched, so each write costs O(rows changed).
+    """
+    # Always the live snapshot (not the request's): a swap can't happen in between
+    with SNAPSHOTS.write_lock:
+        engine = SNAPSHOTS.current
+        if removed is not None:
+            for gid, rating in zip(removed["game_id"], removed["rating"]):
+                engine.popularity.remove(gid, rating)
+        if added is not None:
+            for gid, rating in zip(added["game_id"], added["rating"]):
+                engine.popularity.add(gid, rating)
+        PROFILES.apply(removed=removed, added=added)
+        # Recorded first (also while the first model trains), so a training run finishing in
+        # between still sees the change (apply() is idempotent). record() only takes the
+        # trainer's lock, which is never held while waiting for write_lock (see snapshots.py)
+        COLLAB_TRAINER.record(removed=removed, added=added)
+        if engine.collab is not None:
+            engine.collab.apply(removed=removed, added=added)
+    invalidate_user_results(removed, added)
 
 # ---------------------------------------------------------
 # 4. ROUTES
@@ -154,155 +257,111 @@ def get_hybrid_scores(prefs, alpha=0.4, beta=0.4, gamma=0.2):
 
 @app.route("/user/has_preferences/<user_id>", methods=["GET"])
 def check_preferences(user_id):
-    if DB["users"].empty: return jsonify({"has_preferences": False})
-    exists = str(user_id) in DB["users"]["user_id"].astype(str).values
-    return jsonify({"has_preferences": bool(exists)})
+    return jsonify({"has_preferences": STORE.has_profile(user_id)})
 
 @app.route("/recommend", methods=["POST"])
 def recommend():
     try:
         data = request.json
         user_id = data.get("user_id")
-        
-        # Guest Data
-        guest_genres = data.get("genres", [])
-        guest_platforms = data.get("platforms", [])
-        guest_modes = data.get("modes", [])
+        genres, platforms, modes = data.get("genres", []), data.get("platforms", []), data.get("modes", [])
+        exclude_rated = data.get("exclude_rated", False)
+
+        def compute():
+            with METRICS.stage("/recommend", "profile"):
+                profile = build_request_profile(user_id, genres, platforms, modes)
+            if profile["cold_start"]:
+                return {"user": user_id, "recommendations": [], "status": "cold_start"}
+
+            # --- FILTERS (Genre / Platform / Mode) ---
+            # One boolean mask over the whole catalog; top-K then runs over eligible games only,
+            # so narrow filters still get a full page of results.
+            with METRICS.stage("/recommend", "filter"):
+                mask = profile_mask(profile, exclude_rated=exclude_rated)
+
+            # --- RUN ALGORITHM ---
+            with METRICS.stage("/recommend", "score"):
+                scores = snapshot().get_hybrid_scores(profile["prefs"], mask=mask, user_id=user_id)
+            with METRICS.stage("/recommend", "details"):
+                recommended_games = recommendation_details(scores, profile)
+            with METRICS.stage("/recommend", "ratings"):
+                attach_ratings(recommended_games, profile)
+
+            return {"user": user_id, "recommendations": recommended_games, "status": "success"}
+
+        # Identical requests (same filters, or same user at the same profile version) share one result
+        key = recommend_cache_key(user_id, genres, platforms, modes, exclude_rated)
+        result = RESULTS.get_or_compute(key, compute, tag=str(user_id) if user_id else None)
+        with METRICS.stage("/recommend", "serialize"):
+            return jsonify(result)
 
-        prefs = {}
-        has_history = False
-        
-        # Active Filters
-        filter_genres = guest_genres
-        filter_platforms = guest_platforms
-        filter_modes = guest_modes
-
-        # --- CASE A: LOGGED IN USER ---
-        if user_id:
-            # 1. Load History SAFELY
-            interactions = safe_read_csv("dataset/user_interactions.csv", ["user_id", "game_id", "rating", "implicit"])
-            
-            user_history = interactions[interactions["user_id"].astype(str) == str(user_id)]
-            if not user_history.empty:
-                has_history = True
-                liked_game_ids = user_history[user_history["rating"] >= 4]["game_id"].tolist()
-                if liked_game_ids and not DB["features"].empty:
-                    liked_features = DB["features"][DB["features"]["game_id"].isin(liked_game_ids)]
-                    numeric_cols = liked_features.drop(columns=["game_id"], errors="ignore")
-                    prefs = numeric_cols.mean().to_dict()
-
-            # 2. Load Filters from Preferences SAFELY
-            prefs_df = safe_read_csv("dataset/user_preferences.csv", ["user_id", "genres", "platforms", "modes"])
-            
-            user_pref = prefs_df[prefs_df["user_id"].astype(str) == str(user_id)]
-            if not user_pref.empty:
-                # Parse CSV strings back to lists
-                g_str = str(user_pref.iloc[0]['genres'])
-                p_str = str(user_pref.iloc[0]['platforms'])
-                m_str = str(user_pref.iloc[0]['modes'])
-                
-                if g_str and g_str != "nan": filter_genres = g_str.split(";")
-                if p_str and p_str != "nan": filter_platforms = p_str.split(";")
-                if m_str and m_str != "nan": filter_modes = m_str.split(";")
-
-        # --- CASE B: GUEST PROFILE BUILDING ---
-        if not has_history and guest_genres:
-            genre_feature_map = {
-                "RPG": "rpg", "Shooter": "shooter", "Survival": "survival",
-                "Action": "competitive", "Adventure": "open_world", "Strategy": "rpg",
-                "Simulation": "casual", "Puzzle": "casual", "Racing": "competitive",
-                "Sports": "competitive", "Horror": "survival", "Stealth": "singleplayer",
-                "Fighting": "competitive", "Platformer": "casual"
-            }
-            for g in guest_genres:
-                feat = genre_feature_map.get(g)
-                if feat: prefs[feat] = 1.0 
-
-        if user_id and not has_history and not guest_genres:
-             return jsonify({"user": user_id, "recommendations": [], "status": "cold_start"})
-
-        # --- RUN ALGORITHM ---
-        scores = get_hybrid_scores(prefs)
-        
-        recommended_games = []
-        feature_list = DB["features"].columns.tolist() if not DB["features"].empty else []
-        
-        genre_feature_map = {
-            "RPG": "rpg", "Shooter": "shooter", "Survival": "survival",
-            "Action": "competitive", "Adventure": "open_world", "Strategy": "rpg",
-            "Simulation": "casual", "Puzzle": "casual", "Racing": "competitive",
-            "Sports": "competitive", "Horror": "survival", "Stealth": "singleplayer",
-            "Fighting": "competitive", "Platformer": "casual"
-        }
+    except Exception as e:
+        print(f"ERROR in /recommend: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-        for game_id in scores.index:
-            game_feats = DB["features"][DB["features"]["game_id"] == game_id]
-            if game_feats.empty: continue
-
-            # --- 1. GENRE FILTER ---
-            if filter_genres:
-                required_feats = [genre_feature_map.get(g) for g in filter_genres if genre_feature_map.get(g)]
-                match_genre = False
-                for f in required_feats:
-                    if f in game_feats.columns and game_feats[f].values[0] >= 1:
-                        match_genre = True
-                        break
-                if not match_genre: continue
-
-            # --- 2. Platform Filter ---
-            if filter_platforms:
-                meta = DB["metadata"][DB["metadata"]["game_id"] == game_id]
-                if meta.empty: continue
-                gp = str(meta.iloc[0]['platform'])
-                if not any(p in gp for p in filter_platforms): continue
-
-            # --- 3. Mode Filter ---
-            if filter_modes:
-                is_single = game_feats.iloc[0].get('singleplayer', 0) >= 1
-                is_multi = game_feats.iloc[0].get('multiplayer', 0) >= 1
-                match = False
-                if "Singleplayer" in filter_modes and is_single: match = True
-                if "Multiplayer" in filter_modes and is_multi: match = True
-                if not match: continue
-
-            # --- Build Response ---
-            core = DB["games"][DB["games"]["game_id"] == game_id]
-            if core.empty: continue
-            meta = DB["metadata"][DB["metadata"]["game_id"] == game_id]
-            txt = DB["text"][DB["text"]["game_id"] == game_id]
-
-            explanations = []
-            for feat in feature_list:
-                if feat in prefs and prefs[feat] >= 0.5 and game_feats[feat].values[0] >= 1:
-                    explanations.append(feat.replace("_", " ").title())
-            
-            expl_text = f"Because you like {', '.join(explanations[:3])} games." if explanations else "Recommended based on your choices."
-
-            recommended_games.append({
-                "game_id": int(game_id),
-                "title": core["title"].values[0],
-                "score": float(scores[game_id]),
-                "image": meta["image_url"].values[0] if not meta.empty else "",
-                "description": txt["description"].values[0] if not txt.empty else "",
-                "explanation": expl_text,
-                "rating": None 
-            })
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    if not METRICS.enabled:
+        return jsonify({"error": "Metrics disabled"}), 404
+    return METRICS.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
-        # Attach Ratings (SAFELY)
-        if user_id and has_history:
-             # Use the interactions dataframe we already safely loaded
-             user_ratings = interactions[interactions["user_id"].astype(str) == str(user_id)]
-             if "implicit" in user_ratings.columns:
-                 user_ratings = user_ratings[user_ratings["implicit"] != True]
-             for rec in recommended_games:
-                r = user_ratings[user_ratings["game_id"] == rec["game_id"]]
-                if not r.empty:
-                    rec["rating"] = int(r["rating"].values[0])
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(RESULTS.stats())
 
-        return jsonify({"user": user_id, "recommendations": recommended_games, "status": "success"})
+# ---------------------------------------------------------
+# NEW: Batch Recommendations (many users, one matrix product)
+# ---------------------------------------------------------
+@app.route("/recommend/batch", methods=["POST"])
+def recommend_batch():
+    """
+    Body: {"requests": [{"user_id": ...} | {"genres": [...], "platforms": [...], "modes": [...]}, ...],
+           "user_ids": [...], "k": 10, "exclude_rated": false}
+    Each request is answered exactly like /recommend would; results come back in the same order.
+    At most RECOMMEND_BATCH_LIMIT requests per call; scoring runs in catalog-sized chunks (see engine.py).
+    """
+    try:
+        data = request.json or {}
+        k = int(data.get("k", 10))
+        exclude_rated = data.get("exclude_rated", False)
+        requests_list = list(data.get("requests", [])) + [{"user_id": uid} for uid in data.get("user_ids", [])]
+
+        if not requests_list:
+            return jsonify({"error": "No requests given"}), 400
+        if len(requests_list) > RECOMMEND_BATCH_LIMIT:
+            return jsonify({"error": f"Too many requests in one batch (limit {RECOMMEND_BATCH_LIMIT})"}), 400
+
+        with METRICS.stage("/recommend/batch", "profile"):
+            profiles = [
+                build_request_profile(r.get("user_id"), r.get("genres", []), r.get("platforms", []), r.get("modes", []))
+                for r in requests_list
+            ]
+            active = [p for p in profiles if not p["cold_start"]]
+            masks = [profile_mask(p, exclude_rated) for p in active]
+
+        # --- RUN ALGORITHM (all active profiles in one pass) ---
+        with METRICS.stage("/recommend/batch", "score"):
+            all_scores = snapshot().get_hybrid_scores_batch(
+                [p["prefs"] for p in active], k=k, masks=masks, user_ids=[p["user_id"] for p in active]
+            )
+        scores_by_profile = {id(p): s for p, s in zip(active, all_scores)}
+
+        with METRICS.stage("/recommend/batch", "details"):
+            results = []
+            for p in profiles:
+                if p["cold_start"]:
+                    results.append({"user": p["user_id"], "recommendations": [], "status": "cold_start"})
+                else:
+                    recs = build_recommendations(scores_by_profile[id(p)], p)
+                    results.append({"user": p["user_id"], "recommendations": recs, "status": "success"})
+
+        with METRICS.stage("/recommend/batch", "serialize"):
+            return jsonify({"results": results, "status": "success"})
 
     except Exception as e:
-        print(f"ERROR in /recommend: {e}")
+        print(f"ERROR in /recommend/batch: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -317,57 +376,107 @@ def rate_game():
     if not all([user_id, game_id, rating]):
         return jsonify({"error": "Missing data"}), 400
 
-    interactions_path = "dataset/user_interactions.csv"
-    if os.path.exists(interactions_path):
-        df = pd.read_csv(interactions_path)
-    else:
-        df = pd.DataFrame(columns=["user_id", "game_id", "rating", "implicit"])
-
-    # Update or Append
-    mask = (df["user_id"].astype(str) == str(user_id)) & (df["game_id"] == game_id)
-    if mask.any():
-        df.loc[mask, "rating"] = rating
-        df.loc[mask, "implicit"] = False # <--- Ensure it becomes visible if I edit it
-    else:
-        new_row = pd.DataFrame([{
-            "user_id": user_id, 
-            "game_id": game_id, 
-            "rating": rating, 
-            "implicit": False # <--- Manual ratings are always visible
-        }])
-        df = pd.concat([df, new_row], ignore_index=True)
-
-    df.to_csv(interactions_path, index=False)
-    DB["interactions"] = df
+    # Update or Append (manual ratings are always visible, so implicit=False)
+    with METRICS.stage("/rate", "store"):
+        removed = STORE.upsert_interaction(user_id, game_id, rating, implicit=False)
+    with METRICS.stage("/rate", "aggregates"):
+        if removed is not None and not removed.empty:
+            # Every replaced row (duplicate (user, game) rows included) now holds the new rating
+            added = removed.assign(rating=rating, implicit=False)
+        else:
+            added = pd.DataFrame([{"user_id": user_id, "game_id": game_id, "rating": rating, "implicit": False}])
+        apply_interaction_changes(removed=removed, added=added)
     
     return jsonify({"message": "Rating saved"})
 
 @app.route("/games")
 def get_games():
-    merged = DB["games"].merge(DB["metadata"], on="game_id", how="left")
-    games_list = merged.to_dict('records')
-
-    genre_cols = ["rpg", "shooter", "survival", "casual", "open_world", "competitive"]
-    
-    for game in games_list:
-        gid = game["game_id"]
-        feats = DB["features"][DB["features"]["game_id"] == gid]
-        
-        if not feats.empty:
-            valid_cols = [c for c in genre_cols if c in feats.columns]
-            if valid_cols:
-                row_values = feats.iloc[0][valid_cols]
-                best_genre = row_values.idxmax()
-                if best_genre == "rpg":
-                    game["genre"] = "RPG"
-                else:
-                    game["genre"] = best_genre.replace("_", " ").title()
-            else:
-                game["genre"] = "Action"
-        else:
-            game["genre"] = "Uncategorized"
-
-    return jsonify(games_list)
+    engine = snapshot()
+    if not request.args:
+        # The full catalog only changes with the snapshot: built + serialized once per snapshot
+        prepared = PREPARED.get(engine, "games", lambda: build_games_body(engine.catalog))
+        return prepared_response(prepared)
+
+    # Paged / filtered / projected listing (see listing.py)
+    catalog = engine.catalog
+    try:
+        query = parse_list_query(request.args, game_fields(catalog))
+        rows = catalog["core_rows"]
+        genres, platforms = multi_arg(request.args, "genre"), multi_arg(request.args, "platform")
+        rows = rows[game_filter(catalog, rows, genres, platforms)]
+        positions, next_cursor = page(catalog["game_ids"][rows], query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with METRICS.stage("/games", "build"):
+        games_list = records(game_columns(catalog, rows[positions]), query["fields"])
+    with METRICS.stage("/games", "serialize"):
+        return list_response(games_list, len(rows), next_cursor)
+
+def game_fields(catalog):
+    return ["game_id", *catalog["core_cols"], *catalog["meta_cols"], "genre"]
+
+def game_columns(catalog, rows):
+    """/games item columns (games.csv + metadata + derived genre) for the given catalog rows."""
+    columns = {"game_id": catalog["game_ids"][rows]}
+    for source in ("core_cols", "meta_cols"):
+        for col, values in catalog[source].items():
+            columns[col] = values[rows]
+    # Genres are derived once in build_catalog(), so this is just array reads
+    columns["genre"] = catalog["genres"][rows]
+    return columns
+
+def build_games_body(catalog):
+    with METRICS.stage("/games", "build"):
+        games_list = records(game_columns(catalog, catalog["core_rows"]))
+    with METRICS.stage("/games", "serialize"):
+        return app.json.dumps(games_list).encode("utf-8")
+
+def list_response(items, total, next_cursor):
+    """JSON list body + paging headers (X-Total-Count, X-Next-Cursor)."""
+    response = jsonify(items)
+    response.headers["X-Total-Count"] = str(total)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
+
+def game_filter(catalog, rows, genres, platforms):
+    """
+    Mask over looked-up catalog rows (-1 = unknown game) for the list endpoints' filters.
+    ?genre= matches the `genre` label /games shows (not the feature-threshold genres /recommend filters on).
+    """
+    if not (genres or platforms):
+        return np.ones(len(rows), dtype=bool)
+    known = np.maximum(rows, 0)
+    mask = rows >= 0
+    if genres: mask &= genre_label_mask(catalog, genres, known)
+    if platforms: mask &= attribute_mask(catalog, platforms=platforms)[known]
+    return mask
+
+def listed_titles_images(catalog, rows):
+    """Title + image columns for looked-up catalog rows (None / placeholder for unknown games)."""
+    known = rows >= 0
+    titles = np.where(known, catalog["titles"][np.maximum(rows, 0)], None)
+    images = np.where(known, catalog["images"][np.maximum(rows, 0)], "")
+    images[(images == "") | pd.isna(images)] = NO_IMAGE
+    return titles, images
+
+def prepared_response(prepared):
+    """JSON response for a PreparedResponse: gzip when accepted, 304 when the client's copy is current."""
+    use_gzip = "gzip" in request.accept_encodings
+    response = Response(prepared.gzipped if use_gzip else prepared.body, mimetype="application/json")
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"  # always revalidate, usually with a 304
+    response.set_etag(prepared.etag + ("-gz" if use_gzip else ""))
+    response.last_modified = prepared.last_modified
+    return response.make_conditional(request)
+
+def auth_busy(e):
+    response = jsonify({"error": str(e)})
+    response.headers["Retry-After"] = "1"
+    return response, 503
 
 @app.route("/register", methods=["POST"])
 def register():
@@ -378,16 +487,13 @@ def register():
     if not username or not password:
         return jsonify({"error": "Required fields missing"}), 400
     
-    try: users = pd.read_csv("dataset/users_accounts.csv")
-    except: users = pd.DataFrame(columns=["username", "password_hash"])
-    
-    if username in users["username"].values: return jsonify({"error": "Username exists"}), 400
+    if STORE.get_password_hash(username) is not None: return jsonify({"error": "Username exists"}), 400
     
-    pw_hash = bcrypt.generate_password_hash(password).decode('utf-8')
-    new_user = pd.DataFrame([{"username": username, "password_hash": pw_hash}])
-    users = pd.concat([users, new_user], ignore_index=True)
-    users.to_csv("dataset/users_accounts.csv", index=False)
-    DB["accounts"] = users
+    try:
+        pw_hash = AUTH.hash(password)
+    except AuthBusy as e:
+        return auth_busy(e)
+    if not STORE.add_account(username, pw_hash): return jsonify({"error": "Username exists"}), 400
     return jsonify({"message": "Success"})
 
 @app.route("/login", methods=["POST"])
@@ -396,12 +502,12 @@ def login():
     username = data.get("username")
     password = data.get("password")
     
-    try: users = pd.read_csv("dataset/users_accounts.csv")
-    except: return jsonify({"error": "No users"}), 401
-    
-    user = users[users["username"] == username]
-    if user.empty or not bcrypt.check_password_hash(user["password_hash"].values[0], password):
-        return jsonify({"error": "Invalid credentials"}), 401
+    pw_hash = STORE.get_password_hash(username)
+    try:
+        if pw_hash is None or not AUTH.check(pw_hash, password):
+            return jsonify({"error": "Invalid credentials"}), 401
+    except AuthBusy as e:
+        return auth_busy(e)
         
     return jsonify({"message": "Login successful", "username": username})
 
@@ -412,93 +518,89 @@ def reset_profile():
     
     if not user_id: return jsonify({"error": "Missing user ID"}), 400
     
-    # 1. Delete from Survey Preferences (users.csv)
-    if os.path.exists("dataset/users.csv"):
-        df = pd.read_csv("dataset/users.csv")
-        # Keep rows that are NOT this user
-        df = df[df["user_id"].astype(str) != str(user_id)]
-        df.to_csv("dataset/users.csv", index=False)
-        DB["users"] = df # Update memory
-
-    # 2. Delete from Ratings History (user_interactions.csv)
-    if os.path.exists("dataset/user_interactions.csv"):
-        df = pd.read_csv("dataset/user_interactions.csv")
-        # Keep rows that are NOT this user
-        df = df[df["user_id"].astype(str) != str(user_id)]
-        df.to_csv("dataset/user_interactions.csv", index=False)
-        DB["interactions"] = df # Update memory
+    # Delete the survey feature profile (users.csv) and the ratings history
+    removed = STORE.delete_user(user_id)
+    apply_interaction_changes(removed=removed)
 
     return jsonify({"message": "Profile reset successfully"})
 
+HISTORY_FIELDS = ["game_id", "title", "image", "rating"]
+NO_IMAGE = "https://placehold.co/400x225/333/fff?text=No+Image"
+
 @app.route("/user/history/<user_id>")
 def get_user_history(user_id):
-    if "interactions" not in DB or DB["interactions"].empty:
-        return jsonify([])
-    
-    # 1. Get All Interactions
-    df = DB["interactions"]
-    user_df = df[df["user_id"].astype(str) == str(user_id)].copy()
-    
-    # 2. FILTER: Remove 'Implicit' (Survey) ratings
-    if "implicit" in user_df.columns:
+    try:
+        query = parse_list_query(request.args, HISTORY_FIELDS)
+        genres, platforms = multi_arg(request.args, "genre"), multi_arg(request.args, "platform")
+        min_rating, max_rating = float_arg(request.args, "min_rating"), float_arg(request.args, "max_rating")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 1. Get this user's interactions
+    with METRICS.stage("/user/history/<user_id>", "read"):
+        user_df = STORE.user_interactions(user_id)
+
+    # 2. FILTER: Remove 'Implicit' (Survey) ratings + the request's filters, as one mask
+    with METRICS.stage("/user/history/<user_id>", "filter"):
+        catalog = snapshot().catalog
+        game_ids = user_df["game_id"].to_numpy()
+        ratings = pd.to_numeric(user_df["rating"], errors="coerce").to_numpy(dtype=np.float64)
         # Keep rows where implicit is False OR NaN (older rows)
-        user_df = user_df[user_df["implicit"] != True]
-
-    if user_df.empty:
-        return jsonify([])
-
-    # 3. Merge with Metadata for Images/Titles
-    merged = user_df.merge(DB["metadata"], on="game_id", how="left")
-    merged = merged.merge(DB["games"], on="game_id", how="left")
-    
-    # Fill missing images
-    merged["image_url"] = merged["image_url"].fillna("https://placehold.co/400x225/333/fff?text=No+Image")
-    
-    # Format for Frontend
-    history_list = []
-    for _, row in merged.iterrows():
-        history_list.append({
-            "game_id": int(row["game_id"]),
-            "title": row["title"],
-            "image": row["image_url"],
-            "rating": int(row["rating"])
-        })
-        
-    return jsonify(history_list)
+        mask = np.array(user_df["implicit"] != True, dtype=bool) if "implicit" in user_df.columns else np.ones(len(user_df), dtype=bool)
+        if min_rating is not None: mask &= ratings >= min_rating
+        if max_rating is not None: mask &= ratings <= max_rating
+        rows = lookup_rows(catalog, game_ids)
+        mask &= game_filter(catalog, rows, genres, platforms)
+        game_ids, ratings, rows = game_ids[mask], ratings[mask], rows[mask]
+        try:
+            positions, next_cursor = page(game_ids, query)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    # 3. Titles/images from the catalog index, formatted for the frontend
+    with METRICS.stage("/user/history/<user_id>", "format"):
+        titles, images = listed_titles_images(catalog, rows[positions])
+        history_list = records({
+            "game_id": game_ids[positions].astype(np.int64),
+            "title": titles,
+            "image": images,
+            "rating": ratings[positions].astype(np.int64),
+        }, query["fields"])
+
+    with METRICS.stage("/user/history/<user_id>", "serialize"):
+        return list_response(history_list, len(game_ids), next_cursor)
 
 @app.route("/games/similar/<game_id>")
 def get_similar_games(game_id):
-    # 1. Check if matrix exists
-    if "content_sim" not in MATRICES:
+    catalog, matrices = snapshot().catalog, snapshot().matrices
+    # 1. Check if neighbour lists exist
+    if "content_nbrs" not in matrices:
         return jsonify({"error": "Similarity matrix not ready"}), 503
         
     try:
         # 2. Get the row for this game
         # Ensure ID is an integer
         gid = int(game_id)
-        if gid not in MATRICES["content_sim"].index:
+        target_row = lookup(catalog, gid)
+        if target_row is None or not catalog["has_features"][target_row]:
             return jsonify({"error": "Game not found in matrix"}), 404
             
-        # 3. Get similarity scores
-        sim_scores = MATRICES["content_sim"].loc[gid]
-        
-        # 4. Sort by score (descending), drop the game itself (score=1.0)
+        # 3. Neighbour list is already sorted by score (descending) and excludes the game itself
         # We take top 5
-        top_similar = sim_scores.sort_values(ascending=False).drop(gid).head(5)
+        nbrs = matrices["content_nbrs"]
+        top_rows = nbrs["ids"][target_row][:5]
+        top_scores = nbrs["scores"][target_row][:5]
         
-        # 5. Fetch details for these 5 games
+        # 4. Fetch details for these 5 games
         results = []
-        for sim_gid in top_similar.index:
-            core = DB["games"][DB["games"]["game_id"] == sim_gid]
-            if core.empty: continue
-            
-            meta = DB["metadata"][DB["metadata"]["game_id"] == sim_gid]
+        for row, score in zip(top_rows, top_scores):
+            if not catalog["has_core"][row]: continue
             
             results.append({
-                "game_id": int(sim_gid),
-                "title": core["title"].values[0],
-                "score": float(top_similar[sim_gid]), # How similar is it? (0 to 1)
-                "image": meta["image_url"].values[0] if not meta.empty else ""
+                "game_id": int(catalog["game_ids"][row]),
+                "title": catalog["titles"][row],
+                "score": float(score), # How similar is it? (0 to 1)
+                "image": catalog["images"][row]
             })
             
         return jsonify(results)
@@ -506,6 +608,37 @@ def get_similar_games(game_id):
     except ValueError:
         return jsonify({"error": "Invalid game ID"}), 400
 
+@app.route("/search", methods=["GET"])
+def search_games():
+    """
+    Ranked games for ?q= (descriptions via TF-IDF, plus title matches), optionally filtered with
+    ?genre= / ?platform= / ?mode= like /recommend. ?limit= (default 20, at most 100).
+    """
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "Missing q"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    engine = snapshot()
+    catalog = engine.catalog
+    with METRICS.stage("/search", "score"):
+        mask = catalog["has_core"] & attribute_mask(
+            catalog, multi_arg(request.args, "genre"), multi_arg(request.args, "platform"), multi_arg(request.args, "mode")
+        )
+        rows, scores = engine.text_search.search(query, k=limit, mask=mask)
+
+    titles, images = listed_titles_images(catalog, rows)
+    return jsonify(records({
+        "game_id": catalog["game_ids"][rows],
+        "title": titles,
+        "image": images,
+        "genre": catalog["genres"][rows],
+        "score": np.round(scores, 6),
+    }))
+
 @app.route("/rate/delete", methods=["POST"])
 def delete_rating():
     data = request.json
@@ -515,22 +648,50 @@ def delete_rating():
     if not user_id or not game_id:
         return jsonify({"error": "Missing data"}), 400
 
-    # Load fresh data
-    if os.path.exists("dataset/user_interactions.csv"):
-        df = pd.read_csv("dataset/user_interactions.csv")
-        
-        # Create a mask to find the specific row
-        # We ensure types match (str for user_id, int for game_id) just in case
-        mask = (df["user_id"].astype(str) == str(user_id)) & (df["game_id"].astype(str) == str(game_id))
-        
-        # Keep everything that does NOT match the mask
-        df = df[~mask]
-        
-        df.to_csv("dataset/user_interactions.csv", index=False)
-        DB["interactions"] = df # Update memory
+    removed = STORE.delete_interaction(user_id, game_id)
+    apply_interaction_changes(removed=removed)
         
     return jsonify({"message": "Rating removed"})
 
+def survey_seed_games(engine, user_id, genres, platforms, modes, per_genre=3):
+    """
+    Up to `per_genre` random games for each picked genre (games whose description mentions it,
+    topped up with games strong in its feature when fewer than 3 do), restricted to the picked
+    platforms / modes. Games without metadata / features pass those checks, as they always have.
+    Sampling is seeded by the user and their answers (plus SURVEY_SEED), so the same survey
+    always seeds the same games.
+    """
+    catalog, keywords = engine.catalog, engine.keywords
+    feature_cols = catalog["feature_cols"]
+
+    # Platform / mode eligibility for the whole survey, once
+    eligible = np.ones(len(catalog["game_ids"]), dtype=bool)
+    if platforms:
+        eligible &= ~catalog["has_meta"] | attribute_mask(catalog, platforms=platforms)
+    if modes:
+        eligible &= ~catalog["has_features"] | attribute_mask(catalog, modes=modes)
+
+    key = "|".join([str(user_id), ";".join(genres), ";".join(platforms), ";".join(modes), SURVEY_SEED])
+    rng = np.random.default_rng(zlib.crc32(key.encode("utf-8")))
+
+    seeded = []
+    for genre in genres:
+        # Text Search (inverted index)
+        found = keywords.mask(genre)
+        # Feature Fallback
+        if found.sum() < 3:
+            feature_col = GENRE_FEATURE_MAP.get(genre)
+            if feature_col in feature_cols:
+                found |= catalog["has_features"] & (catalog["features"][:, feature_cols.index(feature_col)] >= 4)
+
+        candidates = np.flatnonzero(found & eligible)
+        if len(candidates):
+            picked = rng.choice(candidates, size=min(len(candidates), per_genre), replace=False)
+            for gid in catalog["game_ids"][picked].tolist():
+                # A game can match several genres; seed it once (SQLite keys on user+game anyway)
+                if gid not in seeded: seeded.append(gid)
+    return seeded
+
 @app.route("/survey", methods=["POST"])
 def save_survey():
     try:
@@ -544,107 +705,25 @@ def save_survey():
             return jsonify({"error": "Missing user_id"}), 400
 
         # 1. SAVE ALL PREFERENCES (Genres, Platform, Mode)
-        prefs_path = "dataset/user_preferences.csv"
-        if os.path.exists(prefs_path):
-            prefs_df = pd.read_csv(prefs_path)
-        else:
-            # Added 'genres' column
-            prefs_df = pd.DataFrame(columns=["user_id", "genres", "platforms", "modes"])
-        
-        # Remove old prefs
-        prefs_df = prefs_df[prefs_df["user_id"].astype(str) != str(user_id)]
-        
-        # Add new prefs
-        new_pref = {
-            "user_id": user_id,
+        saved = {
             "genres": ";".join(genres_selected),       # Save as "RPG;Action"
-            "platforms": ";".join(platforms_selected), 
-            "modes": ";".join(modes_selected)          
+            "platforms": ";".join(platforms_selected),
+            "modes": ";".join(modes_selected),
         }
-        prefs_df = pd.concat([prefs_df, pd.DataFrame([new_pref])], ignore_index=True)
-        prefs_df.to_csv(prefs_path, index=False)
-        DB["preferences"] = prefs_df 
+        STORE.set_preferences(user_id, **saved)
+        PROFILES.set_filters(user_id, **saved)
+        invalidate_user_results(user_id=user_id)
 
         # 2. GENERATE SEED RATINGS (Implicit Likes)
-        features_df = pd.read_csv("dataset/game_features.csv")
-        text_df = pd.read_csv("dataset/game_text.csv")
-        metadata_df = pd.read_csv("dataset/game_metadata.csv")
-
-        genre_feature_map = {
-            "RPG": "rpg", "Shooter": "shooter", "Survival": "survival",
-            "Action": "competitive", "Adventure": "open_world", "Strategy": "rpg",
-            "Simulation": "casual", "Puzzle": "casual", "Racing": "competitive",
-            "Sports": "competitive", "Horror": "survival", "Stealth": "singleplayer",
-            "Fighting": "competitive", "Platformer": "casual"
-        }
-
-        interactions_path = "dataset/user_interactions.csv"
-        if os.path.exists(interactions_path):
-            interactions_df = pd.read_csv(interactions_path)
-        else:
-            interactions_df = pd.DataFrame(columns=["user_id", "game_id", "rating", "implicit"])
-
-        interactions_df = interactions_df[interactions_df["user_id"].astype(str) != str(user_id)]
-
-        new_rows = []
-        
-        for genre in genres_selected:
-            found_games = pd.DataFrame()
-            
-            # Text Search
-            text_matches = text_df[text_df['description'].str.contains(genre, case=False, na=False)]
-            if not text_matches.empty:
-                found_games = text_matches
-            
-            # Feature Fallback
-            if len(found_games) < 3:
-                feature_col = genre_feature_map.get(genre)
-                if feature_col and feature_col in features_df.columns:
-                    feature_matches = features_df[features_df[feature_col] >= 4]
-                    found_games = pd.concat([found_games, feature_matches]).drop_duplicates(subset='game_id')
-
-            # --- APPLY FILTERS TO SEED GAMES TOO ---
-            valid_games = []
-            if not found_games.empty:
-                for _, game in found_games.iterrows():
-                    gid = game['game_id']
-                    
-                    # Platform Check
-                    if platforms_selected:
-                        meta = metadata_df[metadata_df['game_id'] == gid]
-                        if not meta.empty:
-                            gp = str(meta.iloc[0]['platform'])
-                            if not any(p in gp for p in platforms_selected): continue 
-
-                    # Mode Check
-                    if modes_selected:
-                        feats = features_df[features_df['game_id'] == gid]
-                        if not feats.empty:
-                            is_single = feats.iloc[0].get('singleplayer', 0) >= 1
-                            is_multi = feats.iloc[0].get('multiplayer', 0) >= 1
-                            match = False
-                            if "Singleplayer" in modes_selected and is_single: match = True
-                            if "Multiplayer" in modes_selected and is_multi: match = True
-                            if not match: continue
-
-                    valid_games.append(game)
-
-            if valid_games:
-                import random
-                selected = random.sample(valid_games, min(len(valid_games), 3))
-                for game in selected:
-                    new_rows.append({
-                        "user_id": user_id,
-                        "game_id": game['game_id'],
-                        "rating": 5.0,
-                        "implicit": True
-                    })
+        with METRICS.stage("/survey", "select"):
+            seed_ids = survey_seed_games(snapshot(), user_id, genres_selected, platforms_selected, modes_selected)
+        new_rows = [{"user_id": user_id, "game_id": gid, "rating": 5.0, "implicit": True} for gid in seed_ids]
 
         if new_rows:
-            new_df = pd.DataFrame(new_rows)
-            interactions_df = pd.concat([interactions_df, new_df], ignore_index=True)
-            interactions_df.to_csv(interactions_path, index=False)
-            DB["interactions"] = interactions_df 
+            # Seeds replace whatever this user had before
+            with METRICS.stage("/survey", "store"):
+                previous_rows = STORE.replace_user_interactions(user_id, new_rows)
+                apply_interaction_changes(removed=previous_rows, added=pd.DataFrame(new_rows))
 
         return jsonify({"message": "Survey saved", "count": len(new_rows)})
 
@@ -657,28 +736,16 @@ def save_survey():
 # ---------------------------------------------------------
 @app.route("/game/<int:game_id>", methods=["GET"])
 def get_game_details(game_id):
+    catalog = snapshot().catalog
     # 1. Get Core Data (Title)
-    core = DB["games"][DB["games"]["game_id"] == game_id]
-    if core.empty: return jsonify({"error": "Game not found"}), 404
+    row = lookup(catalog, game_id)
+    if row is None or not catalog["has_core"][row]: return jsonify({"error": "Game not found"}), 404
     
-    game_data = core.iloc[0].to_dict()
-
-    # 2. Merge Metadata (Release, Publisher, Platform, Image)
-    if not DB["metadata"].empty:
-        meta = DB["metadata"][DB["metadata"]["game_id"] == game_id]
-        if not meta.empty:
-            game_data.update(meta.iloc[0].to_dict())
-
-    # 3. Merge Text (Description)
-    if not DB["text"].empty:
-        txt = DB["text"][DB["text"]["game_id"] == game_id]
-        if not txt.empty:
-            game_data.update(txt.iloc[0].to_dict())
-
-    # 4. Cleanup (Handle NaN values for JSON)
-    clean_data = {k: (v if pd.notna(v) else None) for k, v in game_data.items()}
+    # 2. Merge Metadata (Release, Publisher, Platform, Image) and Text (Description)
+    #    Missing values are already None in the catalog arrays
+    game_data = game_record(catalog, row)
     
-    return jsonify(clean_data)
+    return jsonify(game_data)
 
 
 # ---------------------------------------------------------
@@ -691,33 +758,38 @@ def recommend_similar_games():
         game_id = data.get("game_id")
         
         if not game_id: return jsonify({"error": "Missing game_id"}), 400
+        engine = snapshot()
+        catalog, matrices = engine.catalog, engine.matrices
 
         # 1. Find features of target game
-        if "features" not in DB or DB["features"].empty:
-             return jsonify({"recommendations": []})
-
-        target = DB["features"][DB["features"]["game_id"] == game_id]
-        if target.empty: return jsonify({"recommendations": []})
+        target_row = lookup(catalog, game_id)
+        if target_row is None or not catalog["has_features"][target_row]:
+            return jsonify({"recommendations": []})
 
         # 2. Build profile from this game
-        # Drop game_id to get just the feature vector
-        profile = target.drop(columns=["game_id"], errors="ignore").iloc[0].to_dict()
-
-        # 3. Run Algorithm
-        scores = get_hybrid_scores(profile)
+        profile = feature_profile(catalog, target_row)
+
+        # 3. Candidates: the game's content + text neighbour lists (the game itself is masked out)
+        mask = filter_mask(catalog, exclude_ids=[game_id])
+        if "content_nbrs" in matrices:
+            candidates = np.zeros_like(mask)
+            candidates[matrices["content_nbrs"]["ids"][target_row]] = True
+            if "text_nbrs" in matrices:
+                candidates[matrices["text_nbrs"]["ids"][target_row]] = True
+            mask &= candidates
+
+        # 4. Run Algorithm
+        scores = engine.get_hybrid_scores(profile, k=6, mask=mask)
         
         similar = []
-        for sim_id in scores.index[:7]: # Top 7
-            if int(sim_id) == int(game_id): continue # Skip self
-            
-            core = DB["games"][DB["games"]["game_id"] == sim_id]
-            meta = DB["metadata"][DB["metadata"]["game_id"] == sim_id]
+        for sim_id in scores.index:
+            row = lookup(catalog, sim_id)
             
-            if not core.empty:
+            if row is not None and catalog["has_core"][row]:
                 similar.append({
                     "game_id": int(sim_id),
-                    "title": core["title"].values[0],
-                    "image": meta["image_url"].values[0] if not meta.empty else "",
+                    "title": catalog["titles"][row],
+                    "image": catalog["images"][row],
                     "score": float(scores[sim_id])
                 })
 
@@ -742,39 +814,16 @@ def update_library_status():
         if not all([user_id, game_id, status]):
             return jsonify({"error": "Missing fields"}), 400
 
-        # Load Library DB
-        library_path = "dataset/user_library.csv"
-        if os.path.exists(library_path):
-            lib_df = pd.read_csv(library_path)
-        else:
-            lib_df = pd.DataFrame(columns=["user_id", "game_id", "status", "date_added"])
-
         # Create timestamp
         from datetime import datetime
         now = datetime.now().strftime("%Y-%m-%d")
 
-        # Check if entry exists
-        mask = (lib_df["user_id"].astype(str) == str(user_id)) & (lib_df["game_id"] == game_id)
-        
         if status == "Remove":
             # Delete Row
-            lib_df = lib_df[~mask]
-        elif mask.any():
-            # Update Existing
-            lib_df.loc[mask, "status"] = status
-            lib_df.loc[mask, "date_added"] = now # Update timestamp
+            STORE.delete_library(user_id, game_id)
         else:
-            # Add New
-            new_row = pd.DataFrame([{
-                "user_id": user_id,
-                "game_id": game_id,
-                "status": status,
-                "date_added": now
-            }])
-            lib_df = pd.concat([lib_df, new_row], ignore_index=True)
-
-        lib_df.to_csv(library_path, index=False)
-        DB["library"] = lib_df # Update Memory
+            # Add New / Update Existing (timestamp refreshed either way)
+            STORE.upsert_library(user_id, game_id, status, now)
 
         # OPTIONAL: If they mark as "Completed" or "Playing", implicitly "Like" it (Rating 5)
         # This feeds the recommendation engine automatically!
@@ -790,89 +839,80 @@ def update_library_status():
         return jsonify({"error": str(e)}), 500
 
 
+LIBRARY_FIELDS = ["game_id", "title", "image", "status", "date"]
+
 @app.route("/library/<user_id>", methods=["GET"])
 def get_user_library(user_id):
     try:
-        # Check if library loaded
-        library_path = "dataset/user_library.csv"
-        if not os.path.exists(library_path):
-            return jsonify([])
-
-        lib_df = pd.read_csv(library_path)
-        user_lib = lib_df[lib_df["user_id"].astype(str) == str(user_id)]
-
-        if user_lib.empty:
-            return jsonify([])
-
-        # Merge with Game Data to get Titles/Images
-        # We assume DB["games"] and DB["metadata"] are loaded globally
-        merged = user_lib.merge(DB["games"], on="game_id", how="left")
-        merged = merged.merge(DB["metadata"], on="game_id", how="left")
-
-        # Fill NaNs
-        merged["image_url"] = merged["image_url"].fillna("https://placehold.co/400x225/333/fff?text=No+Image")
-        
-        # Convert to list
-        library_list = []
-        for _, row in merged.iterrows():
-            library_list.append({
-                "game_id": int(row["game_id"]),
-                "title": row["title"],
-                "image": row["image_url"],
-                "status": row["status"],
-                "date": row["date_added"]
-            })
-
-        return jsonify(library_list)
+        query = parse_list_query(request.args, LIBRARY_FIELDS)
+        genres, platforms = multi_arg(request.args, "genre"), multi_arg(request.args, "platform")
+        statuses = multi_arg(request.args, "status")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
+        user_lib = STORE.user_library(user_id)
+
+        # Filters as one mask, titles/images from the catalog index
+        catalog = snapshot().catalog
+        game_ids = user_lib["game_id"].to_numpy()
+        rows = lookup_rows(catalog, game_ids)
+        mask = game_filter(catalog, rows, genres, platforms)
+        if statuses: mask &= user_lib["status"].isin(statuses).to_numpy()
+        selected = user_lib[mask]
+        rows = rows[mask]
+        positions, next_cursor = page(selected["game_id"].to_numpy(), query)
+
+        titles, images = listed_titles_images(catalog, rows[positions])
+        library_list = records({
+            "game_id": selected["game_id"].to_numpy()[positions].astype(np.int64),
+            "title": titles,
+            "image": images,
+            "status": selected["status"].to_numpy()[positions],
+            "date": selected["date_added"].to_numpy()[positions],
+        }, query["fields"])
+
+        return list_response(library_list, len(selected), next_cursor)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"ERROR: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route("/user/preferences/<user_id>", methods=["GET"])
 def get_user_prefs(user_id):
-    prefs_path = "dataset/user_preferences.csv"
-    if not os.path.exists(prefs_path):
-        return jsonify({"genres": [], "platforms": [], "modes": []})
-    
-    df = pd.read_csv(prefs_path)
-    user_pref = df[df["user_id"].astype(str) == str(user_id)]
+    user_pref = STORE.get_preferences(user_id)
     
-    if user_pref.empty:
+    if not user_pref:
         return jsonify({"genres": [], "platforms": [], "modes": []})
     
     # Convert semicolon strings back to lists for the frontend
-    res = {
-        "genres": str(user_pref.iloc[0]['genres']).split(";") if pd.notna(user_pref.iloc[0]['genres']) else [],
-        "platforms": str(user_pref.iloc[0]['platforms']).split(";") if pd.notna(user_pref.iloc[0]['platforms']) else [],
-        "modes": str(user_pref.iloc[0]['modes']).split(";") if pd.notna(user_pref.iloc[0]['modes']) else []
-    }
+    res = {key: str(value).split(";") if value else [] for key, value in user_pref.items()}
     return jsonify(res)
 
 @app.route("/user/stats/<user_id>", methods=["GET"])
 def get_user_stats(user_id):
-    # 1. Load data
-    interactions = safe_read_csv("dataset/user_interactions.csv", ["user_id", "game_id", "rating", "implicit"])
-    user_data = interactions[interactions["user_id"].astype(str) == str(user_id)]
+    # 1. Load profile (kept up to date in memory by the write routes)
+    user_profile = PROFILES.snapshot(user_id)
     
-    if user_data.empty:
+    if user_profile is None or not user_profile["has_history"]:
         return jsonify({"accuracy": 0, "top_genres": []})
 
     # 2. Calculate "Match Accuracy"
     # Logic: How many 'Highly Rated' (4-5) games vs 'Disliked' (1-2)
-    likes = len(user_data[user_data["rating"] >= 4])
-    total = len(user_data)
+    likes = user_profile["n_liked_rows"]
+    total = user_profile["n_rows"]
     accuracy = int((likes / total) * 100) if total > 0 else 0
 
     # 3. Calculate Genre Distribution (Top 5)
-    # Join with features to see which genres these games belong to
-    merged = user_data.merge(DB["features"], on="game_id")
+    # Feature strengths of liked games are summed incrementally in the profile store
     genre_cols = ["rpg", "shooter", "survival", "competitive", "open_world", "casual"]
     
     genre_scores = {}
     for col in genre_cols:
         # Sum of feature strengths for games the user liked
-        score = merged[merged["rating"] >= 4][col].sum()
+        score = user_profile["liked_totals"].get(col, 0)
         if score > 0:
             genre_scores[col.replace("_", " ").title()] = int(score)
 
@@ -884,5 +924,119 @@ def get_user_stats(user_id):
         "genre_data": [{"name": k, "value": v} for k, v in sorted_genres]
     })
 
+# ---------------------------------------------------------
+# NEW: STREAMING EXPORTS (NDJSON, see export.py)
+# ---------------------------------------------------------
+def ndjson_response(batches):
+    # stream_with_context: the generator keeps this request's snapshot (g.engine) while it runs
+    return Response(stream_with_context(ndjson(batches)), mimetype="application/x-ndjson")
+
+@app.route("/export/games", methods=["GET"])
+def export_games():
+    """Every listed game, one /games item per line."""
+    denied = admin_denied()
+    if denied: return denied
+    catalog = snapshot().catalog
+    return ndjson_response(
+        records(game_columns(catalog, rows)) for rows in row_slices(catalog["core_rows"], EXPORT_CHUNK_ROWS)
+    )
+
+@app.route("/export/interactions", methods=["GET"])
+def export_interactions():
+    """Every stored interaction row (user_id, game_id, rating, playtime, implicit), one per line."""
+    denied = admin_denied()
+    if denied: return denied
+    return ndjson_response(frame_batches(STORE.iter_interactions(EXPORT_CHUNK_ROWS)))
+
+@app.route("/export/recommendations", methods=["GET"])
+def export_recommendations():
+    """
+    Top-k recommendations of every known user, one {"user", "recommendations": [{"game_id", "score"}], "status"}
+    per line. Query: ?k=10&exclude_rated=1. Users are scored in batches of EXPORT_CHUNK_ROWS, fewer
+    on wide catalogs so each dense (users x games) pass stays within SCORE_CHUNK_CELLS (see engine.py).
+    """
+    denied = admin_denied()
+    if denied: return denied
+    try:
+        k = int(request.args.get("k", 10))
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+    exclude_rated = request.args.get("exclude_rated", "0").lower() in ("1", "true", "yes")
+    user_ids = sorted(PROFILES.user_ids())
+    chunk_rows = min(EXPORT_CHUNK_ROWS, snapshot().score_chunk_rows())
+
+    def batches():
+        for chunk in row_slices(user_ids, chunk_rows):
+            with METRICS.stage("/export/recommendations", "score"):
+                profiles = [build_request_profile(uid) for uid in chunk]
+                active = [p for p in profiles if not p["cold_start"]]
+                all_scores = snapshot().get_hybrid_scores_batch(
+                    [p["prefs"] for p in active], k=k,
+                    masks=[profile_mask(p, exclude_rated) for p in active], user_ids=[p["user_id"] for p in active],
+                )
+            scores_by_user = {p["user_id"]: scores for p, scores in zip(active, all_scores)}
+            lines = []
+            for p in profiles:
+                scores = scores_by_user.get(p["user_id"])
+                if scores is None:
+                    lines.append({"user": p["user_id"], "recommendations": [], "status": "cold_start"})
+                    continue
+                recs = [{"game_id": gid, "score": value} for gid, value in zip(scores.index.tolist(), scores.tolist())]
+                lines.append({"user": p["user_id"], "recommendations": recs, "status": "success"})
+            yield lines
+
+    return ndjson_response(batches())
+
+# ---------------------------------------------------------
+# NEW: ADMIN CATALOG EDITS (No restart)
+# ---------------------------------------------------------
+def admin_denied():
+    if not ADMIN_TOKEN:
+        if ADMIN_OPEN: return None
+        return jsonify({"error": "Admin routes are disabled (set ADMIN_TOKEN)"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+@app.route("/admin/games", methods=["POST"])
+def admin_upsert_game():
+    """Body: flat game record, e.g. {"game_id": 31, "title": ..., "description": ..., "rpg": 5, "platform": "PC"}."""
+    denied = admin_denied()
+    if denied: return denied
+    try:
+        result = CATALOG_UPDATER.upsert(request.json or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({**result, "message": "Game saved"})
+
+@app.route("/admin/games/<int:game_id>", methods=["DELETE"])
+def admin_remove_game(game_id):
+    denied = admin_denied()
+    if denied: return denied
+    if not CATALOG_UPDATER.remove(game_id):
+        return jsonify({"error": "Game not found"}), 404
+    return jsonify({"message": "Game removed"})
+
+@app.route("/admin/refit", methods=["POST"])
+def admin_refit():
+    denied = admin_denied()
+    if denied: return denied
+    CATALOG_UPDATER.refit()
+    return jsonify({"message": "Catalog refit", **SNAPSHOTS.stats()})
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    """Rebuilds the snapshot from the dataset files in the background; requests keep being served meanwhile."""
+    denied = admin_denied()
+    if denied: return denied
+    SNAPSHOTS.request_reload()
+    return jsonify({"message": "Reload started", **SNAPSHOTS.stats()}), 202
+
+@app.route("/admin/snapshot", methods=["GET"])
+def admin_snapshot():
+    denied = admin_denied()
+    if denied: return denied
+    return jsonify(SNAPSHOTS.stats())
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
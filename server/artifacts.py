@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from ann import ClusteredIndex
+
+# ---------------------------------------------------------
+# PERSISTED MODEL ARTIFACTS (Fast startup)
+# ---------------------------------------------------------
+# compute_matrices() output is written to artifacts/<tag>/ as plain .npy files
+# plus a manifest.json. The tag is a hash of the catalog CSVs and the build
+# parameters, so a restart with unchanged data memory-maps the saved arrays
+# (near-instant) and only a real change triggers a rebuild.
+
+ARTIFACT_VERSION = 1
+SOURCE_FILES = ["games.csv", "game_features.csv", "game_text.csv", "game_metadata.csv"]
+KEEP_VERSIONS = 3
+
+
+def source_hash(dataset_dir, params=None):
+    """sha256 over the catalog CSVs (name + bytes) and the build parameters."""
+    h = hashlib.sha256()
+    h.update(json.dumps({"version": ARTIFACT_VERSION, "params": params or {}}, sort_keys=True).encode())
+    for name in SOURCE_FILES:
+        path = os.path.join(dataset_dir, name)
+        h.update(name.encode())
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+    return h.hexdigest()
+
+
+def save_matrices(matrices, directory, tag, params=None):
+    """Writes a matrices dict to directory/<tag>/ (built in a temp dir, then renamed into place)."""
+    os.makedirs(directory, exist_ok=True)
+    final_path = os.path.join(directory, tag)
+    tmp_path = tempfile.mkdtemp(prefix=f".{tag}-", dir=directory)
+    files = []
+
+    def put(name, array):
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+        files.append(f"{name}.npy")
+
+    meta = {}
+    if "feature_matrix" in matrices:
+        feat_mat = matrices["feature_matrix"]
+        put("feature_values", feat_mat.to_numpy())
+        put("feature_ids", feat_mat.index.to_numpy(dtype=np.int64))
+        meta["feature_cols"] = list(feat_mat.columns)
+        put("feature_norm", matrices["feature_norm"])
+
+    for key in ["content_nbrs", "text_nbrs"]:
+        if key in matrices:
+            for part, array in matrices[key].items():
+                put(f"{key}_{part}", array)
+
+    if "tfidf" in matrices:
+        vectorizer = matrices["tfidf"]
+        meta["tfidf_vocabulary"] = {term: int(i) for term, i in vectorizer.vocabulary_.items()}
+        meta["tfidf_params"] = {"stop_words": vectorizer.stop_words}
+        put("tfidf_idf", vectorizer.idf_)
+        tfidf_matrix = sp.csr_matrix(matrices["tfidf_matrix"])
+        put("tfidf_data", tfidf_matrix.data)
+        put("tfidf_indices", tfidf_matrix.indices)
+        put("tfidf_indptr", tfidf_matrix.indptr)
+        meta["tfidf_shape"] = list(tfidf_matrix.shape)
+
+    if "ann" in matrices:
+        index = matrices["ann"]
+        put("ann_vectors", index.vectors)
+        put("ann_centroids", index.centroids)
+        put("ann_order", index.order)
+        put("ann_offsets", index.offsets)
+        meta["ann"] = {"n_probe": index.n_probe, "n_candidates": index.n_candidates, "recall": index.recall}
+
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "tag": tag,
+        "params": params or {},
+        "created": time.time(),
+        "files": files,
+        "meta": meta,
+    }
+    with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    if os.path.exists(final_path):
+        shutil.rmtree(final_path)
+    os.replace(tmp_path, final_path)
+    _prune(directory, keep=tag)
+    return final_path
+
+
+def _prune(directory, keep):
+    """Removes all but the newest KEEP_VERSIONS artifact sets (never the one just written)."""
+    sets = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(".") or not os.path.isfile(os.path.join(path, "manifest.json")):
+            continue
+        sets.append((os.path.getmtime(path), name, path))
+    for _, name, path in sorted(sets, reverse=True)[KEEP_VERSIONS:]:
+        if name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_matrices(path):
+    """Memory-maps a saved artifact set back into a matrices dict. Returns None if it is missing/incompatible."""
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != ARTIFACT_VERSION:
+        return None
+
+    files = set(manifest["files"])
+    meta = manifest["meta"]
+
+    def get(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    matrices = {}
+    if "feature_values.npy" in files:
+        matrices["feature_matrix"] = pd.DataFrame(
+            get("feature_values"), index=pd.Index(get("feature_ids"), name="game_id"), columns=meta["feature_cols"]
+        )
+        matrices["feature_norm"] = get("feature_norm")
+
+    for key in ["content_nbrs", "text_nbrs"]:
+        if f"{key}_ids.npy" in files:
+            matrices[key] = {part: get(f"{key}_{part}") for part in ["ids", "scores", "self_score"]}
+
+    if "tfidf_idf.npy" in files:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        vectorizer = TfidfVectorizer(vocabulary=meta["tfidf_vocabulary"], **meta["tfidf_params"])
+        vectorizer.idf_ = np.asarray(get("tfidf_idf"))
+        matrices["tfidf"] = vectorizer
+        matrices["tfidf_matrix"] = sp.csr_matrix(
+            (get("tfidf_data"), get("tfidf_indices"), get("tfidf_indptr")), shape=tuple(meta["tfidf_shape"])
+        )
+
+    if "ann_centroids.npy" in files:
+        matrices["ann"] = ClusteredIndex.from_arrays(
+            get("ann_vectors"), get("ann_centroids"), get("ann_order"), get("ann_offsets"), **meta["ann"]
+        )
+    return matrices
+
+
+def load_or_build(dataset_dir, build, params=None, directory=None, rebuild=None):
+    """
+    Returns matrices for the current dataset: memory-mapped from a matching artifact set when one
+    exists, otherwise built with build() and saved for the next start. ARTIFACTS_DIR sets the
+    location (default: artifacts/ next to this file); ARTIFACTS_DIR=off disables persistence.
+    rebuild=True (or ARTIFACTS_REBUILD=1) ignores an existing set.
+    """
+    directory = directory or os.environ.get("ARTIFACTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts"))
+    if directory.lower() == "off":
+        return build()
+
+    tag = source_hash(dataset_dir, params)[:16]
+    path = os.path.join(directory, tag)
+    try:
+        if rebuild is None:
+            rebuild = os.environ.get("ARTIFACTS_REBUILD", "0").lower() in ("1", "true", "yes")
+        matrices = None if rebuild else load_matrices(path)
+    except Exception as e:
+        print(f"Warning: Could not load artifacts from {path}: {e}")
+        matrices = None
+    if matrices is not None:
+        print(f"Loaded model artifacts {tag}")
+        return matrices
+
+    matrices = build()
+    try:
+        save_matrices(matrices, directory, tag, params)
+        print(f"Saved model artifacts {tag}")
+    except Exception as e:
+        print(f"Warning: Could not save artifacts to {directory}: {e}")
+    return matrices
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from engine import MATRIX_TABLES, RecommenderEngine
+
+    parser = argparse.ArgumentParser(description="Build (or verify) the model artifact set for a dataset.")
+    parser.add_argument("--dataset", default="dataset", help="Dataset directory (default: dataset)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if a matching artifact set exists")
+    args = parser.parse_args()
+
+    # Only the tables the matrices are built from are read
+    RecommenderEngine(args.dataset, tables=MATRIX_TABLES, rebuild=args.force or None).matrices
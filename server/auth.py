@@ -0,0 +1,82 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from metrics import METRICS
+
+# ---------------------------------------------------------
+# AUTH POOL (Bounded bcrypt offload)
+# ---------------------------------------------------------
+# bcrypt is slow on purpose (tens to hundreds of ms per hash or check). Run
+# inline, a burst of logins takes every request thread and every core, and
+# /recommend traffic waits behind it. Password work instead goes to a small
+# pool:
+#   - at most AUTH_WORKERS hashes/checks run at once (bcrypt releases the
+#     GIL, so the other request threads keep serving meanwhile),
+#   - at most AUTH_QUEUE_LIMIT more may wait (default: AUTH_WORKERS, so at most
+#     2 x AUTH_WORKERS request threads are ever parked on bcrypt); beyond that
+#     the job is refused (AuthBusy -> 503 + Retry-After) instead of piling up,
+#   - a caller waits at most AUTH_TIMEOUT seconds for its result; past that it
+#     gets AuthBusy too (a job still queued is cancelled and frees its slot),
+#   - queue depth, wait time and refusals are exported on /metrics.
+
+
+class AuthBusy(Exception):
+    """The auth pool's queue is full or the job timed out; the client should retry later."""
+
+
+class AuthPool:
+    def __init__(self, bcrypt, workers=2, queue_limit=None, timeout=10.0):
+        self.bcrypt = bcrypt
+        self.workers = workers
+        self.queue_limit = workers if queue_limit is None else queue_limit
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+        self._slots = threading.BoundedSemaphore(workers + self.queue_limit)
+        self._depth = 0
+        self._depth_lock = threading.Lock()
+
+    def _track(self, delta):
+        with self._depth_lock:
+            self._depth += delta
+            METRICS.set("recommender_auth_queue_depth", self._depth)
+
+    def run(self, stage, fn, *args):
+        """Runs fn(*args) on a pool worker and waits for it. Raises AuthBusy when the queue is full or on timeout."""
+        if not self._slots.acquire(blocking=False):
+            METRICS.inc("recommender_auth_rejected_total")
+            raise AuthBusy("Too many concurrent logins, retry shortly")
+        self._track(+1)
+        queued = time.perf_counter()
+
+        def job():
+            METRICS.observe("recommender_auth_wait_seconds", time.perf_counter() - queued)
+            try:
+                with METRICS.stage("auth", stage):
+                    return fn(*args)
+            finally:
+                self._track(-1)
+                self._slots.release()
+
+        future = self._executor.submit(job)
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            if future.cancel():
+                # Never started, so job() won't release its slot
+                self._track(-1)
+                self._slots.release()
+            METRICS.inc("recommender_auth_rejected_total")
+            raise AuthBusy("Login is taking too long, retry shortly") from None
+
+    def hash(self, password):
+        return self.run("hash", lambda: self.bcrypt.generate_password_hash(password).decode("utf-8"))
+
+    def check(self, pw_hash, password):
+        return self.run("check", self.bcrypt.check_password_hash, pw_hash, password)
+
+    def stats(self):
+        with self._depth_lock:
+            depth = self._depth
+        return {"workers": self.workers, "queue_limit": self.queue_limit, "timeout": self.timeout, "in_flight": depth}
@@ -0,0 +1,257 @@
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# ---------------------------------------------------------
+# BENCHMARK SUITE (Startup, scoring core, every endpoint)
+# ---------------------------------------------------------
+# Runs against a copy of a dataset directory (or a freshly generated synthetic
+# one, see synth_data.py) so write endpoints never touch the real files, and
+# reports machine-readable JSON:
+#   - startup: load_data / compute_matrices / catalog / popularity / ALS fit / app import
+#     times, warm start from saved artifacts, peak RSS,
+#   - scoring: get_hybrid_scores latency and batched profiles/second,
+#   - endpoints: p50/p95/p99/mean latency per route via the Flask test client.
+#
+#   python benchmark.py --games 10000 --interactions 1000000 --output bench.json
+#   python benchmark.py --dataset dataset --compare bench.json   # exit 1 on regressions
+
+GENRES = ["RPG", "Shooter", "Survival", "Puzzle", "Sports", "Adventure", "Racing", "Action"]
+PLATFORMS = ["PC", "Console", "Mobile"]
+MODES = ["Singleplayer", "Multiplayer"]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def latency_summary(samples, errors=0):
+    ms = np.array(samples) * 1000.0
+    if len(ms) == 0:
+        return {"n": 0, "errors": errors}
+    return {
+        "n": int(len(ms)),
+        "errors": int(errors),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+# ---------------------------------------------------------
+# 1. STARTUP + SCORING CORE (engine only, no web app)
+# ---------------------------------------------------------
+def bench_startup(dataset_dir):
+    from engine import RecommenderEngine, load_data, compute_matrices, matrix_params, collab_params
+    from catalog import build_catalog
+    from collab import ALSModel, RatingAggregate
+
+    out = {}
+    db, out["load_data_s"] = timed(lambda: load_data(dataset_dir))
+    matrices, out["compute_matrices_s"] = timed(lambda: compute_matrices(db, matrix_params()))
+    catalog, out["build_catalog_s"] = timed(lambda: build_catalog(db))
+    _, out["popularity_s"] = timed(lambda: RatingAggregate.from_interactions(catalog["game_ids"], db["interactions"]))
+    als = {k: v for k, v in collab_params().items() if k != "mode"}
+    _, out["collab_fit_s"] = timed(lambda: ALSModel.fit(catalog["game_ids"], db["interactions"], **als))
+    out["n_games"] = int(len(catalog["game_ids"]))
+    out["n_interactions"] = int(len(db["interactions"]))
+    del db, matrices, catalog
+
+    # Cold build that saves artifacts, then a warm start that memory-maps them
+    cold = RecommenderEngine(dataset_dir, tables=["features", "text"])
+    _, out["artifact_build_s"] = timed(lambda: cold.matrices)
+    warm = RecommenderEngine(dataset_dir, tables=["features", "text"])
+    _, out["artifact_load_s"] = timed(lambda: warm.matrices)
+    return out
+
+
+def bench_scoring(engine, n_single=200, batch_sizes=(1, 16, 128), seed=0):
+    rng = np.random.default_rng(seed)
+    feature_cols = list(engine.matrices["feature_matrix"].columns)
+    random_prefs = lambda: {c: float(v) for c, v in zip(feature_cols, rng.integers(0, 6, len(feature_cols)))}
+
+    engine.popularity  # build outside the timed loop
+    samples = []
+    for _ in range(n_single):
+        prefs = random_prefs()
+        samples.append(timed(lambda: engine.get_hybrid_scores(prefs))[1])
+    out = {"get_hybrid_scores": latency_summary(samples)}
+
+    for size in batch_sizes:
+        batch = [random_prefs() for _ in range(size)]
+        reps = max(1, 200 // size)
+        _, elapsed = timed(lambda: [engine.get_hybrid_scores_batch(batch) for _ in range(reps)])
+        out[f"batch_{size}_profiles_per_s"] = round(size * reps / elapsed, 1)
+    return out
+
+
+# ---------------------------------------------------------
+# 2. ENDPOINTS (Flask test client)
+# ---------------------------------------------------------
+def endpoint_cases(app_module, rng):
+    """name -> (method, url or callable returning url, json body or callable returning body)."""
+    engine = app_module.SNAPSHOTS.current
+    catalog = engine.catalog
+    game_ids = catalog["game_ids"][catalog["has_core"]]
+    interactions = app_module.STORE.all_interactions()
+    user_ids = interactions["user_id"].astype(str).unique() if not interactions.empty else np.array(["1"])
+    pick_game = lambda: int(rng.choice(game_ids))
+    pick_user = lambda: str(rng.choice(user_ids))
+    some = lambda values: list(rng.choice(values, rng.integers(1, 3), replace=False))
+
+    return {
+        "GET /games": ("get", lambda: "/games", None),
+        "GET /game/<id>": ("get", lambda: f"/game/{pick_game()}", None),
+        "GET /games/similar/<id>": ("get", lambda: f"/games/similar/{pick_game()}", None),
+        "POST /recommend (guest)": ("post", lambda: "/recommend", lambda: {"genres": some(GENRES), "platforms": some(PLATFORMS), "modes": some(MODES)}),
+        "POST /recommend (user)": ("post", lambda: "/recommend", lambda: {"user_id": pick_user()}),
+        "POST /recommend/batch": ("post", lambda: "/recommend/batch", lambda: {"user_ids": [pick_user() for _ in range(16)]}),
+        "POST /recommend/game": ("post", lambda: "/recommend/game", lambda: {"game_id": pick_game()}),
+        "GET /user/history/<id>": ("get", lambda: f"/user/history/{pick_user()}", None),
+        "GET /user/stats/<id>": ("get", lambda: f"/user/stats/{pick_user()}", None),
+        "GET /user/preferences/<id>": ("get", lambda: f"/user/preferences/{pick_user()}", None),
+        "GET /library/<id>": ("get", lambda: f"/library/{pick_user()}", None),
+        "POST /rate": ("post", lambda: "/rate", lambda: {"user_id": pick_user(), "game_id": pick_game(), "rating": int(rng.integers(1, 6))}),
+        "POST /rate/delete": ("post", lambda: "/rate/delete", lambda: {"user_id": pick_user(), "game_id": pick_game()}),
+        "POST /library/update": ("post", lambda: "/library/update", lambda: {"user_id": pick_user(), "game_id": pick_game(), "status": "Playing"}),
+        "POST /survey": ("post", lambda: "/survey", lambda: {"user_id": f"bench{rng.integers(1 << 30)}", "genres": some(GENRES), "platforms": some(PLATFORMS), "modes": some(MODES)}),
+        "POST /login": ("post", lambda: "/login", lambda: {"username": "user1", "password": "password"}),
+    }
+
+
+def bench_endpoints(app_module, n_requests=100, only=None, seed=0):
+    rng = np.random.default_rng(seed)
+    client = app_module.app.test_client()
+    results = {}
+    for name, (method, url, body) in endpoint_cases(app_module, rng).items():
+        if only and not any(o in name for o in only):
+            continue
+        samples, errors = [], 0
+        # Light endpoints get the full count; the slow /games payload and bcrypt logins fewer
+        n = max(5, n_requests // 10) if name in ["GET /games", "POST /login"] else n_requests
+        for _ in range(n):
+            kwargs = {"json": body()} if body else {}
+            target = url()
+            response, elapsed = timed(lambda: getattr(client, method)(target, **kwargs))
+            samples.append(elapsed)
+            if response.status_code >= 500: errors += 1
+        results[name] = latency_summary(samples, errors)
+        print(f"  {name:<28} p50={results[name]['p50_ms']:>9.2f}ms  p95={results[name]['p95_ms']:>9.2f}ms")
+    return results
+
+
+# ---------------------------------------------------------
+# 3. REGRESSION CHECK
+# ---------------------------------------------------------
+def compare(current, baseline, tolerance=0.2, min_delta_ms=1.0):
+    """
+    Endpoints / timings that got slower than baseline by more than `tolerance` (fraction).
+    Differences under min_delta_ms (endpoints) / 50ms (startup) are treated as noise.
+    """
+    regressions = []
+    for name, stats in current.get("endpoints", {}).items():
+        old = baseline.get("endpoints", {}).get(name)
+        if not old or not old.get("p95_ms") or "p95_ms" not in stats:
+            continue
+        if stats["p95_ms"] > old["p95_ms"] * (1 + tolerance) and stats["p95_ms"] - old["p95_ms"] > min_delta_ms:
+            regressions.append(f"{name}: p95 {old['p95_ms']}ms -> {stats['p95_ms']}ms")
+    for key, value in current.get("startup", {}).items():
+        old = baseline.get("startup", {}).get(key)
+        if key.endswith("_s") and old and value > old * (1 + tolerance) and value - old > 0.05:
+            regressions.append(f"startup {key}: {old:.3f}s -> {value:.3f}s")
+    return regressions
+
+
+def run(dataset_dir, n_requests=100, only=None, seed=0):
+    """Benchmarks one dataset directory (used in place, so pass a copy). Returns the results dict."""
+    os.environ["DATASET_DIR"] = dataset_dir
+    os.environ.setdefault("ARTIFACTS_DIR", os.path.join(dataset_dir, "artifacts"))
+    # Measure computation, not cache hits
+    os.environ.setdefault("RECOMMEND_CACHE_SIZE", "0")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    results = {"meta": {
+        "dataset": dataset_dir,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "requests_per_endpoint": n_requests,
+    }}
+    print("Startup...")
+    results["startup"] = bench_startup(dataset_dir)
+
+    app_module, results["startup"]["app_import_s"] = timed(lambda: __import__("app"))
+    results["startup"]["peak_rss_mb"] = round(peak_rss_mb(), 1)
+
+    print("Scoring core...")
+    results["scoring"] = bench_scoring(app_module.SNAPSHOTS.current, seed=seed)
+    print("Endpoints...")
+    results["endpoints"] = bench_endpoints(app_module, n_requests, only, seed)
+    results["meta"]["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark startup, scoring and every endpoint; writes JSON.")
+    parser.add_argument("--dataset", default=None, help="Dataset directory to benchmark (copied first)")
+    parser.add_argument("--games", type=int, default=10_000, help="Synthetic catalog size (without --dataset)")
+    parser.add_argument("--users", type=int, default=20_000, help="Synthetic user count (without --dataset)")
+    parser.add_argument("--interactions", type=int, default=1_000_000, help="Synthetic interactions (without --dataset)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint")
+    parser.add_argument("--only", default=None, help="Comma-separated substrings of endpoint names to run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON; exit 1 if anything regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline (fraction)")
+    parser.add_argument("--keep", action="store_true", help="Keep the working copy of the dataset")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench-")
+    dataset_dir = os.path.join(work_dir, "dataset")
+    if args.dataset:
+        shutil.copytree(args.dataset, dataset_dir, ignore=shutil.ignore_patterns("*.db*", "artifacts"))
+        sizes = {"source": os.path.abspath(args.dataset)}
+    else:
+        from synth_data import generate
+        print(f"Generating {args.games} games / {args.interactions} interactions...")
+        sizes = generate(dataset_dir, args.games, args.users, args.interactions, seed=args.seed)
+
+    try:
+        results = run(dataset_dir, args.requests, args.only.split(",") if args.only else None, args.seed)
+        results["meta"]["data"] = sizes
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"Results written to {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
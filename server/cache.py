@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# ---------------------------------------------------------
+# RESULT CACHE (LRU + TTL, single-flight)
+# ---------------------------------------------------------
+# Caches finished responses by a normalized request key:
+#   - LRU: at most `max_entries` results, least recently used evicted first,
+#   - TTL: a result is served for at most `ttl` seconds,
+#   - single-flight: concurrent misses on the same key wait for the one
+#     computation already running instead of repeating it,
+#   - tags: entries can be dropped by tag (e.g. every result of one user).
+
+
+class _Flight:
+    def __init__(self, generation, tag):
+        self.event = threading.Event()
+        self.generation = generation
+        self.tag = tag
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value, tag)
+        self._tags = {}                # tag -> set of keys
+        self._inflight = {}            # key -> _Flight
+        self._generation = 0           # bumped by clear(): results computed before it are not stored
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get_or_compute(self, key, compute, tag=None):
+        """Cached value for `key`, or compute() it once (concurrent callers share the result)."""
+        if not self.enabled:
+            return compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return entry[1]
+                self._drop(key)
+                self.counters["expired"] += 1
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight(self._generation, tag)
+                self.counters["misses"] += 1
+            else:
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = compute()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            # Skip storing if the cache was cleared (or the key invalidated) while computing
+            if flight.generation == self._generation:
+                self._store(key, value, tag)
+        flight.value = value
+        flight.event.set()
+        return value
+
+    def _store(self, key, value, tag):
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tag)
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.counters["evictions"] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry[2] is not None:
+            keys = self._tags.get(entry[2])
+            if keys is not None:
+                keys.discard(key)
+                if not keys: del self._tags[entry[2]]
+
+    def invalidate(self, tag):
+        """Drops every entry stored under `tag` (and any in-flight result for it)."""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            # In-flight computations for this tag started before the write: don't store their result
+            for flight in self._inflight.values():
+                if flight.tag == tag:
+                    flight.generation = -1
+            self.counters["invalidations"] += len(keys)
+
+    def clear(self):
+        """Drops everything (catalog reload)."""
+        with self._lock:
+            self.counters["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            looked_up = self.counters["hits"] + self.counters["misses"] + self.counters["coalesced"]
+            return {
+                **self.counters,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "in_flight": len(self._inflight),
+                "hit_rate": round((self.counters["hits"] + self.counters["coalesced"]) / looked_up, 4) if looked_up else 0.0,
+            }
+
+
+# ---------------------------------------------------------
+# PREPARED RESPONSES (Pre-serialized bodies per snapshot)
+# ---------------------------------------------------------
+# Responses that depend only on the catalog snapshot (e.g. /games) are
+# serialized once per snapshot and kept as bytes, plus a gzip variant and an
+# ETag derived from the content, so a request is a dict lookup and a repeat
+# page load with If-None-Match is a 304. Entries are keyed weakly by the
+# engine snapshot: a swapped-out snapshot takes its bodies with it.
+
+
+class PreparedResponse:
+    """One serialized JSON body with its gzip variant and validators."""
+
+    def __init__(self, body, compresslevel=6):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=compresslevel)
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = time.time()
+
+
+class SnapshotResponses:
+    def __init__(self):
+        self._entries = weakref.WeakKeyDictionary()  # engine -> {name: PreparedResponse}
+        self._lock = threading.Lock()
+
+    def get(self, engine, name, build):
+        """The prepared `name` body for this snapshot; build() returns its bytes on first use."""
+        with self._lock:
+            prepared = self._entries.get(engine, {}).get(name)
+        if prepared is None:
+            # Concurrent first requests may both build; either result is the same
+            prepared = PreparedResponse(build())
+            with self._lock:
+                self._entries.setdefault(engine, {})[name] = prepared
+        return prepared
@@ -0,0 +1,364 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# CATALOG INDEX (Array-backed game lookups)
+# ---------------------------------------------------------
+# Built once from load_data(). Every game gets a fixed row position, and all
+# per-game fields live in contiguous arrays indexed by that position, so route
+# handlers resolve a game in O(1) instead of scanning DB["games"] each time.
+#
+# Row order: games with features first (sorted by game_id, i.e. the same order
+# as MATRICES["feature_matrix"]), then any games that only exist in games.csv.
+
+GENRE_COLS = ["rpg", "shooter", "survival", "casual", "open_world", "competitive"]
+
+# Survey/filter genre -> feature column that must be >= 1 for a game to count as that genre
+GENRE_FEATURE_MAP = {
+    "RPG": "rpg", "Shooter": "shooter", "Survival": "survival",
+    "Action": "competitive", "Adventure": "open_world", "Strategy": "rpg",
+    "Simulation": "casual", "Puzzle": "casual", "Racing": "competitive",
+    "Sports": "competitive", "Horror": "survival", "Stealth": "singleplayer",
+    "Fighting": "competitive", "Platformer": "casual"
+}
+
+# Play mode -> feature column that must be >= 1
+MODE_FEATURE_MAP = {"Singleplayer": "singleplayer", "Multiplayer": "multiplayer"}
+
+
+def _object_column(frame, col, default=None):
+    """Returns a column as an object array of native Python values (NaN -> default)."""
+    if col not in frame.columns:
+        return np.full(len(frame), default, dtype=object)
+    values = frame[col].astype(object).where(frame[col].notna(), default)
+    return np.array(values.tolist(), dtype=object)
+
+
+def _genre_label(feature_row, feature_cols):
+    """Same labelling rule the /games endpoint has always used (idxmax over genre columns)."""
+    valid_cols = [c for c in GENRE_COLS if c in feature_cols]
+    if not valid_cols:
+        return "Action"
+    values = [feature_row[feature_cols.index(c)] for c in valid_cols]
+    best_genre = valid_cols[int(np.argmax(values))]
+    if best_genre == "rpg":
+        return "RPG"
+    return best_genre.replace("_", " ").title()
+
+
+def build_catalog(db):
+    """Builds the catalog index (id -> row maps plus per-column arrays) from the DB dict."""
+    games = db.get("games", pd.DataFrame(columns=["game_id", "title"]))
+    features = db.get("features", pd.DataFrame())
+    metadata = db.get("metadata", pd.DataFrame())
+    text = db.get("text", pd.DataFrame())
+
+    # 1. Row order
+    if not features.empty and "game_id" in features.columns:
+        feat_df = features.drop_duplicates(subset="game_id").set_index("game_id").sort_index()
+    else:
+        feat_df = pd.DataFrame()
+    scored_ids = list(feat_df.index)
+    scored_set = set(scored_ids)
+    extra_ids = sorted(gid for gid in games["game_id"].drop_duplicates() if gid not in scored_set) if "game_id" in games.columns else []
+    game_ids = np.array(scored_ids + extra_ids, dtype=np.int64)
+    pos = {int(gid): i for i, gid in enumerate(game_ids)}
+    n = len(game_ids)
+
+    # 2. Features (zero rows for games without a feature entry)
+    feature_cols = list(feat_df.columns)
+    feat = np.zeros((n, len(feature_cols)), dtype=np.float64)
+    if scored_ids:
+        feat[:len(scored_ids)] = feat_df.to_numpy(dtype=np.float64)
+    has_features = np.zeros(n, dtype=bool)
+    has_features[:len(scored_ids)] = True
+
+    # 3. Source tables aligned to catalog rows
+    def aligned(frame):
+        if frame.empty or "game_id" not in frame.columns:
+            return pd.DataFrame(index=game_ids), np.zeros(n, dtype=bool)
+        frame = frame.drop_duplicates(subset="game_id").set_index("game_id")
+        present = np.isin(game_ids, frame.index.to_numpy())
+        return frame.reindex(game_ids), present
+
+    core, has_core = aligned(games)
+    meta, has_meta = aligned(metadata)
+    txt, has_text = aligned(text)
+
+    # games.csv order is what /games has always returned
+    core_rows = np.array([pos[int(gid)] for gid in games["game_id"].drop_duplicates()], dtype=np.int64) if n and "game_id" in games.columns else np.zeros(0, dtype=np.int64)
+
+    # 4. Filter bitsets (one int per game, one bit per genre feature / platform / mode)
+    genre_feats = sorted(set(GENRE_FEATURE_MAP.values()) & set(feature_cols))
+    genre_bit = {f: 1 << i for i, f in enumerate(genre_feats)}
+    genre_bits = np.zeros(n, dtype=np.int64)
+    for f, bit in genre_bit.items():
+        genre_bits[feat[:, feature_cols.index(f)] >= 1] |= bit
+
+    mode_bit = {}
+    mode_bits = np.zeros(n, dtype=np.int64)
+    for i, (mode, f) in enumerate(MODE_FEATURE_MAP.items()):
+        mode_bit[mode] = 1 << i
+        if f in feature_cols:
+            mode_bits[feat[:, feature_cols.index(f)] >= 1] |= 1 << i
+
+    platform_strings = _object_column(meta, "platform", "")
+    platform_tokens = [[p.strip() for p in str(v).split(";") if p.strip()] for v in platform_strings]
+    vocab = sorted({p for tokens in platform_tokens for p in tokens})
+    if len(vocab) > 63:
+        print(f"Warning: {len(vocab)} distinct platforms, only the first 63 are filterable")
+    platform_bit = {p: 1 << i for i, p in enumerate(vocab[:63])}
+    platform_bits = np.array(
+        [sum(platform_bit.get(p, 0) for p in set(tokens)) for tokens in platform_tokens], dtype=np.int64
+    )
+
+    catalog = {
+        "game_ids": game_ids,
+        "pos": pos,
+        "n_scored": len(scored_ids),
+        "feature_cols": feature_cols,
+        "features": feat,
+        "has_features": has_features,
+        "has_core": has_core,
+        "has_meta": has_meta,
+        "has_text": has_text,
+        "core_rows": core_rows,
+        # Response fields
+        "titles": _object_column(core, "title", ""),
+        "images": _object_column(meta, "image_url", ""),
+        "descriptions": _object_column(txt, "description", ""),
+        "platforms": platform_strings,
+        "genres": np.array(
+            [_genre_label(feat[i], feature_cols) if has_features[i] else "Uncategorized" for i in range(n)],
+            dtype=object,
+        ),
+        # Filter bitsets + their bit assignments
+        "genre_bit": genre_bit,
+        "genre_bits": genre_bits,
+        "platform_bit": platform_bit,
+        "platform_bits": platform_bits,
+        "mode_bit": mode_bit,
+        "mode_bits": mode_bits,
+        # Every raw column, grouped by source table, for the full-detail view
+        "core_cols": {c: _object_column(core, c) for c in core.columns},
+        "meta_cols": {c: _object_column(meta, c) for c in meta.columns},
+        "text_cols": {c: _object_column(txt, c) for c in txt.columns},
+    }
+    return catalog
+
+
+# Per-row arrays of a catalog and the value a blank row gets (everything reorder_catalog() moves)
+ROW_ARRAYS = {
+    "game_ids": 0, "features": 0.0, "has_features": False, "has_core": False, "has_meta": False, "has_text": False,
+    "titles": "", "images": "", "descriptions": "", "platforms": "", "genres": "Uncategorized",
+    "genre_bits": 0, "platform_bits": 0, "mode_bits": 0,
+}
+ROW_COLUMN_GROUPS = ["core_cols", "meta_cols", "text_cols"]
+
+
+def copy_catalog(catalog):
+    """A copy that can be edited (per-row arrays, lookups and bit assignments) without touching the original."""
+    copy = dict(catalog)
+    for key in ROW_ARRAYS:
+        copy[key] = catalog[key].copy()
+    for group in ROW_COLUMN_GROUPS:
+        copy[group] = {c: values.copy() for c, values in catalog[group].items()}
+    for key in ["pos", "platform_bit"]:
+        copy[key] = dict(catalog[key])
+    copy["core_rows"] = catalog["core_rows"].copy()
+    return copy
+
+
+def reorder_catalog(catalog, game_ids):
+    """
+    Moves every per-row array to a new row order. Ids not in the catalog get blank rows; ids
+    left out are dropped. The arrays and `pos` are replaced with new objects, never written
+    into, but the `catalog` dict itself is updated: call it on a copy_catalog() copy only.
+    """
+    game_ids = np.asarray(game_ids, dtype=np.int64)
+    n_old = len(catalog["game_ids"])
+    old = pd.Index(catalog["game_ids"]).get_indexer(game_ids)
+    known = old >= 0
+    src = np.where(known, old, 0)
+
+    def take(values, blank):
+        if n_old == 0:
+            return np.full((len(game_ids),) + values.shape[1:], blank, dtype=values.dtype)
+        out = values[src]
+        out[~known] = blank
+        return out
+
+    for key, blank in ROW_ARRAYS.items():
+        catalog[key] = take(catalog[key], blank)
+    catalog["game_ids"] = game_ids
+    for group in ROW_COLUMN_GROUPS:
+        catalog[group] = {c: take(values, None) for c, values in catalog[group].items()}
+
+    old_to_new = np.full(n_old, -1, dtype=np.int64)
+    old_to_new[old[known]] = np.flatnonzero(known)
+    core_rows = old_to_new[catalog["core_rows"]]
+    catalog["core_rows"] = core_rows[core_rows >= 0]
+
+    catalog["pos"] = {int(gid): row for row, gid in enumerate(game_ids.tolist())}
+
+
+def upsert_catalog_game(catalog, tables):
+    """
+    Adds or replaces one game from single-row DataFrames ({"games", "features", "metadata", "text"},
+    missing/None = no entry in that table), patching the catalog in place. Returns the game's row.
+    Only for a copy_catalog() copy that is not serving yet (see snapshots.SnapshotManager.derive).
+
+    A new game with features goes right after the existing scored rows (games without features
+    move down one row), so catalog rows keep lining up with the feature matrix.
+    """
+    one = build_catalog({name: frame for name, frame in tables.items() if frame is not None})
+    game_id = int(one["game_ids"][0])
+    has_features = bool(one["has_features"][0]) and one["feature_cols"] == catalog["feature_cols"]
+    row = catalog["pos"].get(game_id)
+    n_scored = catalog["n_scored"]
+
+    # 1. Row position (scored games before games without features)
+    if has_features and (row is None or row >= n_scored):
+        ids = catalog["game_ids"]
+        extras = ids[n_scored:]
+        order = np.concatenate([ids[:n_scored], [game_id], extras[extras != game_id]])
+        reorder_catalog(catalog, order)
+        catalog["n_scored"] = n_scored + 1
+        row = n_scored
+    elif row is None:
+        reorder_catalog(catalog, np.append(catalog["game_ids"], game_id))
+        row = len(catalog["game_ids"]) - 1
+
+    # 2. Fields
+    for key in ROW_ARRAYS:
+        if key in ("game_ids", "features", "platform_bits"): continue
+        catalog[key][row] = one[key][0]
+    catalog["has_features"][row] = has_features
+    catalog["features"][row] = one["features"][0] if has_features else 0
+    if not has_features: catalog["genres"][row] = "Uncategorized"
+
+    # Platform bits use the catalog's bit assignment (new platforms get the next free bits)
+    platform_bit = catalog["platform_bit"]
+    bits = 0
+    for p in {p.strip() for p in str(one["platforms"][0]).split(";") if p.strip()}:
+        if p not in platform_bit and len(platform_bit) < 63:
+            platform_bit[p] = 1 << len(platform_bit)
+        bits |= platform_bit.get(p, 0)
+    catalog["platform_bits"][row] = bits
+
+    n = len(catalog["game_ids"])
+    for group in ROW_COLUMN_GROUPS:
+        columns = catalog[group]
+        for c, values in one[group].items():
+            if c not in columns: columns[c] = np.full(n, None, dtype=object)
+            columns[c][row] = values[0]
+        for c in set(columns) - set(one[group]):
+            columns[c][row] = None
+
+    # 3. /games listing order (games.csv order, new games at the end)
+    core_rows = catalog["core_rows"]
+    listed = bool(np.any(core_rows == row))
+    if catalog["has_core"][row] and not listed:
+        catalog["core_rows"] = np.append(core_rows, row)
+    elif not catalog["has_core"][row] and listed:
+        catalog["core_rows"] = core_rows[core_rows != row]
+    return row
+
+
+def remove_catalog_game(catalog, game_id):
+    """
+    Takes a game out of every listing and filter (in place, on a copy_catalog() copy) and returns
+    its row, or None. The row itself stays (a tombstone) so row positions never shift; a full
+    rebuild drops it.
+    """
+    row = lookup(catalog, game_id)
+    if row is None:
+        return None
+    for key in ["has_features", "has_core", "has_meta", "has_text"]:
+        catalog[key][row] = False
+    for key in ["genre_bits", "platform_bits", "mode_bits"]:
+        catalog[key][row] = 0
+    catalog["core_rows"] = catalog["core_rows"][catalog["core_rows"] != row]
+    return row
+
+
+def filter_mask(catalog, genres=None, platforms=None, modes=None, exclude_ids=None):
+    """
+    Boolean mask over catalog rows for a request's filters (an empty filter list means "any").
+    A game passes a filter if it has at least one of the requested genres / platforms / modes.
+    Only games that can actually be recommended (features + a games.csv entry) are eligible.
+    """
+    mask = catalog["has_features"] & catalog["has_core"]
+    mask &= attribute_mask(catalog, genres, platforms, modes)
+
+    if exclude_ids is not None and len(exclude_ids):
+        rows = [r for r in (lookup(catalog, gid) for gid in exclude_ids) if r is not None]
+        mask[rows] = False
+
+    return mask
+
+
+def attribute_mask(catalog, genres=None, platforms=None, modes=None):
+    """Boolean mask over all catalog rows for genre / platform / mode filters (no eligibility check)."""
+    mask = np.ones(len(catalog["game_ids"]), dtype=bool)
+
+    if genres:
+        wanted = 0
+        for g in genres:
+            f = GENRE_FEATURE_MAP.get(g)
+            wanted |= catalog["genre_bit"].get(f, 0)
+        mask &= (catalog["genre_bits"] & wanted) != 0
+
+    if platforms:
+        wanted = 0
+        for p in platforms:
+            wanted |= catalog["platform_bit"].get(str(p).strip(), 0)
+        mask &= (catalog["platform_bits"] & wanted) != 0
+
+    if modes:
+        wanted = 0
+        for m in modes:
+            wanted |= catalog["mode_bit"].get(m, 0)
+        mask &= (catalog["mode_bits"] & wanted) != 0
+
+    return mask
+
+
+def genre_label_mask(catalog, genres, rows=None):
+    """Boolean mask over `rows` (default: all rows) whose listed genre label (catalog["genres"]) is one of `genres`, any case."""
+    labels = catalog["genres"] if rows is None else catalog["genres"][rows]
+    wanted = {str(g).strip().lower() for g in genres}
+    return pd.Series(labels, dtype=object).astype(str).str.lower().isin(wanted).to_numpy()
+
+
+def lookup(catalog, game_id):
+    """Returns the catalog row for game_id (int or numeric string), or None if unknown."""
+    try:
+        return catalog["pos"].get(int(game_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def lookup_rows(catalog, game_ids):
+    """Catalog rows for a sequence of game ids as an int array (-1 where unknown)."""
+    pos = catalog["pos"]
+    return np.array([pos.get(int(gid), -1) if pd.notna(gid) else -1 for gid in game_ids], dtype=np.int64)
+
+
+def game_record(catalog, row, sources=("core", "meta", "text"), fill_missing=False):
+    """
+    Flat dict of every known column for one game (games.csv + metadata + text).
+    Columns from a table that has no entry for this game are skipped, or set to None with fill_missing.
+    """
+    record = {"game_id": int(catalog["game_ids"][row])}
+    for source in sources:
+        if not (fill_missing or catalog[f"has_{source}"][row]):
+            continue
+        for col, values in catalog[f"{source}_cols"].items():
+            record[col] = values[row]
+    return record
+
+
+def feature_profile(catalog, row):
+    """Feature vector of one game as a {feature: value} dict (used as a recommendation profile)."""
+    return dict(zip(catalog["feature_cols"], catalog["features"][row].tolist()))
@@ -0,0 +1,458 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# COLLABORATIVE SIGNALS
+# ---------------------------------------------------------
+
+class RatingAggregate:
+    """
+    Running per-game rating sum/count, aligned to the catalog row order.
+
+    Replaces `interactions.groupby("game_id")["rating"].mean()` on every request:
+    the arrays are built with one pass over the interactions at startup, and each
+    write endpoint then adds/removes only the rows it changed (O(1) per row).
+    """
+
+    def __init__(self, game_ids):
+        self.game_ids = np.asarray(game_ids, dtype=np.int64)
+        self.pos = {int(gid): i for i, gid in enumerate(self.game_ids)}
+        n = len(self.game_ids)
+        self.sums = np.zeros(n, dtype=np.float64)
+        self.counts = np.zeros(n, dtype=np.int64)
+        self.means = np.zeros(n, dtype=np.float64)
+        self._scores = np.zeros(n, dtype=np.float64)
+        # Ratings for game ids outside the catalog still count towards the
+        # "is any average positive?" check, exactly like the old groupby did.
+        self._extra = {}
+        self._n_positive = 0
+        self._scaled = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_interactions(cls, game_ids, interactions):
+        """
+        Builds the aggregate with one vectorized pass over an interactions DataFrame, or over
+        an iterable of DataFrame chunks (e.g. Storage.iter_interactions()).
+        """
+        agg = cls(game_ids)
+        frames = [interactions] if interactions is None or isinstance(interactions, pd.DataFrame) else interactions
+        index, n = pd.Index(agg.game_ids), len(agg.game_ids)
+        for frame in frames:
+            if frame is None or frame.empty:
+                continue
+            ratings = pd.to_numeric(frame["rating"], errors="coerce").to_numpy(dtype=np.float64)
+            gids = pd.to_numeric(frame["game_id"], errors="coerce").to_numpy()
+            valid = ~np.isnan(ratings) & ~np.isnan(gids)
+            gids, ratings = gids[valid].astype(np.int64), ratings[valid]
+
+            rows = index.get_indexer(gids)
+            known = rows >= 0
+            agg.sums += np.bincount(rows[known], weights=ratings[known], minlength=n)
+            agg.counts += np.bincount(rows[known], minlength=n)
+            for g, r in zip(gids[~known], ratings[~known]):
+                s, c = agg._extra.get(int(g), (0.0, 0))
+                agg._extra[int(g)] = (s + r, c + 1)
+
+        rated = agg.counts > 0
+        agg.means[rated] = agg.sums[rated] / agg.counts[rated]
+        agg._n_positive = int((agg.means > 0).sum()) + sum(1 for s, c in agg._extra.values() if c and s / c > 0)
+        agg._rescale()
+        return agg
+
+    def _rescale(self):
+        self._scaled = self._n_positive > 0
+        self._scores = self.means / 5.0 if self._scaled else self.means.copy()
+
+    def _apply(self, game_id, rating, sign):
+        try:
+            rating = float(rating)
+            game_id = int(game_id)
+        except (TypeError, ValueError):
+            return
+        if np.isnan(rating):
+            return
+
+        row = self.pos.get(game_id)
+        if row is None:
+            s, c = self._extra.get(game_id, (0.0, 0))
+            was_positive = c > 0 and s / c > 0
+            s, c = s + sign * rating, c + sign
+            if c > 0: self._extra[game_id] = (s, c)
+            else: self._extra.pop(game_id, None)
+            is_positive = c > 0 and s / c > 0
+        else:
+            was_positive = self.means[row] > 0
+            self.sums[row] += sign * rating
+            self.counts[row] += sign
+            c = self.counts[row]
+            self.means[row] = self.sums[row] / c if c > 0 else 0.0
+            if c <= 0: self.sums[row], self.counts[row] = 0.0, 0
+            is_positive = self.means[row] > 0
+
+        self._n_positive += int(is_positive) - int(was_positive)
+        if (self._n_positive > 0) != self._scaled:
+            self._rescale()
+        elif row is not None:
+            self._scores[row] = self.means[row] / 5.0 if self._scaled else self.means[row]
+
+    def add(self, game_id, rating):
+        with self._lock:
+            self._apply(game_id, rating, +1)
+
+    def remove(self, game_id, rating):
+        with self._lock:
+            self._apply(game_id, rating, -1)
+
+    def scores(self):
+        """Average rating per catalog row (scaled to 0-1), 0 for unrated games."""
+        return self._scores
+
+    def reindexed(self, game_ids):
+        """
+        A copy aligned to a new catalog row order (ratings follow their game id), or self when
+        the order is unchanged. Catalog snapshots are swapped, never edited, so this never mutates.
+        """
+        game_ids = np.asarray(game_ids, dtype=np.int64)
+        with self._lock:
+            if np.array_equal(game_ids, self.game_ids):
+                return self
+            agg = RatingAggregate(game_ids)
+            old = pd.Index(self.game_ids).get_indexer(game_ids)
+            known = old >= 0
+            agg.sums[known], agg.counts[known] = self.sums[old[known]], self.counts[old[known]]
+
+            # Games leaving the catalog park their ratings in _extra; games joining it pick theirs up
+            agg._extra = dict(self._extra)
+            for row in np.setdiff1d(np.arange(len(self.game_ids)), old[known]):
+                if self.counts[row]:
+                    agg._extra[int(self.game_ids[row])] = (float(self.sums[row]), int(self.counts[row]))
+            for row in np.flatnonzero(~known):
+                agg.sums[row], agg.counts[row] = agg._extra.pop(int(game_ids[row]), (0.0, 0))
+
+        rated = agg.counts > 0
+        agg.means[rated] = agg.sums[rated] / agg.counts[rated]
+        agg._n_positive = int((agg.means > 0).sum()) + sum(1 for s, c in agg._extra.values() if c and s / c > 0)
+        agg._rescale()
+        return agg
+
+# ---------------------------------------------------------
+# MATRIX FACTORIZATION (ALS, personalized collaborative signal)
+# ---------------------------------------------------------
+# Users and catalog games get float32 factor vectors; a user's collaborative
+# score for every game is one product `item_factors @ user_vector`.
+#
+#   - mode="implicit" (default): confidence-weighted ALS (Hu, Koren & Volinsky).
+#     Every interaction is a preference p = 1 (rating >= 3) or 0, held with
+#     confidence c = 1 + alpha * strength, where strength grows with the
+#     rating and playtime and survey seeds (implicit=True) count half.
+#   - mode="explicit": least squares on the observed ratings only.
+#
+# Both sides are solved in vectorized batches: rows with similar observation
+# counts are padded into one block, so their Y^T C Y terms are one batched
+# matmul (O(nnz f^2), no nnz x f x f tensor), then batched f x f solves. After
+# a write only that user's vector is re-solved against the fixed item factors
+# (fold-in, O(n_u f^2 + f^3)); full retraining runs in a background thread.
+
+def _interaction_values(frame):
+    """(rating, playtime, implicit) columns of an interactions frame as clean arrays."""
+    n = len(frame)
+    ratings = pd.to_numeric(frame["rating"], errors="coerce").to_numpy(dtype=np.float64)
+    playtime = (
+        pd.to_numeric(frame["playtime"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        if "playtime" in frame.columns else np.zeros(n)
+    )
+    implicit = (
+        np.array([v is True or v == True or str(v).strip().lower() == "true" for v in frame["implicit"]], dtype=bool)  # noqa: E712
+        if "implicit" in frame.columns else np.zeros(n, dtype=bool)
+    )
+    return ratings, playtime, implicit
+
+
+class ALSModel:
+    """
+    Alternating least squares factors for the catalog (rows aligned to `game_ids`)
+    and every user with at least one interaction. `observations` keeps the raw
+    inputs per user so a write can re-solve one user without touching the rest.
+    """
+
+    def __init__(self, game_ids, factors=32, reg=0.1, alpha=10.0, iterations=10, mode="implicit", seed=0):
+        self.game_ids = np.asarray(game_ids, dtype=np.int64)
+        self.pos = {int(gid): i for i, gid in enumerate(self.game_ids)}
+        self.factors = factors
+        self.reg = reg
+        self.alpha = alpha
+        self.iterations = iterations
+        self.mode = mode
+        self.seed = seed
+        n = len(self.game_ids)
+        self.item_factors = np.zeros((n, factors), dtype=np.float32)
+        self.user_factors = np.zeros((0, factors), dtype=np.float32)
+        self.user_index = {}   # str(user_id) -> row of user_factors
+        self.observations = {} # str(user_id) -> {item row: (rating, playtime, implicit)}
+        self._gram = np.zeros((factors, factors))  # YtY (implicit mode)
+        self._lock = threading.Lock()
+
+    # --- Weights ---
+    def _weights(self, ratings, playtime, implicit):
+        """Per-observation (weight, target) for the normal equations of either mode (target already weighted)."""
+        seed_scale = np.where(implicit, 0.5, 1.0)
+        if self.mode == "explicit":
+            # Weighted least squares: A = reg I + sum w y y^T ; b = sum w r y
+            return seed_scale, seed_scale * ratings
+        strength = (ratings / 5.0 + 0.5 * np.minimum(1.0, np.log1p(playtime) / np.log1p(100))) * seed_scale
+        confidence = 1.0 + self.alpha * strength
+        preference = (ratings >= 3).astype(np.float64)
+        # A = YtY + sum (c - 1) y y^T ; b = sum c p y
+        return confidence - 1.0, confidence * preference
+
+    # --- Training ---
+    @classmethod
+    def fit(cls, game_ids, interactions, **params):
+        """Trains on an interactions DataFrame (user_id, game_id, rating[, playtime, implicit])."""
+        model = cls(game_ids, **params)
+        model._load_observations(interactions)
+        model._train()
+        return model
+
+    def _load_observations(self, interactions):
+        if interactions is None or interactions.empty:
+            return
+        ratings, playtime, implicit = _interaction_values(interactions)
+        rows = pd.Index(self.game_ids).get_indexer(pd.to_numeric(interactions["game_id"], errors="coerce"))
+        users = interactions["user_id"].astype(str).to_numpy()
+        valid = (rows >= 0) & ~np.isnan(ratings)
+        for u, r, rating, pt, imp in zip(users[valid], rows[valid], ratings[valid], playtime[valid], implicit[valid]):
+            # Last row wins for repeated (user, game) pairs
+            self.observations.setdefault(u, {})[int(r)] = (float(rating), float(pt), bool(imp))
+
+    def _csr(self):
+        """Observations as user-major CSR arrays: user ids, indptr, item rows, weights, targets."""
+        users = list(self.observations)
+        lengths = np.array([len(self.observations[u]) for u in users], dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        items = np.fromiter((r for u in users for r in self.observations[u]), dtype=np.int64, count=int(indptr[-1]))
+        values = np.array([v for u in users for v in self.observations[u].values()], dtype=np.float64).reshape(-1, 3)
+        weights, targets = self._weights(values[:, 0], values[:, 1], values[:, 2].astype(bool))
+        return users, indptr, items, weights, targets
+
+    def _solve(self, fixed, indptr, indices, weights, targets, budget=1 << 21):
+        """
+        Re-solves every row of one side against the fixed factors of the other side.
+        Rows are batched by observation count (within 2x of each other) and padded to a
+        (batch, length, f) block, so each batch's Y^T W Y is one batched matmul; a batch
+        holds at most `budget` padded factor entries.
+        """
+        n_rows, f = len(indptr) - 1, self.factors
+        out = np.zeros((n_rows, f))
+        base = fixed.T @ fixed if self.mode == "implicit" else np.zeros((f, f))
+        base = base + self.reg * np.eye(f)
+        counts = np.diff(indptr)
+
+        rows = np.flatnonzero(counts)
+        rows = rows[np.argsort(counts[rows], kind="stable")]
+        buckets = np.ceil(np.log2(counts[rows])).astype(np.int64)
+        for bucket in np.unique(buckets):
+            in_bucket = rows[buckets == bucket]
+            length = int(counts[in_bucket].max())
+            step = max(1, budget // (length * f))
+            for start in range(0, len(in_bucket), step):
+                batch = in_bucket[start:start + step]
+                lens = counts[batch]
+                offsets = np.arange(length)
+                valid = offsets[None, :] < lens[:, None]
+                obs = indptr[batch][:, None] + np.minimum(offsets[None, :], lens[:, None] - 1)
+                y = fixed[indices[obs]]                     # (batch, length, f)
+                w = np.where(valid, weights[obs], 0.0)      # padding gets zero weight and target
+                t = np.where(valid, targets[obs], 0.0)
+                A = np.matmul(y.transpose(0, 2, 1) * w[:, None, :], y) + base
+                b = np.einsum("bl,blf->bf", t, y)
+                out[batch] = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+        return out
+
+    def _train(self):
+        users, indptr, items, weights, targets = self._csr()
+        n_items, f = len(self.game_ids), self.factors
+        rng = np.random.default_rng(self.seed)
+        item_f = rng.normal(0, 0.1, (n_items, f))
+        user_f = np.zeros((len(users), f))
+
+        # Item-major view of the same observations
+        order = np.argsort(items, kind="stable")
+        item_indptr = np.concatenate([[0], np.cumsum(np.bincount(items, minlength=n_items))])
+        user_of = np.repeat(np.arange(len(users)), np.diff(indptr))
+
+        for _ in range(self.iterations):
+            user_f = self._solve(item_f, indptr, items, weights, targets)
+            item_f = self._solve(user_f, item_indptr, user_of[order], weights[order], targets[order])
+
+        self.item_factors = item_f.astype(np.float32)
+        self.user_factors = user_f.astype(np.float32)
+        self.user_index = {u: i for i, u in enumerate(users)}
+        self._gram = item_f.T @ item_f
+
+    # --- Fold-in (one user, item factors fixed) ---
+    def _fold_in(self, key):
+        obs = self.observations.get(key)
+        if not obs:
+            self.observations.pop(key, None)
+            row = self.user_index.get(key)
+            if row is not None: self.user_factors[row] = 0
+            return
+        rows = np.fromiter(obs.keys(), dtype=np.int64, count=len(obs))
+        values = np.array(list(obs.values()), dtype=np.float64)
+        w, t = self._weights(values[:, 0], values[:, 1], values[:, 2].astype(bool))
+        y = self.item_factors[rows].astype(np.float64)
+        A = (self._gram if self.mode == "implicit" else 0) + (w[:, None] * y).T @ y + self.reg * np.eye(self.factors)
+        vector = np.linalg.solve(A, (t[:, None] * y).sum(axis=0)).astype(np.float32)
+
+        row = self.user_index.get(key)
+        if row is None:
+            row = len(self.user_index)
+            if row >= len(self.user_factors):
+                grown = np.zeros((max(16, 2 * len(self.user_factors)), self.factors), dtype=np.float32)
+                grown[:len(self.user_factors)] = self.user_factors
+                self.user_factors = grown
+            self.user_index[key] = row
+        self.user_factors[row] = vector
+
+    def apply(self, removed=None, added=None):
+        """Updates the observations of every user in the given rows, then folds those users in."""
+        touched = set()
+        with self._lock:
+            for frame, sign in [(removed, -1), (added, +1)]:
+                if frame is None or frame.empty: continue
+                ratings, playtime, implicit = _interaction_values(frame)
+                for u, gid, rating, pt, imp in zip(frame["user_id"].astype(str), frame["game_id"], ratings, playtime, implicit):
+                    try: row = self.pos.get(int(gid))
+                    except (TypeError, ValueError): continue
+                    if row is None or np.isnan(rating): continue
+                    touched.add(u)
+                    if sign < 0: self.observations.get(u, {}).pop(row, None)
+                    else: self.observations.setdefault(u, {})[row] = (float(rating), float(pt), bool(imp))
+            for u in touched:
+                self._fold_in(u)
+        return touched
+
+    def reindexed(self, game_ids):
+        """
+        A copy aligned to a new catalog row order, or self when the order is unchanged.
+        Games new to the model start with zero factors until the next retrain.
+        """
+        game_ids = np.asarray(game_ids, dtype=np.int64)
+        with self._lock:
+            if np.array_equal(game_ids, self.game_ids):
+                return self
+            model = ALSModel(game_ids, self.factors, self.reg, self.alpha, self.iterations, self.mode, self.seed)
+            old = pd.Index(self.game_ids).get_indexer(game_ids)
+            known = old >= 0
+            model.item_factors[known] = self.item_factors[old[known]]
+            old_to_new = {int(o): i for i, o in enumerate(old) if o >= 0}
+            model.observations = {
+                u: {old_to_new[r]: v for r, v in obs.items() if r in old_to_new} for u, obs in self.observations.items()
+            }
+            model.user_factors = self.user_factors.copy()
+            model.user_index = dict(self.user_index)
+        f64 = model.item_factors.astype(np.float64)
+        model._gram = f64.T @ f64
+        return model
+
+    # --- Scoring ---
+    def has_user(self, user_id):
+        return str(user_id) in self.user_index and str(user_id) in self.observations
+
+    def user_scores(self, user_id):
+        """Collaborative score of every catalog game for one user (min-max scaled to 0-1), or None."""
+        scores, known = self.users_scores([user_id])
+        return scores[0] if known[0] else None
+
+    def users_scores(self, user_ids):
+        """
+        user_scores() for many users with one (n_items x f) @ (f x n_users) product.
+        Returns (scores, known): rows of unknown users are zero and known[i] is False.
+        """
+        index, factors = self.user_index, self.user_factors
+        rows = [index.get(str(u)) if str(u) in self.observations else None for u in user_ids]
+        known = np.array([r is not None for r in rows], dtype=bool)
+        scores = np.zeros((len(rows), len(self.game_ids)), dtype=np.float64)
+        if known.any():
+            raw = (self.item_factors @ factors[[r for r in rows if r is not None]].T).T
+            lo, hi = raw.min(axis=1, keepdims=True), raw.max(axis=1, keepdims=True)
+            spread = np.where(hi > lo, hi - lo, 1.0)
+            scores[known] = np.where(hi > lo, (raw - lo) / spread, 0.0)
+        return scores, known
+
+
+class BackgroundTrainer:
+    """
+    Retrains a model every `interval` seconds on a daemon thread and hands it to on_swap().
+    Writes that land while a model trains (or is being swapped in) are recorded and replayed
+    onto it, so the new model never loses a rating. on_swap() may return the model it actually
+    published (e.g. a reindexed copy); the late writes are replayed onto that one.
+    on_swap() and the replays run outside the trainer's lock: record() is called under the
+    caller's own locks (SnapshotManager.write_lock), which on_swap() may take too.
+    """
+
+    def __init__(self, train, on_swap, interval=3600.0):
+        self.train = train
+        self.on_swap = on_swap
+        self.interval = interval
+        self.pending = []  # (removed, added) applied since the current training run started
+        self.training = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def record(self, removed=None, added=None):
+        with self._lock:
+            if self.training:
+                self.pending.append((removed, added))
+
+    def retrain_now(self):
+        self._wake.set()
+
+    def start(self, immediate=False):
+        """immediate=True trains a first model right away (even when periodic retraining is off)."""
+        if self._thread is None and (self.interval > 0 or immediate):
+            self._thread = threading.Thread(target=self._run, args=(immediate,), name="als-retrain", daemon=True)
+            self._thread.start()
+        return self
+
+    def run_once(self):
+        with self._lock:
+            self.training, self.pending = True, []
+        try:
+            model = self.train()
+        except Exception as e:
+            print(f"Warning: Collaborative model retrain failed: {e}")
+            with self._lock:
+                self.training = False
+            return None
+        self._replay(model)
+        live = self.on_swap(model) or model
+        # Writes racing the swap may have reached only the old model: replay them (in order,
+        # apply() is idempotent) until none are left, then stop recording
+        self._replay(live, finish=True)
+        return live
+
+    def _replay(self, model, finish=False):
+        """Applies the recorded writes to `model` in batches until a check under the lock finds none."""
+        while True:
+            with self._lock:
+                batch, self.pending = self.pending, []
+                if not batch:
+                    if finish:
+                        self.training = False
+                    return
+            for removed, added in batch:
+                model.apply(removed=removed, added=added)
+
+    def _run(self, immediate=False):
+        if immediate:
+            self.run_once()
+        while self.interval > 0:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.run_once()
@@ -0,0 +1,508 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ann import ClusteredIndex
+from artifacts import load_or_build
+from catalog import build_catalog, copy_catalog
+from collab import ALSModel, RatingAggregate
+from keywords import KeywordIndex
+from metrics import METRICS
+from neighbours import top_k_neighbours, dense_rows
+from search import TextSearch
+
+# ---------------------------------------------------------
+# RECOMMENDER ENGINE (Data + matrices + scoring, no web app)
+# ---------------------------------------------------------
+# Everything the recommender needs, minus Flask. Offline jobs (evaluation,
+# batch scoring, benchmarks) build an engine for any dataset directory and
+# only pay for what they touch: tables, matrices, the catalog and the
+# popularity aggregate are each built on first access.
+#
+#   engine = RecommenderEngine("dataset", tables=["features", "text", "interactions"])
+#   engine.get_hybrid_scores({"rpg": 1.0})
+#   engine.get_hybrid_scores({"rpg": 1.0}, user_id="alice")  # personalized collaborative signal
+
+ALL_TABLES = ["games", "features", "text", "metadata", "interactions", "accounts", "users"]
+
+# Tables compute_matrices() reads (they decide which matrices exist, so they are part of the artifact tag)
+MATRIX_TABLES = ["features", "text"]
+
+# Rows per chunk when the startup aggregates stream a store's interactions (see interaction_frames)
+STARTUP_CHUNK_ROWS = int(os.environ.get("STARTUP_CHUNK_ROWS", 100_000))
+
+# Cells (profiles x catalog games) per dense scoring pass; content, text and final scores are each
+# one float64 matrix this size (64 MB at the default), so batches are split to stay under it
+SCORE_CHUNK_CELLS = int(os.environ.get("SCORE_CHUNK_CELLS", 1 << 23))
+
+
+# ---------------------------------------------------------
+# 1. LOAD DATASETS
+# ---------------------------------------------------------
+def load_data(dataset_dir="dataset", tables=None):
+    """Helper to load data with safe fallbacks (only the requested tables, default all)"""
+    tables = ALL_TABLES if tables is None else list(tables)
+    path = lambda name: os.path.join(dataset_dir, name)
+    data = {}
+    try:
+        # Core Data
+        if "games" in tables: data["games"] = pd.read_csv(path("games.csv"))
+        if "features" in tables: data["features"] = pd.read_csv(path("game_features.csv"))
+        if "text" in tables: data["text"] = pd.read_csv(path("game_text.csv"))
+        if "metadata" in tables: data["metadata"] = pd.read_csv(path("game_metadata.csv"))
+
+        # User Interactions
+        if "interactions" in tables:
+            if os.path.exists(path("user_interactions.csv")):
+                data["interactions"] = pd.read_csv(path("user_interactions.csv"))
+            elif os.path.exists(path("ratings.csv")):
+                # Fallback for older dataset versions
+                df = pd.read_csv(path("ratings.csv"))
+                df["playtime"] = 0
+                data["interactions"] = df
+            else:
+                data["interactions"] = pd.DataFrame(columns=["user_id", "game_id", "rating", "playtime"])
+
+        # Accounts
+        if "accounts" in tables:
+            if os.path.exists(path("users_accounts.csv")):
+                data["accounts"] = pd.read_csv(path("users_accounts.csv"))
+            else:
+                data["accounts"] = pd.DataFrame(columns=["username", "password_hash"])
+
+        # User Preferences (Saved Survey Answers)
+        if "users" in tables:
+            if os.path.exists(path("users.csv")):
+                data["users"] = pd.read_csv(path("users.csv"))
+            else:
+                feature_cols = data["features"].columns.drop("game_id", errors='ignore') if "features" in data else []
+                data["users"] = pd.DataFrame(columns=["user_id"] + list(feature_cols))
+
+    except Exception as e:
+        print(f"CRITICAL DATA LOAD ERROR: {e}")
+        # Initialize empties to prevent crash
+        empties = {
+            "games": pd.DataFrame(columns=["game_id", "title"]),
+            "features": pd.DataFrame(),
+            "text": pd.DataFrame(),
+            "metadata": pd.DataFrame(),
+            "interactions": pd.DataFrame(columns=["user_id", "game_id", "rating", "playtime"]),
+            "accounts": pd.DataFrame(columns=["username", "password_hash"]),
+            "users": pd.DataFrame(columns=["user_id"]),
+        }
+        data = {name: empties[name] for name in tables if name in empties}
+
+    return data
+
+
+# ---------------------------------------------------------
+# 2. PRE-COMPUTE MATRICES
+# ---------------------------------------------------------
+def matrix_params():
+    """Build settings for compute_matrices() (also part of the artifact tag, see artifacts.py)."""
+    return {
+        # Similarities are kept as per-item top-K neighbour lists (see neighbours.py), never as N x N matrices
+        "neighbours_k": int(os.environ.get("NEIGHBOURS_K", 50)),
+        # ANN candidate index (large catalogs only, see ann.py)
+        "ann_enabled": os.environ.get("ANN_ENABLED", "auto").lower(),  # auto|on|off
+        "ann_min_items": int(os.environ.get("ANN_MIN_ITEMS", 20000)),
+        "ann_probe": int(os.environ.get("ANN_PROBE", 8)),
+        "ann_candidates": int(os.environ.get("ANN_CANDIDATES", 300)),
+        "ann_target_recall": float(os.environ.get("ANN_TARGET_RECALL", 0.95)),
+    }
+
+def collab_params():
+    """Settings for the matrix-factorization collaborative model (see collab.ALSModel)."""
+    return {
+        "mode": os.environ.get("COLLAB_MODE", "implicit").lower(),  # implicit|explicit|off
+        "factors": int(os.environ.get("COLLAB_FACTORS", 32)),
+        "reg": float(os.environ.get("COLLAB_REG", 0.1)),
+        "alpha": float(os.environ.get("COLLAB_ALPHA", 10.0)),
+        "iterations": int(os.environ.get("COLLAB_ITERATIONS", 10)),
+    }
+
+def compute_matrices(db, params=None):
+    params = params or matrix_params()
+    matrices = {}
+    n_neighbours = params["neighbours_k"]
+    features = db.get("features", pd.DataFrame())
+    text = db.get("text", pd.DataFrame())
+
+    # Feature Matrix
+    if not features.empty:
+        feat_mat = features.set_index("game_id").sort_index()
+        matrices["feature_matrix"] = feat_mat
+        # Row-normalized copy for cosine scoring with a plain matrix product
+        values = feat_mat.to_numpy(dtype=np.float64)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        matrices["feature_norm"] = np.divide(values, norms, out=np.zeros_like(values), where=norms > 0)
+        matrices["content_nbrs"] = top_k_neighbours(values, n_neighbours)
+
+    # Text Matrix
+    if not text.empty and not features.empty:
+        # sklearn is imported here so that jobs loading saved artifacts never pay for it
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        tfidf = TfidfVectorizer(stop_words='english')
+        text_sorted = text.set_index("game_id").reindex(features.set_index("game_id").sort_index().index).fillna('')
+        tfidf_matrix = tfidf.fit_transform(text_sorted['description'])
+        matrices["tfidf"] = tfidf
+        matrices["tfidf_matrix"] = tfidf_matrix
+        matrices["text_nbrs"] = top_k_neighbours(tfidf_matrix, n_neighbours)
+
+    # ANN candidate index (large catalogs only, see ann.py)
+    ann_mode = params["ann_enabled"]
+    n_items = len(matrices.get("feature_norm", []))
+    if n_items and (ann_mode == "on" or (ann_mode == "auto" and n_items >= params["ann_min_items"])):
+        index = ClusteredIndex(
+            matrices["feature_norm"],
+            n_probe=params["ann_probe"],
+            n_candidates=params["ann_candidates"],
+        )
+        recall = index.tune(params["ann_target_recall"])
+        print(f"ANN index: {index.n_lists} lists, n_probe={index.n_probe}, "
+              f"{index.n_candidates} candidates, recall@10 vs brute force={recall:.3f}")
+        matrices["ann"] = index
+    return matrices
+
+
+# ---------------------------------------------------------
+# 3. LOGIC
+# ---------------------------------------------------------
+def top_k_scores(scores, k, mask=None):
+    """
+    Top-k entries of a score Series (descending, ties broken by catalog order).
+    Only rows where `mask` is True are considered; uses a partial partition, not a full sort.
+    """
+    values = scores.to_numpy()
+    candidates = np.arange(len(values)) if mask is None else np.flatnonzero(mask[:len(values)])
+    cand_values = values[candidates]
+
+    if k is not None and len(candidates) > k:
+        if k <= 0: return scores.iloc[[]]
+        kth = -np.partition(-cand_values, k - 1)[k - 1]
+        above = candidates[cand_values > kth]
+        tied = candidates[cand_values == kth][:k - len(above)]
+        candidates = np.concatenate([above, tied])
+        cand_values = values[candidates]
+
+    order = candidates[np.lexsort((candidates, -cand_values))]
+    return scores.iloc[order]
+
+
+class RecommenderEngine:
+    """
+    Lazily-built recommender state for one dataset directory.
+
+    `tables` limits which CSVs are read (default: all of them). `store` (see storage.py)
+    replaces user_interactions.csv as the source of ratings: its rows are streamed into the
+    aggregates (interaction_frames()) and never kept in `db`. `persist=False` skips the
+    artifact cache and always builds the matrices in memory. `lazy_collab=False` never fits
+    the collaborative model in-line: it stays None until one is handed in (the web app trains
+    it on a background thread and serves popularity meanwhile).
+    """
+
+    def __init__(self, dataset_dir="dataset", tables=None, params=None, store=None, persist=True, rebuild=None,
+                 collab_settings=None, lazy_collab=True):
+        self.dataset_dir = dataset_dir
+        self.tables = ALL_TABLES if tables is None else list(tables)
+        self.params = params or matrix_params()
+        self.collab_settings = collab_settings or collab_params()
+        self.store = store
+        self.persist = persist
+        self.rebuild = rebuild
+        self.lazy_collab = lazy_collab
+        self._db = None
+        self._matrices = None
+        self._catalog = None
+        self._popularity = None
+        self._collab = None
+        self._keywords = None
+        self._text_search = None
+        self._lock = threading.RLock()
+
+    # --- Lazily-built state ---
+    @property
+    def db(self):
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    csv_tables = [t for t in self.tables if not (t == "interactions" and self.store is not None)]
+                    with METRICS.stage("startup", "load_data"):
+                        self._db = load_data(self.dataset_dir, csv_tables)
+        return self._db
+
+    def interaction_frames(self, chunk_rows=STARTUP_CHUNK_ROWS):
+        """Every rating row as DataFrame chunks: streamed from the store, or db["interactions"] in one piece."""
+        if "interactions" not in self.tables:
+            return []
+        if self.store is not None:
+            return self.store.iter_interactions(chunk_rows)
+        return [self.db["interactions"]]
+
+    @property
+    def matrices(self):
+        if self._matrices is None:
+            with self._lock:
+                if self._matrices is None:
+                    self._matrices = self.build_matrices(self.db)
+        return self._matrices
+
+    def build_matrices(self, db):
+        """compute_matrices() for `db`, memory-mapped from artifacts/ when the catalog CSVs are unchanged since the last build."""
+        def build():
+            with METRICS.stage("startup", "compute_matrices"):
+                return compute_matrices(db, self.params)
+
+        if not self.persist:
+            return build()
+        params = {**self.params, "tables": [t for t in MATRIX_TABLES if t in self.tables]}
+        with METRICS.stage("startup", "load_matrices"):
+            return load_or_build(self.dataset_dir, build, params=params, rebuild=self.rebuild)
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    db = self.db
+                    with METRICS.stage("startup", "build_catalog"):
+                        self._catalog = build_catalog(db)
+        return self._catalog
+
+    @property
+    def keywords(self):
+        """Inverted index over the catalog's descriptions (see keywords.py)."""
+        if self._keywords is None:
+            with self._lock:
+                if self._keywords is None:
+                    catalog = self.catalog
+                    with METRICS.stage("startup", "keyword_index"):
+                        self._keywords = KeywordIndex.from_catalog(catalog)
+        return self._keywords
+
+    @property
+    def text_search(self):
+        """Query ranking over the TF-IDF matrix and titles (see search.py)."""
+        if self._text_search is None:
+            with self._lock:
+                if self._text_search is None:
+                    catalog, matrices = self.catalog, self.matrices
+                    with METRICS.stage("startup", "search_index"):
+                        self._text_search = TextSearch(catalog, matrices.get("tfidf"), matrices.get("tfidf_matrix"))
+        return self._text_search
+
+    @property
+    def popularity(self):
+        if self._popularity is None:
+            with self._lock:
+                if self._popularity is None:
+                    game_ids = self.catalog["game_ids"]
+                    with METRICS.stage("startup", "popularity"):
+                        self._popularity = RatingAggregate.from_interactions(game_ids, self.interaction_frames())
+        return self._popularity
+
+    @property
+    def collab(self):
+        """
+        Matrix-factorization model (None when COLLAB_MODE=off). Fitted on first use (the first
+        scored user), or None until a model is handed in with lazy_collab=False.
+        """
+        if self._collab is None and self.lazy_collab and self.collab_settings["mode"] != "off":
+            with self._lock:
+                if self._collab is None:
+                    with METRICS.stage("startup", "collab"):
+                        self._collab = self.train_collab()
+        return self._collab
+
+    def train_collab(self, interactions=None):
+        """Fits a fresh ALSModel on `interactions` (default: the store's current ratings, dropped after the fit)."""
+        if interactions is None:
+            interactions = self.store.all_interactions() if self.store is not None else self.db.get("interactions")
+        params = {k: v for k, v in self.collab_settings.items() if k != "mode"}
+        return ALSModel.fit(self.catalog["game_ids"], interactions, mode=self.collab_settings["mode"], **params)
+
+    def load(self, aggregates=True):
+        """
+        Builds everything up front (what the web app does at startup) except the collaborative
+        model, which is fitted on first use or trained in the background. Returns self.
+        aggregates=False also skips popularity (a reload carries it over).
+        """
+        self.db, self.matrices, self.catalog, self.keywords, self.text_search
+        if aggregates:
+            self.popularity
+        return self
+
+    def adopt_aggregates(self, other):
+        """Takes over another snapshot's live rating aggregates, re-aligned to this catalog's rows."""
+        game_ids = self.catalog["game_ids"]
+        self._popularity = other.popularity.reindexed(game_ids)
+        if other._collab is not None:
+            self._collab = other._collab.reindexed(game_ids)
+
+    def clone(self):
+        """
+        Shallow copy sharing every table, matrix and the catalog. The copy gets its own
+        db / matrices dicts and catalog arrays (see catalog.copy_catalog), so entries can be
+        replaced on it to derive a new snapshot while this one keeps serving unchanged.
+        """
+        copy = RecommenderEngine(
+            self.dataset_dir, self.tables, self.params, self.store, self.persist, self.rebuild, self.collab_settings,
+            self.lazy_collab,
+        )
+        copy._db = dict(self.db)
+        copy._matrices = dict(self.matrices)
+        copy._catalog = copy_catalog(self.catalog)
+        copy._popularity, copy._collab = self._popularity, self._collab
+        # _keywords / _text_search are left unset: an edit may change texts, so the copy re-indexes on first use
+        return copy
+
+    # --- Scoring ---
+    def score_chunk_rows(self):
+        """Profiles per dense scoring pass for this catalog (SCORE_CHUNK_CELLS // number of games, at least 1)."""
+        return max(1, SCORE_CHUNK_CELLS // max(len(self.catalog["game_ids"]), 1))
+
+    def get_hybrid_scores(self, prefs, alpha=0.4, beta=0.4, gamma=0.2, k=10, mask=None, user_id=None):
+        """
+        Top-k hybrid scores as a (game_id -> score) Series.
+        `mask` (bool array over catalog rows, see filter_mask) limits which games can be returned.
+        Scores are still normalized over the whole catalog, so filtering never changes a game's score.
+        With a `user_id` the model knows, the collaborative part is that user's factor scores
+        instead of the global popularity vector.
+        """
+        return self.get_hybrid_scores_batch([prefs], alpha, beta, gamma, k=k, masks=[mask], user_ids=[user_id])[0]
+
+    def get_hybrid_scores_batch(self, prefs_list, alpha=0.4, beta=0.4, gamma=0.2, k=10, masks=None, user_ids=None):
+        """
+        Scores many profiles at once: the profiles are stacked into one matrix and scored
+        against the normalized feature matrix in a single product. Returns one top-k
+        Series per profile, identical to calling get_hybrid_scores() on each.
+        """
+        matrices = self.matrices
+        if "feature_matrix" not in matrices: return [pd.Series() for _ in prefs_list]
+        feat_mat = matrices["feature_matrix"]
+        if not prefs_list: return []
+
+        # User Profiles (one row per profile, columns in feature-matrix order)
+        profiles = np.array([[float(p.get(col, 0)) for col in feat_mat.columns] for p in prefs_list], dtype=np.float64)
+        return self.score_profile_matrix(profiles, alpha, beta, gamma, k=k, masks=masks, user_ids=user_ids)
+
+    def collab_matrix(self, user_ids, n_rows):
+        """
+        Collaborative scores for a batch of users, one row per user over the first n_rows catalog rows.
+        Users without factors (guests, unknown users, COLLAB_MODE=off) get the popularity vector.
+        Returns a 1-D popularity vector when nobody in the batch has factors.
+        """
+        popularity = self.popularity.scores()[:n_rows]
+        if user_ids is None or all(u is None for u in user_ids) or self.collab is None:
+            return popularity
+        scores, known = self.collab.users_scores(list(user_ids))
+        if not known.any():
+            return popularity
+        collab = np.repeat(popularity[None, :], len(user_ids), axis=0)
+        collab[known] = scores[known, :n_rows]
+        return collab
+
+    def score_profile_matrix(self, profiles, alpha=0.4, beta=0.4, gamma=0.2, k=10, masks=None, user_ids=None):
+        """
+        get_hybrid_scores_batch() for profiles that are already an (n, n_features) array
+        in feature-matrix column order (offline jobs build these without per-user dicts).
+        Scored score_chunk_rows() profiles at a time, so a large batch never builds one huge matrix.
+        """
+        if "feature_matrix" not in self.matrices: return [pd.Series() for _ in profiles]
+        if len(profiles) == 0: return []
+        if masks is None: masks = [None] * len(profiles)
+        if user_ids is None: user_ids = [None] * len(profiles)
+        chunk = self.score_chunk_rows()
+        results = []
+        for start in range(0, len(profiles), chunk):
+            rows = slice(start, start + chunk)
+            results.extend(self._score_profile_chunk(profiles[rows], alpha, beta, gamma, k, masks[rows], user_ids[rows]))
+        return results
+
+    def _score_profile_chunk(self, profiles, alpha, beta, gamma, k, masks, user_ids):
+        matrices = self.matrices
+        feat_mat = matrices["feature_matrix"]
+        collab = self.collab_matrix(user_ids, len(feat_mat))
+        user_collab = lambda i: collab if collab.ndim == 1 else collab[i]
+
+        # L2-normalized like cosine_similarity does
+        profiles = np.asarray(profiles, dtype=np.float64)
+        norms = np.linalg.norm(profiles, axis=1, keepdims=True)
+        profiles = np.divide(profiles, norms, out=np.zeros_like(profiles), where=norms > 0)
+
+        # Large catalogs: score only ANN candidates (falls back to exact when too few are eligible)
+        results = [None] * len(profiles)
+        if "ann" in matrices:
+            for i, (profile, mask) in enumerate(zip(profiles, masks)):
+                rows = self.ann_candidate_rows(profile, mask, k)
+                if rows is None: continue
+                scores = self.hybrid_scores_for_rows(profile, rows, alpha, beta, gamma, collab=user_collab(i))
+                results[i] = top_k_scores(pd.Series(scores, index=feat_mat.index[rows]), k)
+        exact = [i for i, r in enumerate(results) if r is None]
+        if not exact: return results
+        profiles = profiles[exact]
+        if collab.ndim == 2: collab = collab[exact]
+
+        content = profiles @ matrices["feature_norm"].T
+
+        # Collaborative: each user's factor scores, or the running per-game average
+        # for users without factors (catalog rows line up with feat_mat)
+
+        # Text (similarity to each profile's best content match)
+        text = 0
+        if "text_nbrs" in matrices:
+            best = content.argmax(axis=1)
+            text = dense_rows(matrices["text_nbrs"], best, len(feat_mat))
+
+        final_scores = (alpha * content) + (beta * collab) + (gamma * text)
+
+        # Normalize (per profile)
+        lo = final_scores.min(axis=1, keepdims=True)
+        hi = final_scores.max(axis=1, keepdims=True)
+        spread = np.where(hi != lo, hi - lo, 1.0)
+        final_scores = np.where(hi != lo, (final_scores - lo) / spread, final_scores)
+
+        # Round to stabilize sorting
+        final_scores = final_scores.round(6)
+
+        for i, row in zip(exact, final_scores):
+            results[i] = top_k_scores(pd.Series(row, index=feat_mat.index), k, masks[i])
+        return results
+
+    def ann_candidate_rows(self, profile, mask, k):
+        """
+        Feature-matrix rows to score exactly for one normalized profile, or None for a full scan.
+        Narrow filters score their (few) eligible games directly; otherwise the ANN candidates
+        that pass the mask are used, as long as there are at least k of them.
+        """
+        index = self.matrices["ann"]
+        n = len(self.matrices["feature_norm"])
+        eligible = None if mask is None else mask[:n]
+        if eligible is not None and eligible.sum() <= index.n_candidates:
+            return np.flatnonzero(eligible)
+
+        rows = index.candidates(profile)
+        if eligible is not None:
+            rows = rows[eligible[rows]]
+        return rows if len(rows) >= k else None
+
+    def hybrid_scores_for_rows(self, profile, rows, alpha=0.4, beta=0.4, gamma=0.2, collab=None):
+        """
+        Hybrid scores of one normalized profile over a subset of feature-matrix rows (normalized within the subset).
+        `collab` is the profile's catalog-wide collaborative vector (default: popularity).
+        """
+        if len(rows) == 0: return np.zeros(0)
+        matrices = self.matrices
+        content = matrices["feature_norm"][rows] @ profile
+        collab = (self.popularity.scores() if collab is None else collab)[rows]
+        text = 0
+        if "text_nbrs" in matrices:
+            best = rows[content.argmax()]
+            text = dense_rows(matrices["text_nbrs"], [best], len(matrices["feature_norm"]))[0][rows]
+
+        final_scores = (alpha * content) + (beta * collab) + (gamma * text)
+        if final_scores.max() != final_scores.min():
+            final_scores = (final_scores - final_scores.min()) / (final_scores.max() - final_scores.min())
+        return final_scores.round(6)
@@ -1,17 +1,24 @@
+import argparse
+import json
 import pandas as pd
 import numpy as np
-from app import DB, MATRICES, get_hybrid_scores
+from engine import RecommenderEngine
 
-def evaluate_system(k=10):
+# Evaluation only needs the feature/text matrices and the ratings (no web app, no accounts)
+EVAL_TABLES = ["features", "text", "interactions"]
+
+def evaluate_system(k=10, engine=None):
     """
     Evaluates the hybrid recommender using historical user interactions.
     Metrics calculated @ K (Top K recommendations).
     """
     print("Starting System Evaluation...")
+    engine = engine or RecommenderEngine("dataset", tables=EVAL_TABLES)
+    get_hybrid_scores = engine.get_hybrid_scores
     
     # 1. Get necessary data
-    interactions = DB["interactions"]
-    features = DB["features"]
+    interactions = engine.db["interactions"]
+    features = engine.db["features"]
     
     if interactions.empty:
         print("Error: No user interactions found. Cannot evaluate.")
@@ -106,5 +113,184 @@ def evaluate_system(k=10):
     print(f"F1 Score:            {f1_score:.2f}")
     print("="*30)
 
+    return {"users": len(precisions), "precision": avg_precision, "recall": avg_recall, "hit_rate": avg_accuracy, "f1": f1_score}
+
+# ---------------------------------------------------------
+# BATCH EVALUATION (All users at once, several K per pass)
+# ---------------------------------------------------------
+# Same protocol as evaluate_system() (liked = rating >= 4, first half of a
+# user's liked games builds the profile, the second half is held out), but:
+#   - every held-out profile is built with array ops and scored in chunks
+#     through one matrix product (optionally spread over worker processes),
+#   - Precision / Recall / HitRate / NDCG / MAP are computed for every K
+#     from a single top-max(K) list per user.
+
+# Max (profiles x catalog) score entries per chunk
+CHUNK_BUDGET = 1 << 23
+
+def build_eval_cases(interactions, feature_ids, sample=None, seed=0):
+    """
+    Held-out split per user, in evaluate_system() order.
+    Returns (user_ids, train_rows, test_lists) where train_rows are feature-matrix rows.
+    """
+    relevant = interactions[interactions["rating"] >= 4]
+    feature_pos = pd.Index(feature_ids)
+    user_ids, train_rows, test_lists = [], [], []
+
+    for user_id, group in relevant.groupby("user_id"):
+        liked_game_ids = group["game_id"].tolist()
+        if len(liked_game_ids) < 2:
+            continue
+        cutoff = int(len(liked_game_ids) * 0.5)
+        train_ids, test_ids = liked_game_ids[:cutoff], liked_game_ids[cutoff:]
+        if not train_ids or not test_ids:
+            continue
+
+        # Same rows as features[features["game_id"].isin(train_ids)]
+        rows = np.unique(feature_pos.get_indexer(list(set(train_ids))))
+        rows = rows[rows >= 0]
+        if len(rows) == 0:
+            continue
+        user_ids.append(user_id)
+        train_rows.append(rows)
+        test_lists.append(test_ids)
+
+    if sample and sample < len(user_ids):
+        keep = np.sort(np.random.default_rng(seed).choice(len(user_ids), sample, replace=False))
+        user_ids = [user_ids[i] for i in keep]
+        train_rows = [train_rows[i] for i in keep]
+        test_lists = [test_lists[i] for i in keep]
+    return user_ids, train_rows, test_lists
+
+def profile_matrix(feature_values, train_rows):
+    """Mean feature vector of each user's training games, as one (n_users, n_features) array."""
+    if not train_rows:
+        return np.zeros((0, feature_values.shape[1]))
+    lengths = np.array([len(r) for r in train_rows])
+    flat = np.concatenate(train_rows)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    sums = np.add.reduceat(feature_values[flat], starts, axis=0)
+    return sums / lengths[:, None]
+
+def ranking_metrics(recommended, test_lists, ks):
+    """
+    Mean Precision/Recall/HitRate/NDCG/MAP @ each K.
+    `recommended` is an (n_users, max K) array of game ids (-1 = no recommendation).
+    """
+    n, max_k = recommended.shape
+    hits = np.zeros((n, max_k), dtype=bool)
+    for i, test_ids in enumerate(test_lists):
+        hits[i] = np.isin(recommended[i], list(set(test_ids)))
+    n_test = np.array([len(t) for t in test_lists], dtype=np.float64)
+
+    cum_hits = np.cumsum(hits, axis=1)
+    discounts = 1.0 / np.log2(np.arange(2, max_k + 2))
+    dcg = np.cumsum(hits * discounts, axis=1)
+    precision_at_rank = cum_hits / np.arange(1, max_k + 1)
+    ap_sum = np.cumsum(hits * precision_at_rank, axis=1)
+
+    results = {}
+    for k in ks:
+        num_hits = cum_hits[:, k - 1]
+        ideal = np.minimum(n_test, k).astype(int)
+        idcg = np.cumsum(discounts)[ideal - 1]
+        results[k] = {
+            "precision": float(np.mean(num_hits / k)),
+            "recall": float(np.mean(num_hits / n_test)),
+            "hit_rate": float(np.mean(num_hits > 0)),
+            "ndcg": float(np.mean(dcg[:, k - 1] / idcg)),
+            "map": float(np.mean(ap_sum[:, k - 1] / ideal)),
+        }
+    return results
+
+# Worker processes get the parent's engine through fork (matrices are shared, not pickled)
+_WORKER_ENGINE = None
+
+def _score_chunk(args):
+    profiles, max_k = args
+    return _top_ids(_WORKER_ENGINE, profiles, max_k)
+
+def _top_ids(engine, profiles, max_k):
+    out = np.full((len(profiles), max_k), -1, dtype=np.int64)
+    for i, scores in enumerate(engine.score_profile_matrix(profiles, k=max_k)):
+        ids = scores.index.to_numpy()[:max_k]
+        out[i, :len(ids)] = ids
+    return out
+
+def evaluate_batch(engine=None, ks=(5, 10, 20), workers=1, sample=None, seed=0):
+    """Batch evaluation over every eligible user. Returns {"users": n, "metrics": {K: {...}}}."""
+    global _WORKER_ENGINE
+    engine = engine or RecommenderEngine("dataset", tables=EVAL_TABLES)
+    ks = sorted(set(int(k) for k in ks))
+    max_k = ks[-1]
+
+    feat_mat = engine.matrices["feature_matrix"]
+    user_ids, train_rows, test_lists = build_eval_cases(
+        engine.db["interactions"], feat_mat.index.to_numpy(), sample=sample, seed=seed
+    )
+    if not user_ids:
+        print("Error: No users with enough liked games. Cannot evaluate.")
+        return {"users": 0, "metrics": {}}
+
+    profiles = profile_matrix(feat_mat.to_numpy(dtype=np.float64), train_rows)
+    engine.popularity  # built once here, not per chunk / worker
+    chunk = max(1, CHUNK_BUDGET // max(len(feat_mat), 1))
+    if workers > 1:
+        # At least one chunk per worker, even when every profile would fit in one chunk
+        chunk = min(chunk, -(-len(profiles) // workers))
+    chunks = [(profiles[i:i + chunk], max_k) for i in range(0, len(profiles), chunk)]
+    workers = min(workers, len(chunks))
+    print(f"Evaluating {len(user_ids)} users in {len(chunks)} chunk(s), {workers} worker(s)...")
+
+    if workers > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        _WORKER_ENGINE = engine
+        ctx = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            parts = list(pool.map(_score_chunk, chunks))
+        _WORKER_ENGINE = None
+    else:
+        parts = [_top_ids(engine, p, k) for p, k in chunks]
+
+    recommended = np.concatenate(parts)
+    return {"users": len(user_ids), "metrics": ranking_metrics(recommended, test_lists, ks)}
+
+def print_batch_results(result):
+    print("\n" + "="*54)
+    print(f" BATCH EVALUATION RESULTS ({result['users']} users)")
+    print("="*54)
+    print(f"{'K':>4} {'Precision':>10} {'Recall':>8} {'HitRate':>8} {'NDCG':>8} {'MAP':>8}")
+    for k, m in result["metrics"].items():
+        print(f"{k:>4} {m['precision']:>10.4f} {m['recall']:>8.4f} {m['hit_rate']:>8.4f} {m['ndcg']:>8.4f} {m['map']:>8.4f}")
+    print("="*54)
+
 if __name__ == "__main__":
-    evaluate_system(k=10)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Offline evaluation of the hybrid recommender.")
+    parser.add_argument("--dataset", default="dataset", help="Dataset directory (default: dataset)")
+    parser.add_argument("--k", type=int, default=10, help="Cut-off for the @K metrics (legacy mode)")
+    parser.add_argument("--ks", default="5,10,20", help="Comma-separated cut-offs (batch mode)")
+    parser.add_argument("--mode", choices=["batch", "legacy", "compare"], default="batch",
+                        help="batch: vectorized evaluation; legacy: the per-user loop; compare: run both at --k")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for batch scoring")
+    parser.add_argument("--sample", type=int, default=None, help="Evaluate a random sample of N users (batch mode)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --sample")
+    parser.add_argument("--output", default=None, help="Also write the batch results to this JSON file")
+    args = parser.parse_args()
+
+    engine = RecommenderEngine(args.dataset, tables=EVAL_TABLES)
+    if args.mode in ["legacy", "compare"]:
+        legacy = evaluate_system(k=args.k, engine=engine)
+    if args.mode in ["batch", "compare"]:
+        ks = [int(k) for k in args.ks.split(",") if k.strip()]
+        if args.mode == "compare": ks = sorted(set(ks) | {args.k})
+        result = evaluate_batch(engine, ks=ks, workers=args.workers, sample=args.sample, seed=args.seed)
+        print_batch_results(result)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(result, f, indent=2)
+    if args.mode == "compare":
+        batch = result["metrics"].get(args.k, {})
+        same = bool(legacy) and all(abs(legacy[name] - batch.get(name, -1)) < 1e-12 for name in ["precision", "recall", "hit_rate"])
+        print(f"Batch matches legacy @ {args.k}: {same}")
\ No newline at end of file
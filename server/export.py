@@ -0,0 +1,40 @@
+import json
+
+import numpy as np
+
+from listing import records
+
+# ---------------------------------------------------------
+# NDJSON EXPORTS (Streamed in fixed-size chunks)
+# ---------------------------------------------------------
+# Analytics jobs pull whole tables; building those as one list + jsonify()
+# holds every row (twice) in memory before the first byte goes out. The
+# /export/* routes instead stream newline-delimited JSON from generators:
+# rows are read, converted and serialized EXPORT_CHUNK_ROWS at a time, so
+# memory stays at one chunk however many rows are exported.
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def ndjson(batches):
+    """Yields one bytes chunk per batch (a list of dicts): one JSON document per line."""
+    for batch in batches:
+        if batch:
+            yield ("\n".join(json.dumps(item, default=_json_default) for item in batch) + "\n").encode("utf-8")
+
+
+def row_slices(rows, chunk_rows):
+    """`rows` (an index array) in consecutive slices of at most chunk_rows."""
+    for start in range(0, len(rows), chunk_rows):
+        yield rows[start:start + chunk_rows]
+
+
+def frame_batches(frames):
+    """Lists of row dicts from an iterator of DataFrame chunks (NaN -> null)."""
+    for frame in frames:
+        frame = frame.astype(object).where(frame.notna(), None)
+        yield records({c: frame[c].to_numpy() for c in frame.columns})
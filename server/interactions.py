@@ -0,0 +1,286 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# INTERACTION STORE (Integer-coded, grouped by user)
+# ---------------------------------------------------------
+# The CSV backend used to keep user_interactions.csv as a DataFrame and find a
+# user's rows with `df["user_id"].astype(str) == str(user_id)`: a string copy
+# and a scan of the whole column on every /user/history, /rate, /survey ...
+# Here the table is columnar and compact instead:
+#   - users and games get dense int codes (user_codes / game_codes),
+#   - rows are grouped by user, CSR style: the rows of user code u are
+#     [offsets[u], offsets[u + 1]) of game (int32 code), rating and playtime
+#     (float32) and implicit (int8) - 13 bytes per interaction,
+#   - reading one user is a dict lookup plus array slices,
+#   - a write replaces that user's rows with new small arrays (an override);
+#     once overrides pile up they are merged back into the base arrays in one
+#     O(rows) pass. Arrays are never edited in place, so slices handed out
+#     earlier stay valid.
+# Users keep their original user_id value (first seen); lookups compare as str.
+# Writes, merge() and to_frame() must be serialized by the caller (CsvStorage
+# holds its lock); single-user reads need no lock.
+# `implicit` is stored as 1 (True), 0 (False) or -1 (unset) and read back as
+# True / False / None, so rows the CSV left empty are written back empty.
+# Rows whose game_id isn't a number can't be coded; from_frame() drops them
+# with a warning rather than inventing an id.
+
+INTERACTION_COLS = ["user_id", "game_id", "rating", "playtime", "implicit"]
+
+
+def _float32(values):
+    return pd.to_numeric(pd.Series(values, dtype=object if isinstance(values, list) else None), errors="coerce").to_numpy(dtype=np.float32)
+
+
+_IMPLICIT_VALUES = np.array([None, False, True], dtype=object)  # stored code + 1 -> value
+
+
+def _implicit(values):
+    """int8 codes: 1 for True / "True" (any case), 0 for False / "False", -1 for NaN, None and empty cells."""
+    values = pd.Series(values, dtype=object if isinstance(values, list) else None)
+    if values.dtype == bool:
+        return values.to_numpy().astype(np.int8)
+    text = values.astype(str).str.strip().str.lower()
+    return np.where(text == "true", 1, np.where(text == "false", 0, -1)).astype(np.int8)
+
+
+def _regroup(row_user, columns, overrides):
+    """
+    Rows of `columns` (row_user: user code of each row), each override replacing all rows of
+    its user, re-grouped by user code (stable). Returns (codes, columns).
+    """
+    keep = ~np.isin(row_user, np.fromiter(overrides, dtype=np.int64, count=len(overrides)))
+    codes = np.concatenate([row_user[keep]] + [np.full(len(a[0]), code, dtype=np.int64) for code, a in overrides.items()])
+    order = np.argsort(codes, kind="stable")
+    columns = [np.concatenate([column[keep]] + [a[i] for a in overrides.values()])[order] for i, column in enumerate(columns)]
+    return codes[order], columns
+
+
+class InteractionStore:
+    def __init__(self):
+        self.user_ids = []                      # user code -> original user_id
+        self.user_codes = {}                    # str(user_id) -> user code
+        self.game_ids = np.zeros(0, np.int64)   # game code -> game_id
+        self.game_codes = {}                    # game_id -> game code
+        # Base rows grouped by user code: (offsets, game, rating, playtime, implicit), replaced as a whole
+        # so lock-free readers never see half a merge. Users added later start with no base rows.
+        self.base = (np.zeros(1, np.int64), np.zeros(0, np.int32), np.zeros(0, np.float32),
+                     np.zeros(0, np.float32), np.zeros(0, np.int8))
+        self.overrides = {}                     # user code -> (game, rating, playtime, implicit) arrays
+        self.n_rows = 0
+
+    @classmethod
+    def from_frame(cls, df):
+        store = cls()
+        if df is None or df.empty:
+            return store
+        game_id = pd.to_numeric(df["game_id"], errors="coerce")
+        bad = game_id.isna().to_numpy()
+        if bad.any():
+            print(f"Warning: dropping {int(bad.sum())} interaction rows without a numeric game_id: "
+                  f"{df.loc[bad, ['user_id', 'game_id']].head(5).to_dict('records')}")
+            df, game_id = df[~bad], game_id[~bad]
+            if df.empty:
+                return store
+        users = df["user_id"].to_numpy(dtype=object)
+        codes, keys = pd.factorize(pd.Series(users).astype(str).to_numpy())
+        first = np.unique(codes, return_index=True)[1]  # first row of each user code
+        store.user_ids = users[first].tolist()
+        store.user_codes = {str(key): code for code, key in enumerate(keys)}
+
+        game_codes, vocab = pd.factorize(game_id.to_numpy(dtype=np.int64))
+        store.game_ids = np.asarray(vocab, dtype=np.int64)
+        store.game_codes = {int(g): c for c, g in enumerate(store.game_ids)}
+
+        def column(name, convert, blank):
+            return convert(df[name]) if name in df.columns else np.full(len(df), blank)
+
+        order = np.argsort(codes, kind="stable")  # group by user, keeping each user's row order
+        counts = np.bincount(codes, minlength=len(store.user_ids))
+        store.base = (
+            np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            game_codes[order].astype(np.int32),
+            column("rating", _float32, np.float32(np.nan))[order],
+            column("playtime", _float32, np.float32(np.nan))[order],
+            column("implicit", _implicit, np.int8(-1))[order],
+        )
+        store.n_rows = len(df)
+        return store
+
+    # --- Codes ---
+    def _user_code(self, user_id, create=False):
+        key = str(user_id)
+        code = self.user_codes.get(key)
+        if code is None and create:
+            code = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.user_codes[key] = code
+        return code
+
+    def _game_code(self, game_id):
+        game_id = int(game_id)
+        code = self.game_codes.get(game_id)
+        if code is None:
+            code = len(self.game_ids)
+            self.game_ids = np.append(self.game_ids, np.int64(game_id))
+            self.game_codes[game_id] = code
+        return code
+
+    # --- Reads ---
+    def _user_arrays(self, code):
+        if code is None:
+            return np.zeros(0, np.int32), np.zeros(0, np.float32), np.zeros(0, np.float32), np.zeros(0, np.int8)
+        arrays = self.overrides.get(code)
+        if arrays is not None:
+            return arrays
+        offsets, game, rating, playtime, implicit = self.base
+        if code + 1 < len(offsets):
+            start, stop = offsets[code], offsets[code + 1]
+            return game[start:stop], rating[start:stop], playtime[start:stop], implicit[start:stop]
+        return self._user_arrays(None)
+
+    def _rows_frame(self, user_ids, arrays):
+        game, rating, playtime, implicit = arrays
+        return pd.DataFrame({
+            "user_id": user_ids,
+            "game_id": self.game_ids[game],
+            "rating": rating,
+            "playtime": playtime,
+            "implicit": _IMPLICIT_VALUES[implicit + 1],
+        }, columns=INTERACTION_COLS)
+
+    def _user_id_array(self, codes):
+        users = np.empty(len(codes), dtype=object)
+        users[:] = [self.user_ids[c] for c in codes]
+        return users
+
+    def _frame(self, code, arrays):
+        user_id = self.user_ids[code] if code is not None else None
+        return self._rows_frame(np.full(len(arrays[0]), user_id, dtype=object), arrays)
+
+    def user_frame(self, user_id):
+        """One user's rows as a DataFrame with INTERACTION_COLS (in the order they were written)."""
+        code = self._user_code(user_id)
+        return self._frame(code, self._user_arrays(code))
+
+    def to_frame(self):
+        """Every row as a DataFrame with INTERACTION_COLS, grouped by user."""
+        self.merge()
+        offsets = self.base[0]
+        users = self._user_id_array(range(len(offsets) - 1))
+        return self._rows_frame(np.repeat(users, np.diff(offsets)), self.base[1:])
+
+    def iter_frames(self, chunk_rows=1000):
+        """
+        to_frame() in DataFrames of about chunk_rows rows (whole users, same order), built one at a
+        time from the arrays as they are now: later writes don't show up, and only one chunk
+        is materialized at a time. Call it with writes serialized; iterate without the lock.
+        """
+        base, overrides, n_users = self.base, dict(self.overrides), len(self.user_ids)
+        return self._iter_frames(base, overrides, n_users, max(1, int(chunk_rows)))
+
+    def _iter_frames(self, base, overrides, n_users, chunk_rows):
+        offsets, n_base = base[0], len(base[0]) - 1
+        counts = np.zeros(n_users, dtype=np.int64)
+        counts[:n_base] = np.diff(offsets)
+        for code, arrays in overrides.items():
+            counts[code] = len(arrays[0])
+        ends = np.cumsum(counts)
+        override_codes = np.sort(np.fromiter(overrides, dtype=np.int64, count=len(overrides)))
+
+        start = 0
+        while start < n_users:
+            done = ends[start - 1] if start else 0
+            stop = max(start + 1, int(np.searchsorted(ends, done + chunk_rows, side="right")))
+            lo, hi = min(start, n_base), min(stop, n_base)
+            row_user = np.repeat(np.arange(lo, hi), np.diff(offsets[lo:hi + 1]))
+            rows = slice(offsets[lo], offsets[hi])
+            in_range = override_codes[np.searchsorted(override_codes, start):np.searchsorted(override_codes, stop)]
+            codes, columns = _regroup(row_user, [column[rows] for column in base[1:]], {int(c): overrides[c] for c in in_range})
+            if len(codes):
+                # Codes run start..stop-1 in order: repeat each user's id over its rows
+                users = self._user_id_array(range(start, stop))
+                yield self._rows_frame(np.repeat(users, counts[start:stop]), columns)
+            start = stop
+
+    def __len__(self):
+        return self.n_rows
+
+    def nbytes(self):
+        arrays = [*self.base, self.game_ids] + [a for user_arrays in self.overrides.values() for a in user_arrays]
+        return int(sum(a.nbytes for a in arrays))
+
+    # --- Writes (each returns the user's replaced rows as a DataFrame) ---
+    def _set_user(self, code, game, rating, playtime, implicit):
+        arrays = (
+            np.asarray(game, np.int32), np.asarray(rating, np.float32),
+            np.asarray(playtime, np.float32), np.asarray(implicit, np.int8),
+        )
+        self.n_rows += len(arrays[0]) - len(self._user_arrays(code)[0])
+        self.overrides[code] = arrays
+        if len(self.overrides) > max(1024, len(self.user_ids) // 8):
+            self.merge()
+
+    def upsert(self, user_id, game_id, rating, implicit=False):
+        """Sets the rating of one (user, game) row (its playtime is kept); appends the row if new."""
+        code = self._user_code(user_id, create=True)
+        game, ratings, playtime, implicits = self._user_arrays(code)
+        gcode = self._game_code(game_id)
+        hit = game == gcode
+        flag = _implicit([implicit])[0]
+        replaced = self._frame(code, (game[hit], ratings[hit], playtime[hit], implicits[hit]))
+        if hit.any():
+            ratings, implicits = ratings.copy(), implicits.copy()
+            ratings[hit], implicits[hit] = rating, flag
+        else:
+            game = np.append(game, np.int32(gcode))
+            ratings = np.append(ratings, np.float32(rating))
+            playtime = np.append(playtime, np.float32(np.nan))
+            implicits = np.append(implicits, flag)
+        self._set_user(code, game, ratings, playtime, implicits)
+        return replaced
+
+    def delete(self, user_id, game_id):
+        """Removes one (user, game) row. Returns the removed rows."""
+        code = self._user_code(user_id)
+        game, ratings, playtime, implicits = self._user_arrays(code)
+        try:
+            gcode = self.game_codes.get(int(float(str(game_id))))
+        except ValueError:
+            gcode = None
+        hit = (game == gcode) if gcode is not None else np.zeros(len(game), bool)
+        removed = self._frame(code, (game[hit], ratings[hit], playtime[hit], implicits[hit]))
+        if hit.any():
+            keep = ~hit
+            self._set_user(code, game[keep], ratings[keep], playtime[keep], implicits[keep])
+        return removed
+
+    def replace_user(self, user_id, rows):
+        """Drops all of a user's rows and inserts `rows` (dicts with INTERACTION_COLS keys). Returns the dropped rows."""
+        rows = list(rows)
+        code = self._user_code(user_id, create=bool(rows))
+        removed = self._frame(code, self._user_arrays(code))
+        if code is None:
+            return removed
+        self._set_user(
+            code,
+            [self._game_code(r["game_id"]) for r in rows],
+            _float32([r.get("rating") for r in rows]),
+            _float32([r.get("playtime") for r in rows]),
+            _implicit([r.get("implicit") for r in rows]),
+        )
+        return removed
+
+    def merge(self):
+        """Folds the overrides (and users added since) into the base arrays: one sort over all rows."""
+        overrides = dict(self.overrides)
+        offsets = self.base[0]
+        if not overrides and len(offsets) == len(self.user_ids) + 1:
+            return
+        # Base rows of users without an override, then every override, re-grouped by user code
+        row_user = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        codes, columns = _regroup(row_user, self.base[1:], overrides)
+        counts = np.bincount(codes, minlength=len(self.user_ids))
+        self.base = (np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), *columns)
+        for code in overrides:
+            self.overrides.pop(code, None)
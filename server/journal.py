@@ -0,0 +1,166 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from metrics import METRICS
+
+# ---------------------------------------------------------
+# WRITE-BEHIND JOURNAL (Group commit for the CSV backend)
+# ---------------------------------------------------------
+# Rewriting user_interactions.csv on every /rate makes bursty traffic (a
+# survey followed by a run of ratings) cost O(table) per request. With a
+# journal, CsvStorage applies each write to its in-memory tables and only
+# appends one JSON line here:
+#   - a single writer thread flushes the buffered lines and fsyncs them every
+#     JOURNAL_SYNC_INTERVAL seconds (one fsync per batch, not per request),
+#   - every JOURNAL_COMPACT_INTERVAL seconds the changed tables are written
+#     back to their CSVs and the journal is emptied (see CsvStorage.compact),
+#   - on startup, entries left over from a crash are replayed on top of the
+#     CSVs (replaying an already-compacted entry is harmless: every entry sets
+#     state rather than adding to it).
+# Compaction first moves the live log aside (<path>.compacting), so writes
+# keep flowing into a fresh log while the CSVs are being written.
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+class WriteJournal:
+    def __init__(self, path, sync_interval=0.05, compact_interval=30.0, compact=None):
+        """`compact()` is called from the writer thread every `compact_interval` seconds."""
+        self.path = path
+        self.rotated_path = path + ".compacting"
+        self.sync_interval = sync_interval
+        self.compact_interval = compact_interval
+        self.compact = compact
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._file_lock = threading.Lock()  # one writer of the log file at a time
+        self._wake = threading.Event()
+        self._thread = None
+        self._file = None
+        self.synced = 0
+
+    # --- Reading ---
+    def entries(self):
+        """Every entry still on disk, oldest first (the log being compacted, then the live one)."""
+        for path in (self.rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash mid-write: nothing after it was synced
+                        print(f"Warning: Skipping unreadable journal entry in {path}")
+                        break
+
+    # --- Writing ---
+    def append(self, entry):
+        """Buffers one entry; the writer thread makes it durable within sync_interval."""
+        line = json.dumps(entry, default=_json_default)
+        with self._pending_lock:
+            self._pending.append(line)
+        if self._thread is None:
+            self.sync()
+
+    def sync(self):
+        """Writes and fsyncs everything appended so far. Returns the number of entries written."""
+        with self._file_lock:
+            return self._write_pending()
+
+    def _write_pending(self):
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        try:
+            with METRICS.stage("journal", "sync"):
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write("\n".join(batch) + "\n")
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        except Exception:
+            # Keep the batch for the next attempt (re-writing part of it is harmless on replay)
+            with self._pending_lock:
+                self._pending[:0] = batch
+            raise
+        self.synced += len(batch)
+        return len(batch)
+
+    def rotate(self):
+        """
+        Syncs and moves the live log aside for compaction; new entries go to a fresh log.
+        A log left over from a failed compaction is kept and the live one appended to it.
+        """
+        with self._file_lock:
+            self._write_pending()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not os.path.exists(self.path):
+                return
+            if not os.path.exists(self.rotated_path):
+                os.replace(self.path, self.rotated_path)
+                return
+            with open(self.path, encoding="utf-8") as src, open(self.rotated_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.path)
+
+    def discard_rotated(self):
+        """Drops the compacted log (its entries are in the CSVs now)."""
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    # --- Writer thread ---
+    def start(self):
+        if self._thread is None and self.sync_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="write-journal", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _run(self):
+        last_compact = time.monotonic()
+        while True:
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+            try:
+                self.sync()
+                due = self.compact_interval > 0 and time.monotonic() - last_compact >= self.compact_interval
+                if self.compact is not None and due:
+                    last_compact = time.monotonic()
+                    self.compact()
+            except Exception as e:
+                # Entries stay buffered / on disk; the next round retries
+                print(f"Warning: Journal write failed: {e}")
+
+    def close(self):
+        """Final sync at shutdown; the next start replays and compacts what is left in the log."""
+        try:
+            self.sync()
+        except Exception as e:
+            print(f"Warning: Journal sync at shutdown failed: {e}")
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {"pending": pending, "synced": self.synced, "writer": self._thread is not None}
@@ -0,0 +1,73 @@
+import bisect
+import re
+
+import numpy as np
+
+# ---------------------------------------------------------
+# KEYWORD INDEX (Inverted index over game descriptions)
+# ---------------------------------------------------------
+# The survey seeds a new user with games whose description mentions each
+# picked genre. Instead of a case-insensitive substring scan of every
+# description per genre, descriptions are tokenized once per snapshot into
+# token -> sorted catalog rows posting lists. A keyword matches every token
+# it is a prefix of ("shooter" also finds "shooters"), found by bisecting the
+# sorted vocabulary, so a lookup costs O(log V + matches).
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class KeywordIndex:
+    def __init__(self, vocabulary, postings, n_rows):
+        self.vocabulary = vocabulary  # sorted tokens
+        self.postings = postings      # same order: sorted int64 arrays of catalog rows
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_catalog(cls, catalog, field="descriptions", present="has_text"):
+        """Indexes catalog[field] (default: descriptions) of every row where catalog[present] is set."""
+        rows_by_token = {}
+        texts = catalog[field]
+        for row in np.flatnonzero(catalog[present]):
+            for token in set(tokenize(texts[row] or "")):
+                rows_by_token.setdefault(token, []).append(row)
+        vocabulary = sorted(rows_by_token)
+        postings = [np.array(rows_by_token[t], dtype=np.int64) for t in vocabulary]
+        return cls(vocabulary, postings, len(catalog["game_ids"]))
+
+    def rows(self, word, prefix=True):
+        """Catalog rows with `word` as a token (prefix=True: a token starting with `word`)."""
+        return self._prefix_rows(word) if prefix else self._token_rows(word)
+
+    def _token_rows(self, token):
+        i = bisect.bisect_left(self.vocabulary, token)
+        if i < len(self.vocabulary) and self.vocabulary[i] == token:
+            return self.postings[i]
+        return np.zeros(0, dtype=np.int64)
+
+    def _prefix_rows(self, prefix):
+        lo = bisect.bisect_left(self.vocabulary, prefix)
+        hi = bisect.bisect_left(self.vocabulary, prefix + "\uffff")
+        if lo == hi:
+            return np.zeros(0, dtype=np.int64)
+        if hi - lo == 1:
+            return self.postings[lo]
+        return np.unique(np.concatenate(self.postings[lo:hi]))
+
+    def mask(self, keyword):
+        """Boolean mask over catalog rows whose description matches `keyword` (every word, as token prefixes)."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        words = tokenize(keyword)
+        if not words:
+            return mask
+        rows = self._prefix_rows(words[0])
+        for word in words[1:]:
+            rows = np.intersect1d(rows, self._prefix_rows(word), assume_unique=True)
+        mask[rows] = True
+        return mask
+
+    def stats(self):
+        return {"tokens": len(self.vocabulary), "postings": int(sum(len(p) for p in self.postings))}
@@ -0,0 +1,90 @@
+import numpy as np
+
+# ---------------------------------------------------------
+# LIST QUERIES (Pagination, field projection, filters)
+# ---------------------------------------------------------
+# /games, /user/history/<id> and /library/<id> accept the same query string:
+#   ?limit=50             page size (default: everything)
+#   ?offset=100           skip rows (plain offset paging)
+#   ?after=<game_id>      start after this game (cursor paging; stable when
+#                         rows are added or removed elsewhere in the list)
+#   ?fields=game_id,title only these keys in each item
+# plus per-route filters (?genre=, ?platform=, ?status=, ?min_rating=, ...).
+# ?genre= matches the game's listed `genre` label (e.g. "Open World"), so a
+# filtered /games page only holds items showing one of the requested genres.
+# Filters and pages are selected with array masks over the in-memory tables
+# and only the selected rows are turned into dicts, column by column.
+# The body stays a plain JSON list; X-Total-Count (matches after filtering)
+# and X-Next-Cursor (absent on the last page) carry the paging state.
+
+
+def multi_arg(args, name):
+    """All values of a repeatable / comma-separated query argument (?genre=RPG,Shooter&genre=Horror)."""
+    return [v.strip() for raw in args.getlist(name) for v in raw.split(",") if v.strip()]
+
+
+def float_arg(args, name):
+    """Optional float query argument. Raises ValueError naming the argument."""
+    raw = args.get(name)
+    if raw is None or raw == "":
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def parse_list_query(args, fields):
+    """
+    Paging + projection arguments: {"limit", "offset", "after", "fields"}.
+    `fields` lists the keys an item can have. Raises ValueError for a bad request.
+    """
+    query = {"limit": None, "offset": 0, "after": None, "fields": None}
+    for name in ("limit", "offset", "after"):
+        raw = args.get(name)
+        if raw is None or raw == "":
+            continue
+        try:
+            query[name] = int(raw)
+        except ValueError:
+            raise ValueError(f"{name} must be an integer")
+    if query["limit"] is not None and query["limit"] < 1:
+        raise ValueError("limit must be at least 1")
+    if query["offset"] < 0:
+        raise ValueError("offset must not be negative")
+
+    wanted = multi_arg(args, "fields")
+    if wanted:
+        unknown = [f for f in wanted if f not in fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        query["fields"] = [f for f in fields if f in wanted]  # response key order stays fixed
+    return query
+
+
+def page(game_ids, query):
+    """
+    Positions of the requested page within `game_ids` (the filtered list, in order).
+    Returns (positions, next_cursor); next_cursor is None on the last page.
+    """
+    game_ids = np.asarray(game_ids)
+    start = 0
+    if query["after"] is not None:
+        hits = np.flatnonzero(game_ids == query["after"])
+        if not len(hits):
+            raise ValueError("Unknown cursor: game not in this list")
+        start = int(hits[0]) + 1
+    start = min(start + query["offset"], len(game_ids))
+    stop = len(game_ids) if query["limit"] is None else min(len(game_ids), start + query["limit"])
+    next_cursor = int(game_ids[stop - 1]) if start < stop < len(game_ids) else None
+    return np.arange(start, stop), next_cursor
+
+
+def records(columns, fields=None):
+    """
+    List of item dicts from {key: sequence} columns of equal length, keeping only `fields`.
+    Columns are converted with tolist(), so the values are plain Python objects.
+    """
+    keys = [k for k in columns if fields is None or k in fields]
+    values = [v.tolist() if hasattr(v, "tolist") else list(v) for v in (columns[k] for k in keys)]
+    return [dict(zip(keys, row)) for row in zip(*values)]
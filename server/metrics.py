@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# ---------------------------------------------------------
+# METRICS (Request / stage latency, Prometheus text format)
+# ---------------------------------------------------------
+# In-process counters and latency histograms, exposed by GET /metrics:
+#   recommender_requests_total{route,method,status}
+#   recommender_request_errors_total{route}
+#   recommender_request_seconds{route}            (histogram)
+#   recommender_stage_seconds{route,stage}        (histogram; route="startup" for load/build steps)
+#   recommender_auth_*                            (password hashing pool, see auth.py)
+#
+#   with METRICS.stage("/recommend", "score"):
+#       scores = get_hybrid_scores(...)
+#
+# METRICS_ENABLED=0 turns every call into a no-op (stage() hands back a shared
+# null context, so instrumented code pays one attribute check).
+
+# Latency buckets in seconds (upper bounds)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NOOP = nullcontext()
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    HELP = {
+        "recommender_requests_total": ("counter", "HTTP requests by route, method and status."),
+        "recommender_request_errors_total": ("counter", "Requests that ended in a 5xx or an unhandled exception."),
+        "recommender_request_seconds": ("histogram", "End-to-end request latency by route."),
+        "recommender_stage_seconds": ("histogram", "Latency of individual handler / startup stages."),
+        "recommender_auth_queue_depth": ("gauge", "Password hash/check jobs waiting for or running in the auth pool."),
+        "recommender_auth_wait_seconds": ("histogram", "Time a password job waited for an auth pool worker."),
+        "recommender_auth_rejected_total": ("counter", "Password jobs refused because the auth queue was full or they timed out."),
+    }
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._counters = {}    # (name, labels) -> float
+        self._histograms = {}  # (name, labels) -> _Histogram
+        self._gauges = {}      # (name, labels) -> float
+        self._lock = threading.Lock()
+
+    # --- Recording ---
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled: return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        if not self.enabled: return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled: return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram()
+            hist.observe(seconds)
+
+    def stage(self, route, stage):
+        """Context manager timing one stage of a handler (or of startup)."""
+        if not self.enabled: return _NOOP
+        return self._timed_stage(route, stage)
+
+    @contextmanager
+    def _timed_stage(self, route, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("recommender_stage_seconds", time.perf_counter() - start, route=route, stage=stage)
+
+    # --- Flask wiring ---
+    def install(self, app):
+        """Times every request and counts statuses / errors. Routes are labelled by their rule, not the raw path."""
+        from flask import g, request
+
+        def route_label():
+            return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+        @app.before_request
+        def _start_timer():
+            if self.enabled:
+                g._metrics_start = time.perf_counter()
+
+        @app.after_request
+        def _record(response):
+            start = g.pop("_metrics_start", None)
+            if start is not None:
+                route = route_label()
+                self.observe("recommender_request_seconds", time.perf_counter() - start, route=route)
+                self.inc("recommender_requests_total", route=route, method=request.method, status=str(response.status_code))
+                if response.status_code >= 500:
+                    self.inc("recommender_request_errors_total", route=route)
+            return response
+
+        @app.teardown_request
+        def _record_exception(exc):
+            # after_request does not run for unhandled exceptions
+            if exc is not None and g.pop("_metrics_start", None) is not None:
+                route = route_label()
+                self.inc("recommender_requests_total", route=route, method=request.method, status="500")
+                self.inc("recommender_request_errors_total", route=route)
+
+    # --- Exposition ---
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: (list(h.counts), h.total, h.count) for key, h in self._histograms.items()}
+
+        lines = []
+        for name, (kind, text) in self.HELP.items():
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind in ("counter", "gauge"):
+                values = counters if kind == "counter" else gauges
+                for (n, labels), value in sorted(values.items()):
+                    if n == name:
+                        lines.append(f"{name}{_labels(labels)} {value:g}")
+            else:
+                for (n, labels), (counts, total, count) in sorted(histograms.items()):
+                    if n != name: continue
+                    cumulative = 0
+                    for bound, c in zip(BUCKETS, counts):
+                        cumulative += c
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics(enabled=os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "off", "no"))
@@ -0,0 +1,125 @@
+import numpy as np
+import scipy.sparse as sp
+
+# ---------------------------------------------------------
+# TOP-K NEIGHBOUR LISTS (Replaces dense N x N similarity matrices)
+# ---------------------------------------------------------
+# For every item we keep only its K most similar items: `ids` (int32 row
+# positions) and `scores` (float32 cosine), both shaped (N, K) and sorted by
+# descending score. They are computed a block of rows at a time, so only a
+# (block x N) slice of the similarity matrix ever exists in memory.
+
+# Max similarity entries materialized per block (~64 MB of float64)
+BLOCK_BUDGET = 1 << 23
+
+
+def _normalize(vectors):
+    if sp.issparse(vectors):
+        vectors = sp.csr_matrix(vectors, dtype=np.float64)
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1))).ravel()
+        inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        return sp.diags(inv) @ vectors, norms > 0
+    vectors = np.asarray(vectors, dtype=np.float64)
+    norms = np.linalg.norm(vectors, axis=1)
+    inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return vectors * inv[:, None], norms > 0
+
+
+def top_k_neighbours(vectors, k=50, block_size=None):
+    """
+    Cosine top-k neighbours of every row (itself excluded), dense or scipy-sparse input.
+    Returns {"ids": int32 (N, K), "scores": float32 (N, K), "self_score": float32 (N,)}
+    where self_score is what the row would score against itself (1.0, or 0.0 for an all-zero row).
+    """
+    normed, nonzero = _normalize(vectors)
+    n = normed.shape[0]
+    k = max(0, min(k, n - 1))
+    ids = np.zeros((n, k), dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    block_size = block_size or max(1, min(1024, BLOCK_BUDGET // max(n, 1)))
+    normed_t = normed.T.tocsr() if sp.issparse(normed) else normed.T
+
+    for start in range(0, n, block_size):
+        stop = min(n, start + block_size)
+        sims = normed[start:stop] @ normed_t
+        sims = sims.toarray() if sp.issparse(sims) else np.asarray(sims)
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # drop self
+        if k == 0:
+            continue
+
+        if k < n - 1:
+            part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(n), (stop - start, n))
+            part = part[part != np.arange(start, stop)[:, None]].reshape(stop - start, n - 1)
+        part_scores = np.take_along_axis(sims, part, axis=1)
+        # Sort each row by descending score, ties by row position
+        order = np.lexsort((part, -part_scores), axis=1)
+        ids[start:stop] = np.take_along_axis(part, order, axis=1)
+        scores[start:stop] = np.take_along_axis(part_scores, order, axis=1)
+
+    return {"ids": ids, "scores": scores, "self_score": nonzero.astype(np.float32)}
+
+
+def dense_rows(neighbours, rows, n):
+    """
+    Similarity of each given row to every item, as an (len(rows), n) array.
+    Items outside a row's top-k list score 0.
+    """
+    rows = np.asarray(rows)
+    out = np.zeros((len(rows), n), dtype=np.float64)
+    r = np.arange(len(rows))[:, None]
+    out[r, neighbours["ids"][rows]] = neighbours["scores"][rows]
+    out[r[:, 0], rows] = neighbours["self_score"][rows]
+    return out
+
+
+def patch_neighbours(neighbours, vectors, row, k=50):
+    """
+    Updates neighbour lists after one row of `vectors` was added (row == N) or replaced,
+    computing only that row's similarities (one 1 x N product) instead of the full lists.
+
+    The row gets its exact top-k; every other list gains the row if it now beats that
+    list's weakest entry, and lists that already held it get the new score. A list the
+    row drops out of keeps it at its new (lower) score until the next full rebuild.
+    Returns a new dict (saved artifacts are read-only memory maps, so nothing is patched in place).
+    """
+    normed, nonzero = _normalize(vectors)
+    n = normed.shape[0]
+    sims = normed @ normed[row].T
+    sims = (sims.toarray() if sp.issparse(sims) else np.asarray(sims)).ravel()
+
+    ids, scores = np.array(neighbours["ids"]), np.array(neighbours["scores"])
+    self_score = np.array(neighbours["self_score"])
+    width = max(0, min(k, n - 1))
+    if len(ids) < n:
+        grow = n - len(ids)
+        ids = np.vstack([ids, np.zeros((grow, ids.shape[1]), dtype=np.int32)])
+        scores = np.vstack([scores, np.full((grow, scores.shape[1]), -np.inf, dtype=np.float32)])
+        self_score = np.append(self_score, np.zeros(grow, dtype=np.float32))
+    if ids.shape[1] < width:
+        # Small catalogs list every other item; make room for the new one
+        pad = width - ids.shape[1]
+        ids = np.hstack([ids, np.full((n, pad), row, dtype=np.int32)])
+        scores = np.hstack([scores, np.full((n, pad), -np.inf, dtype=np.float32)])
+
+    # Other rows: rescore existing entries, or replace the weakest entry when the row beats it
+    others = np.arange(n) != row
+    present = (ids == row) & others[:, None]
+    scores[present] = sims[np.nonzero(present)[0]]
+    if width:
+        beats = others & ~present.any(axis=1) & (sims > scores[:, -1])
+        ids[beats, -1] = row
+        scores[beats, -1] = sims[beats]
+        touched = np.flatnonzero(present.any(axis=1) | beats)
+        order = np.lexsort((ids[touched], -scores[touched]), axis=1)
+        ids[touched] = np.take_along_axis(ids[touched], order, axis=1)
+        scores[touched] = np.take_along_axis(scores[touched], order, axis=1)
+
+    # The row itself: exact top-k by descending score, ties by row position
+    sims[row] = -np.inf
+    if width:
+        top = np.lexsort((np.arange(n), -sims))[:width]
+        ids[row], scores[row] = top, sims[top]
+    self_score[row] = float(nonzero[row])
+    return {"ids": ids, "scores": scores, "self_score": self_score}
@@ -0,0 +1,237 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from storage import _clean
+
+# ---------------------------------------------------------
+# USER PROFILES (Incremental, in-memory)
+# ---------------------------------------------------------
+# Everything /recommend and /user/stats need about a logged-in user, kept up
+# to date by the write endpoints instead of being re-derived from the
+# interaction table on every request:
+#   - the user's ratings (game_id -> rows), row/like counts,
+#   - the sum + count of liked games' feature vectors (profile = sum / count),
+#   - per-feature totals over liked rows (genre distribution for /user/stats),
+#   - the parsed survey filters,
+#   - a version number that changes on every update (for cache keys).
+# "Liked" means rating >= LIKE_THRESHOLD, same as the original handlers.
+
+LIKE_THRESHOLD = 4
+
+
+def _is_implicit(value):
+    """Same test the handlers used (`implicit != True`): only a real True marks a survey seed."""
+    try:
+        return bool(value == True)  # noqa: E712
+    except (TypeError, ValueError):
+        return False
+
+
+def _split(value):
+    """';'-joined survey answer -> list, None when unset."""
+    value = _clean(value)
+    return str(value).split(";") if value else None
+
+
+class UserProfile:
+    def __init__(self, user_id, n_features):
+        self.user_id = user_id
+        # game_id -> list of [rating, implicit] rows (a CSV can hold duplicate rows for one game)
+        self.ratings = {}
+        self.n_rows = 0
+        self.n_liked_rows = 0
+        # Distinct liked games with features: feature sum + count
+        self.liked_sum = np.zeros(n_features, dtype=np.float64)
+        self.liked_count = 0
+        # Feature totals over liked rows (rows, not games, like the old merge-based stats)
+        self.liked_row_totals = np.zeros(n_features, dtype=np.float64)
+        # Parsed survey answers (None when not answered)
+        self.filters = {"genres": None, "platforms": None, "modes": None}
+        self.version = 0
+
+
+class ProfileStore:
+    """
+    Per-user profiles for the whole user base, keyed by str(user_id).
+    Built once from the interaction and preference tables; apply() then patches
+    only the users and games touched by a write, and snapshot() never touches storage.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.feature_cols = list(catalog["feature_cols"])
+        self.profiles = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_tables(cls, catalog, interactions=None, preferences=None):
+        """`interactions`: a DataFrame or an iterable of DataFrame chunks (e.g. Storage.iter_interactions())."""
+        store = cls(catalog)
+        frames = [interactions] if interactions is None or isinstance(interactions, pd.DataFrame) else interactions
+        for frame in frames:
+            if frame is not None and not frame.empty:
+                store._apply_rows(frame, +1)
+        if preferences is not None and not preferences.empty:
+            seen = set()
+            for row in preferences.to_dict("records"):
+                key = str(row["user_id"])
+                # First row wins, like the per-user lookup did
+                if key in seen: continue
+                seen.add(key)
+                store._profile(key).filters = {col: _split(row.get(col)) for col in ["genres", "platforms", "modes"]}
+        return store
+
+    def _profile(self, key):
+        profile = self.profiles.get(key)
+        if profile is None:
+            profile = self.profiles[key] = UserProfile(key, len(self.feature_cols))
+        return profile
+
+    def _feature_row(self, game_id):
+        row = self.catalog["pos"].get(game_id)
+        if row is None or not self.catalog["has_features"][row]:
+            return None
+        return self.catalog["features"][row]
+
+    def _apply_rows(self, rows, sign):
+        """Adds (sign=+1) or removes (sign=-1) interaction rows; only the affected games are re-evaluated."""
+        implicit = rows["implicit"] if "implicit" in rows.columns else [None] * len(rows)
+        for user_id, game_id, rating, imp in zip(rows["user_id"], rows["game_id"], rows["rating"], implicit):
+            try:
+                game_id = int(game_id)
+                rating = float(rating)
+            except (TypeError, ValueError):
+                continue
+            profile = self._profile(str(user_id))
+            entries = profile.ratings.get(game_id, [])
+            was_liked = any(r >= LIKE_THRESHOLD for r, _ in entries)
+
+            is_like = rating >= LIKE_THRESHOLD
+            if sign > 0:
+                entries = entries + [[rating, _is_implicit(imp)]]
+            else:
+                match = next((i for i, (r, _) in enumerate(entries) if r == rating), None)
+                if match is None: continue
+                entries = entries[:match] + entries[match + 1:]
+
+            if entries: profile.ratings[game_id] = entries
+            else: profile.ratings.pop(game_id, None)
+            profile.n_rows += sign
+            profile.n_liked_rows += sign * int(is_like)
+
+            feats = self._feature_row(game_id)
+            if feats is not None:
+                if is_like:
+                    profile.liked_row_totals += sign * feats
+                now_liked = any(r >= LIKE_THRESHOLD for r, _ in entries)
+                if now_liked != was_liked:
+                    delta = 1 if now_liked else -1
+                    profile.liked_sum += delta * feats
+                    profile.liked_count += delta
+            profile.version += 1
+
+    # --- Writes ---
+    def apply(self, removed=None, added=None):
+        """Syncs profiles with interaction rows removed from / added to storage (DataFrames with user_id)."""
+        with self._lock:
+            if removed is not None and not removed.empty:
+                self._apply_rows(removed, -1)
+            if added is not None and not added.empty:
+                self._apply_rows(added, +1)
+
+    def replace_features(self, game_id, old, new):
+        """
+        A game's feature vector changed (old/new are arrays, None = no features), e.g. after a
+        catalog update: re-weights it in the liked sums of the users who rated it.
+        """
+        game_id = int(game_id)
+        had, has = old is not None, new is not None
+        old = np.zeros(len(self.feature_cols)) if old is None else np.asarray(old, dtype=np.float64)
+        new = np.zeros(len(self.feature_cols)) if new is None else np.asarray(new, dtype=np.float64)
+        with self._lock:
+            for profile in self.profiles.values():
+                entries = profile.ratings.get(game_id)
+                if not entries: continue
+                liked_rows = sum(1 for r, _ in entries if r >= LIKE_THRESHOLD)
+                if not liked_rows: continue
+                profile.liked_row_totals += liked_rows * (new - old)
+                profile.liked_sum += new - old
+                profile.liked_count += int(has) - int(had)
+                profile.version += 1
+
+    def rebase(self, catalog):
+        """
+        Switches to a new catalog snapshot: games whose features differ between the two
+        are re-weighted (see replace_features), everything else is left as is.
+        """
+        old = self.catalog
+        if catalog is old:
+            return
+        ids = np.union1d(old["game_ids"], catalog["game_ids"])
+
+        def features_by_id(cat):
+            rows = pd.Index(cat["game_ids"]).get_indexer(ids)
+            present = rows >= 0
+            present[present] = cat["has_features"][rows[present]]
+            values = np.zeros((len(ids), len(self.feature_cols)))
+            if list(cat["feature_cols"]) == self.feature_cols:
+                values[present] = cat["features"][rows[present]]
+            return values, present
+
+        old_values, old_present = features_by_id(old)
+        new_values, new_present = features_by_id(catalog)
+        changed = (old_present != new_present) | (old_values != new_values).any(axis=1)
+        for i in np.flatnonzero(changed):
+            self.replace_features(
+                ids[i],
+                old_values[i] if old_present[i] else None,
+                new_values[i] if new_present[i] else None,
+            )
+        self.catalog = catalog
+
+    def set_filters(self, user_id, genres=None, platforms=None, modes=None):
+        """Survey answers, given as ';'-joined strings exactly as they are stored."""
+        with self._lock:
+            profile = self._profile(str(user_id))
+            profile.filters = {"genres": _split(genres), "platforms": _split(platforms), "modes": _split(modes)}
+            profile.version += 1
+
+    # --- Reads ---
+    def user_ids(self):
+        """Every user with a profile (history or saved filters), as str keys."""
+        with self._lock:
+            return list(self.profiles)
+
+    def version(self, user_id):
+        profile = self.profiles.get(str(user_id))
+        return 0 if profile is None else profile.version
+
+    def snapshot(self, user_id):
+        """
+        A consistent copy of one user's profile, or None for an unknown user:
+        {"version", "has_history", "prefs" (mean liked features, {} without likes),
+         "ratings" (game_id -> first explicit rating or None), "filters", "n_rows",
+         "n_liked_rows", "liked_totals" (feature -> summed strength over liked rows)}.
+        """
+        with self._lock:
+            profile = self.profiles.get(str(user_id))
+            if profile is None:
+                return None
+            prefs = {}
+            if profile.liked_count:
+                prefs = dict(zip(self.feature_cols, (profile.liked_sum / profile.liked_count).tolist()))
+            return {
+                "version": profile.version,
+                "has_history": profile.n_rows > 0,
+                "prefs": prefs,
+                "ratings": {
+                    gid: next((r for r, implicit in rows if not implicit), None)
+                    for gid, rows in profile.ratings.items()
+                },
+                "filters": dict(profile.filters),
+                "n_rows": profile.n_rows,
+                "n_liked_rows": profile.n_liked_rows,
+                "liked_totals": dict(zip(self.feature_cols, profile.liked_row_totals.tolist())),
+            }
@@ -0,0 +1,67 @@
+import numpy as np
+import scipy.sparse as sp
+
+from keywords import KeywordIndex, tokenize
+
+# ---------------------------------------------------------
+# GAME SEARCH (TF-IDF descriptions + title keywords)
+# ---------------------------------------------------------
+# /search ranks games for a free-text query with the TF-IDF model the
+# snapshot already holds (matrices["tfidf"] / ["tfidf_matrix"]):
+#   - the query is transformed with the fitted vectorizer and scored against
+#     a term -> rows copy of the TF-IDF matrix, so one sparse product only
+#     walks the posting lists of the query's terms (cosine similarity, both
+#     sides are L2-normalized),
+#   - every query word found in a title adds TITLE_WEIGHT / n_words, so
+#     "witcher" finds The Witcher even if its description never says so, and
+#     title hits rank above description-only hits. TITLE_STOP_WORDS ("the",
+#     "of", ...) are ignored; words of TITLE_PREFIX_MIN+ characters also match
+#     as token prefixes ("witch"), shorter ones only as whole tokens,
+#   - only rows passing `mask` (catalog filters) are ranked; the top k come
+#     from a partial partition, not a full sort.
+
+TITLE_WEIGHT = 1.0
+TITLE_PREFIX_MIN = 3
+# Articles / prepositions / conjunctions only: the vectorizer's English list also drops title
+# words such as "last", "first" or "fire"
+TITLE_STOP_WORDS = frozenset("a an and at by for from in into of on or the to vs with".split())
+
+
+class TextSearch:
+    def __init__(self, catalog, vectorizer=None, tfidf_matrix=None, title_weight=TITLE_WEIGHT):
+        self.n_rows = len(catalog["game_ids"])
+        self.vectorizer = vectorizer
+        # Transposed TF-IDF matrix: row t = posting list of term t (catalog rows + weights)
+        self.postings = sp.csr_matrix(tfidf_matrix).T.tocsr() if tfidf_matrix is not None else None
+        self.titles = KeywordIndex.from_catalog(catalog, field="titles", present="has_core")
+        self.title_weight = title_weight
+
+    def scores(self, query):
+        """Relevance of every catalog row for `query` (0 = no match)."""
+        scores = np.zeros(self.n_rows, dtype=np.float64)
+        words = tokenize(query)
+        if not words:
+            return scores
+        if self.vectorizer is not None and self.postings is not None:
+            q = self.vectorizer.transform([query])
+            if q.nnz:
+                text = (q @ self.postings).toarray().ravel()
+                scores[:len(text)] += text
+        words = [w for w in words if w not in TITLE_STOP_WORDS]
+        for word in words:
+            scores[self.titles.rows(word, prefix=len(word) >= TITLE_PREFIX_MIN)] += self.title_weight / len(words)
+        return scores
+
+    def search(self, query, k=20, mask=None):
+        """Top-k (rows, scores) for `query` among rows where `mask` is True, best first (ties by catalog order)."""
+        scores = self.scores(query)
+        hits = scores > 0
+        if mask is not None:
+            hits &= mask
+        candidates = np.flatnonzero(hits)
+        values = scores[candidates]
+        if len(candidates) > k:
+            top = np.argpartition(-values, k - 1)[:k]
+            candidates, values = candidates[top], values[top]
+        order = np.lexsort((candidates, -values))
+        return candidates[order], values[order]
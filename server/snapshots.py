@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+from artifacts import SOURCE_FILES
+from metrics import METRICS
+
+# ---------------------------------------------------------
+# CATALOG SNAPSHOTS (Background reload, atomic swap)
+# ---------------------------------------------------------
+# The web app serves from one fully-loaded RecommenderEngine at a time: its
+# tables, matrices and catalog index are never edited after it is published.
+# Each request grabs the current snapshot once and uses it throughout, so a
+# reload never blocks serving or shows a request half-old, half-new data:
+#   - a background thread polls the catalog CSVs (mtime + size) every
+#     SNAPSHOT_POLL_INTERVAL seconds and builds a new snapshot when they change,
+#   - reload() does the same on demand (admin endpoint),
+#   - derive() publishes an edited clone (runtime catalog edits, see updates.py).
+# The live rating aggregates (popularity, ALS model) and user profiles follow
+# every swap under `write_lock`, which the rating write path holds as well, so
+# no rating lands between the old snapshot and the new one.
+# Lock order: write_lock first, then any lock taken under it (the collab
+# trainer's, a model's). Nothing holding one of those may wait for write_lock;
+# BackgroundTrainer calls swap_collab() with its own lock released.
+
+
+class SnapshotManager:
+    def __init__(self, build, dataset_dir, initial=None, profiles=None, interval=5.0, on_swap=None):
+        """
+        build() returns a loaded RecommenderEngine without aggregates (load(aggregates=False));
+        `initial` is the fully-loaded first snapshot (default: build()).
+        """
+        self.build = build
+        self.dataset_dir = dataset_dir
+        self.profiles = profiles
+        self.interval = interval
+        self.on_swap = on_swap
+        self.write_lock = threading.RLock()  # rating writes vs. swaps
+        self._reload_lock = threading.Lock()  # one rebuild at a time
+        self._wake = threading.Event()
+        self._force = False
+        self._thread = None
+        self.signature = self._scan()
+        self.current = initial if initial is not None else build()
+        self.version = 1
+        self.loaded_at = time.time()
+
+    def _scan(self):
+        """(mtime, size) of every catalog CSV; a change means the snapshot is out of date."""
+        signature = []
+        for name in SOURCE_FILES:
+            try:
+                st = os.stat(os.path.join(self.dataset_dir, name))
+                signature.append((name, st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append((name, None, None))
+        return tuple(signature)
+
+    def mark_current(self):
+        """Records the CSVs as they are now (after the app itself wrote them) so the watcher skips them."""
+        self.signature = self._scan()
+
+    # --- Swapping ---
+    def swap(self, engine):
+        """Publishes `engine` as the current snapshot (carrying over aggregates and profiles)."""
+        with self.write_lock:
+            engine.adopt_aggregates(self.current)
+            if self.profiles is not None:
+                self.profiles.rebase(engine.catalog)
+            self.current = engine
+            self.version += 1
+            self.loaded_at = time.time()
+        if self.on_swap: self.on_swap(engine)
+        return engine
+
+    def swap_collab(self, model):
+        """Hands a retrained collaborative model to the current snapshot (aligned to its catalog). Returns the one installed."""
+        with self.write_lock:
+            model = model.reindexed(self.current.catalog["game_ids"])
+            self.current._collab = model
+        if self.on_swap: self.on_swap(self.current)
+        return model
+
+    def derive(self, edit):
+        """Publishes edit(clone of the current snapshot). Returns edit()'s result."""
+        with self._reload_lock:
+            engine = self.current.clone()
+            result = edit(engine)
+            self.swap(engine)
+            return result
+
+    def reload(self):
+        """Builds a fresh snapshot from the dataset files and swaps it in. Returns the new version."""
+        with self._reload_lock:
+            signature = self._scan()
+            with METRICS.stage("snapshot", "reload"):
+                engine = self.build()
+            self.swap(engine)
+            self.signature = signature
+            print(f"Reloaded catalog snapshot v{self.version}")
+            return self.version
+
+    # --- Watcher ---
+    def request_reload(self):
+        """Asks for a rebuild in the background (the watcher thread, or a one-off thread without one)."""
+        if self._thread is None:
+            threading.Thread(target=self._reload_safely, name="snapshot-reload-once", daemon=True).start()
+            return
+        self._force = True
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="snapshot-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def _reload_safely(self):
+        try:
+            self.reload()
+        except Exception as e:
+            # Keep serving the previous snapshot
+            print(f"Warning: Catalog reload failed: {e}")
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            force, self._force = self._force, False
+            if force or self._scan() != self.signature:
+                self._reload_safely()
+
+    def stats(self):
+        return {"version": self.version, "loaded_at": self.loaded_at, "watching": self._thread is not None}
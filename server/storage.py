@@ -0,0 +1,661 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import pandas as pd
+
+from interactions import INTERACTION_COLS, InteractionStore
+from journal import WriteJournal
+from metrics import METRICS
+
+# ---------------------------------------------------------
+# STORAGE BACKENDS (Interactions, Preferences, Library, Accounts)
+# ---------------------------------------------------------
+# Route handlers talk to a Storage object instead of reading and rewriting
+# whole CSV files. Two implementations:
+#   - CsvStorage:    the original dataset/*.csv files, kept in memory and
+#                    written back under a lock (no lost updates in-process).
+#                    Interactions are held integer-coded and grouped by user
+#                    (see interactions.py).
+#                    Rating and library writes go through a write-behind
+#                    journal (see journal.py) unless STORAGE_JOURNAL=0.
+#   - SqliteStorage: one SQLite file in WAL mode with (user_id, game_id)
+#                    keys, so writes are single-row upserts/deletes and
+#                    per-user reads are index lookups.
+# Pick one with STORAGE_BACKEND=csv|sqlite (and STORAGE_PATH for SQLite).
+
+PREFERENCE_COLS = ["user_id", "genres", "platforms", "modes"]
+LIBRARY_COLS = ["user_id", "game_id", "status", "date_added"]
+ACCOUNT_COLS = ["username", "password_hash"]
+
+# CSV backend: writes recorded in the journal instead of rewriting the CSV -> table they change
+JOURNALED_WRITES = {
+    "upsert_interaction": "interactions",
+    "delete_interaction": "interactions",
+    "replace_user_interactions": "interactions",
+    "upsert_library": "library",
+    "delete_library": "library",
+}
+JOURNAL_FILE = "user_writes.journal"
+
+
+def safe_read_csv(filepath, default_columns):
+    """
+    Reads a CSV safely. If file is missing OR EMPTY, returns an empty DataFrame with default_columns.
+    """
+    if not os.path.exists(filepath):
+        return pd.DataFrame(columns=default_columns)
+    
+    try:
+        # Check if file is empty (0 bytes)
+        if os.path.getsize(filepath) == 0:
+             return pd.DataFrame(columns=default_columns)
+             
+        return pd.read_csv(filepath)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=default_columns)
+    except Exception as e:
+        print(f"Warning: Could not read {filepath}: {e}")
+        return pd.DataFrame(columns=default_columns)
+
+
+def write_csv(frame, path):
+    """Writes a table next to its final path, then renames it into place (readers never see half a file)."""
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".csv", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    try:
+        frame.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    except Exception:
+        os.remove(tmp)
+        raise
+
+
+def _clean(value):
+    """NaN/empty -> None, everything else unchanged."""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value): return None
+    except (TypeError, ValueError):
+        pass
+    return None if isinstance(value, str) and value == "" else value
+
+
+class Storage(ABC):
+    """Interface shared by all backends. user_id is always compared as a string."""
+
+    # --- Interactions ---
+    @abstractmethod
+    def all_interactions(self): ...
+    def iter_interactions(self, chunk_rows=1000):
+        """All interactions as DataFrames of at most chunk_rows rows (for streaming exports)."""
+        df = self.all_interactions()
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+    @abstractmethod
+    def user_interactions(self, user_id): ...
+    @abstractmethod
+    def upsert_interaction(self, user_id, game_id, rating, implicit=False):
+        """Sets a rating. Returns the rows it replaced (empty DataFrame for a new rating)."""
+    @abstractmethod
+    def delete_interaction(self, user_id, game_id):
+        """Returns the deleted rows."""
+    @abstractmethod
+    def replace_user_interactions(self, user_id, rows):
+        """Drops all of a user's interactions and inserts `rows` (list of dicts). Returns the dropped rows."""
+
+    # --- Survey answers (user_preferences.csv) ---
+    @abstractmethod
+    def get_preferences(self, user_id):
+        """Returns {"genres", "platforms", "modes"} as raw ';'-joined strings (None when unset), or None."""
+    @abstractmethod
+    def set_preferences(self, user_id, genres, platforms, modes): ...
+    @abstractmethod
+    def all_preferences(self):
+        """Every user's survey answers as a DataFrame with PREFERENCE_COLS (raw strings)."""
+
+    # --- Feature profiles (users.csv) ---
+    @abstractmethod
+    def has_profile(self, user_id): ...
+    @abstractmethod
+    def delete_profile(self, user_id): ...
+
+    # --- Library ---
+    @abstractmethod
+    def user_library(self, user_id): ...
+    @abstractmethod
+    def upsert_library(self, user_id, game_id, status, date_added): ...
+    @abstractmethod
+    def delete_library(self, user_id, game_id): ...
+
+    # --- Accounts ---
+    @abstractmethod
+    def get_password_hash(self, username): ...
+    @abstractmethod
+    def add_account(self, username, password_hash):
+        """Returns False if the username is already taken."""
+
+    def delete_user(self, user_id):
+        """Reset: removes the feature profile and all interactions. Returns the dropped interactions."""
+        self.delete_profile(user_id)
+        return self.replace_user_interactions(user_id, [])
+
+
+# ---------------------------------------------------------
+# CSV BACKEND
+# ---------------------------------------------------------
+class CsvStorage(Storage):
+    def __init__(self, dataset_dir="dataset", journal=None):
+        """
+        `journal` turns on the write-behind journal: {"sync_interval", "compact_interval"}
+        (see journal_params()). Leftover journal entries are replayed either way.
+        """
+        self.dataset_dir = dataset_dir
+        self._lock = threading.RLock()
+        self.paths = {
+            "interactions": os.path.join(dataset_dir, "user_interactions.csv"),
+            "preferences": os.path.join(dataset_dir, "user_preferences.csv"),
+            "users": os.path.join(dataset_dir, "users.csv"),
+            "library": os.path.join(dataset_dir, "user_library.csv"),
+            "accounts": os.path.join(dataset_dir, "users_accounts.csv"),
+        }
+        self.interactions = InteractionStore.from_frame(safe_read_csv(self.paths["interactions"], INTERACTION_COLS))
+        self.tables = {
+            "preferences": safe_read_csv(self.paths["preferences"], PREFERENCE_COLS),
+            "users": safe_read_csv(self.paths["users"], ["user_id"]),
+            "library": safe_read_csv(self.paths["library"], LIBRARY_COLS),
+            "accounts": safe_read_csv(self.paths["accounts"], ACCOUNT_COLS),
+        }
+        self._dirty = set()  # tables changed since the last compaction
+        self._accounts = None  # username -> password hash (see _account_index)
+        journal_path = os.path.join(dataset_dir, JOURNAL_FILE)
+        self.journal = WriteJournal(journal_path, compact=self.compact, **journal) if journal is not None else None
+        self._recover(self.journal or WriteJournal(journal_path))
+        if self.journal is not None:
+            self.journal.start()
+
+    def _user_mask(self, df, user_id, col="user_id"):
+        return df[col].astype(str) == str(user_id)
+
+    def _save(self, name, df):
+        self.tables[name] = df
+        write_csv(df, self.paths[name])
+
+    def _frame(self, name):
+        """The table as it is written to its CSV (call with the lock held)."""
+        return self.interactions.to_frame() if name == "interactions" else self.tables[name]
+
+    # --- Journal ---
+    def _write(self, op, **args):
+        """Applies one journaled write in memory, then logs it (or rewrites its CSV without a journal)."""
+        table = JOURNALED_WRITES[op]
+        with self._lock:
+            result = getattr(self, "_" + op)(**args)
+            if self.journal is None:
+                write_csv(self._frame(table), self.paths[table])
+            else:
+                self.journal.append({"op": op, **args})
+                self._dirty.add(table)
+            return result
+
+    def _recover(self, journal):
+        """Replays entries a previous run logged but never compacted, then folds them into the CSVs."""
+        replayed = 0
+        with self._lock:
+            for entry in journal.entries():
+                op = entry.pop("op", None)
+                if op not in JOURNALED_WRITES:
+                    print(f"Warning: Skipping unknown journal entry: {op}")
+                    continue
+                getattr(self, "_" + op)(**entry)
+                self._dirty.add(JOURNALED_WRITES[op])
+                replayed += 1
+        if replayed:
+            print(f"Replayed {replayed} journaled writes")
+        if replayed or os.path.exists(journal.path) or os.path.exists(journal.rotated_path):
+            self.compact(journal)
+
+    def compact(self, journal=None):
+        """Writes every table changed since the last compaction to its CSV and empties the journal."""
+        journal = journal or self.journal
+        with self._lock:
+            # Everything logged so far is in these frames (writes replace them, never edit in place)
+            journal.rotate()
+            tables = {name: self._frame(name) for name in self._dirty}
+            self._dirty = set()
+        try:
+            with METRICS.stage("journal", "compact"):
+                for name, df in tables.items():
+                    write_csv(df, self.paths[name])
+        except Exception:
+            with self._lock:
+                self._dirty.update(tables)
+            raise
+        journal.discard_rotated()
+
+    # --- Interactions ---
+    def all_interactions(self):
+        with self._lock:
+            return self.interactions.to_frame()
+
+    def iter_interactions(self, chunk_rows=1000):
+        # The arrays are captured under the lock; chunks are then built one at a time from them
+        with self._lock:
+            return self.interactions.iter_frames(chunk_rows)
+
+    def user_interactions(self, user_id):
+        return self.interactions.user_frame(user_id)
+
+    def upsert_interaction(self, user_id, game_id, rating, implicit=False):
+        return self._write("upsert_interaction", user_id=user_id, game_id=game_id, rating=rating, implicit=implicit)
+
+    def delete_interaction(self, user_id, game_id):
+        return self._write("delete_interaction", user_id=user_id, game_id=game_id)
+
+    def replace_user_interactions(self, user_id, rows):
+        return self._write("replace_user_interactions", user_id=user_id, rows=list(rows))
+
+    def _upsert_interaction(self, user_id, game_id, rating, implicit=False):
+        return self.interactions.upsert(user_id, game_id, rating, implicit)
+
+    def _delete_interaction(self, user_id, game_id):
+        return self.interactions.delete(user_id, game_id)
+
+    def _replace_user_interactions(self, user_id, rows):
+        return self.interactions.replace_user(user_id, rows)
+
+    # --- Survey answers ---
+    def get_preferences(self, user_id):
+        df = self.tables["preferences"]
+        user_pref = df[self._user_mask(df, user_id)]
+        if user_pref.empty:
+            return None
+        row = user_pref.iloc[0]
+        return {col: _clean(row.get(col)) for col in ["genres", "platforms", "modes"]}
+
+    def set_preferences(self, user_id, genres, platforms, modes):
+        with self._lock:
+            df = self.tables["preferences"]
+            df = df[~self._user_mask(df, user_id)]
+            new_pref = {"user_id": user_id, "genres": genres, "platforms": platforms, "modes": modes}
+            self._save("preferences", pd.concat([df, pd.DataFrame([new_pref])], ignore_index=True))
+
+    def all_preferences(self):
+        return self.tables["preferences"]
+
+    # --- Feature profiles ---
+    def has_profile(self, user_id):
+        df = self.tables["users"]
+        return bool(not df.empty and self._user_mask(df, user_id).any())
+
+    def delete_profile(self, user_id):
+        if not os.path.exists(self.paths["users"]):
+            return
+        with self._lock:
+            df = self.tables["users"]
+            self._save("users", df[~self._user_mask(df, user_id)])
+
+    def delete_user(self, user_id):
+        self.delete_profile(user_id)
+        if not os.path.exists(self.paths["interactions"]):
+            return pd.DataFrame(columns=INTERACTION_COLS)
+        return self.replace_user_interactions(user_id, [])
+
+    # --- Library ---
+    def user_library(self, user_id):
+        df = self.tables["library"]
+        return df[self._user_mask(df, user_id)]
+
+    def upsert_library(self, user_id, game_id, status, date_added):
+        self._write("upsert_library", user_id=user_id, game_id=game_id, status=status, date_added=date_added)
+
+    def delete_library(self, user_id, game_id):
+        self._write("delete_library", user_id=user_id, game_id=game_id)
+
+    def _upsert_library(self, user_id, game_id, status, date_added):
+        df = self.tables["library"].copy()
+        mask = self._user_mask(df, user_id) & (df["game_id"] == game_id)
+        if mask.any():
+            df.loc[mask, "status"] = status
+            df.loc[mask, "date_added"] = date_added
+        else:
+            new_row = pd.DataFrame([{"user_id": user_id, "game_id": game_id, "status": status, "date_added": date_added}])
+            df = pd.concat([df, new_row], ignore_index=True)
+        self.tables["library"] = df
+
+    def _delete_library(self, user_id, game_id):
+        df = self.tables["library"]
+        mask = self._user_mask(df, user_id) & (df["game_id"] == game_id)
+        self.tables["library"] = df[~mask]
+
+    # --- Accounts ---
+    def _account_index(self):
+        """username -> password hash (first row wins, like the table scan did), built on first use."""
+        if self._accounts is None:
+            with self._lock:
+                if self._accounts is None:
+                    df = self.tables["accounts"]
+                    accounts = {}
+                    for username, pw_hash in zip(df["username"].astype(str), df["password_hash"]):
+                        accounts.setdefault(username, pw_hash)
+                    self._accounts = accounts
+        return self._accounts
+
+    def get_password_hash(self, username):
+        return self._account_index().get(str(username))
+
+    def add_account(self, username, password_hash):
+        accounts = self._account_index()
+        with self._lock:
+            if str(username) in accounts:
+                return False
+            df = self.tables["accounts"]
+            new_user = pd.DataFrame([{"username": username, "password_hash": password_hash}])
+            self._save("accounts", pd.concat([df, new_user], ignore_index=True))
+            accounts[str(username)] = password_hash
+            return True
+
+
+# ---------------------------------------------------------
+# SQLITE BACKEND
+# ---------------------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    user_id  TEXT    NOT NULL,
+    game_id  INTEGER NOT NULL,
+    rating   REAL,
+    playtime REAL,
+    implicit INTEGER,
+    PRIMARY KEY (user_id, game_id)
+);
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id   TEXT PRIMARY KEY,
+    genres    TEXT,
+    platforms TEXT,
+    modes     TEXT
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id  TEXT PRIMARY KEY,
+    features TEXT
+);
+CREATE TABLE IF NOT EXISTS library (
+    user_id    TEXT    NOT NULL,
+    game_id    INTEGER NOT NULL,
+    status     TEXT,
+    date_added TEXT,
+    PRIMARY KEY (user_id, game_id)
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    username      TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL
+);
+"""
+# The (user_id, game_id) primary keys double as the per-user index:
+# SQLite serves `WHERE user_id = ?` from the leading column of the key.
+
+
+def _implicit_to_db(value):
+    value = _clean(value)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return 1 if value.strip().lower() == "true" else 0
+    return 1 if bool(value) else 0
+
+
+class SqliteStorage(Storage):
+    def __init__(self, path="dataset/recommender.db"):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; writes open their own IMMEDIATE transaction below
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _frame(self, cursor, columns):
+        return self._frame_rows(cursor.fetchall(), columns)
+
+    def _frame_rows(self, rows, columns):
+        if "implicit" in columns:
+            # 0/1/NULL -> False/True/None (before pandas turns NULL into a float NaN)
+            i = columns.index("implicit")
+            rows = [r[:i] + (None if r[i] is None else bool(r[i]),) + r[i + 1:] for r in rows]
+        return pd.DataFrame(rows, columns=columns)
+
+    # --- Interactions ---
+    def all_interactions(self):
+        cur = self._conn().execute(f"SELECT {', '.join(INTERACTION_COLS)} FROM interactions ORDER BY rowid")
+        return self._frame(cur, INTERACTION_COLS)
+
+    def iter_interactions(self, chunk_rows=1000):
+        # Own connection: the generator may outlive the request thread that started it
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            cur = conn.execute(f"SELECT {', '.join(INTERACTION_COLS)} FROM interactions ORDER BY rowid")
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield self._frame_rows(rows, INTERACTION_COLS)
+        finally:
+            conn.close()
+
+    def user_interactions(self, user_id):
+        cur = self._conn().execute(
+            f"SELECT {', '.join(INTERACTION_COLS)} FROM interactions WHERE user_id = ? ORDER BY rowid", (str(user_id),)
+        )
+        return self._frame(cur, INTERACTION_COLS)
+
+    def upsert_interaction(self, user_id, game_id, rating, implicit=False):
+        with self._transaction() as conn:
+            cur = conn.execute(
+                f"SELECT {', '.join(INTERACTION_COLS)} FROM interactions WHERE user_id = ? AND game_id = ?",
+                (str(user_id), game_id),
+            )
+            replaced = self._frame(cur, INTERACTION_COLS)
+            conn.execute(
+                "INSERT INTO interactions (user_id, game_id, rating, implicit) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, game_id) DO UPDATE SET rating = excluded.rating, implicit = excluded.implicit",
+                (str(user_id), game_id, rating, _implicit_to_db(implicit)),
+            )
+            return replaced
+
+    def delete_interaction(self, user_id, game_id):
+        with self._transaction() as conn:
+            cur = conn.execute(
+                f"SELECT {', '.join(INTERACTION_COLS)} FROM interactions WHERE user_id = ? AND game_id = ?",
+                (str(user_id), game_id),
+            )
+            removed = self._frame(cur, INTERACTION_COLS)
+            conn.execute("DELETE FROM interactions WHERE user_id = ? AND game_id = ?", (str(user_id), game_id))
+            return removed
+
+    def replace_user_interactions(self, user_id, rows):
+        with self._transaction() as conn:
+            cur = conn.execute(
+                f"SELECT {', '.join(INTERACTION_COLS)} FROM interactions WHERE user_id = ?", (str(user_id),)
+            )
+            removed = self._frame(cur, INTERACTION_COLS)
+            conn.execute("DELETE FROM interactions WHERE user_id = ?", (str(user_id),))
+            conn.executemany(
+                "INSERT OR REPLACE INTO interactions (user_id, game_id, rating, playtime, implicit) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (str(user_id), int(r["game_id"]), r.get("rating"), _clean(r.get("playtime")), _implicit_to_db(r.get("implicit")))
+                    for r in rows
+                ],
+            )
+            return removed
+
+    # --- Survey answers ---
+    def get_preferences(self, user_id):
+        row = self._conn().execute(
+            "SELECT genres, platforms, modes FROM preferences WHERE user_id = ?", (str(user_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"genres": _clean(row[0]), "platforms": _clean(row[1]), "modes": _clean(row[2])}
+
+    def set_preferences(self, user_id, genres, platforms, modes):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO preferences (user_id, genres, platforms, modes) VALUES (?, ?, ?, ?)",
+                (str(user_id), _clean(genres), _clean(platforms), _clean(modes)),
+            )
+
+    def all_preferences(self):
+        cur = self._conn().execute(f"SELECT {', '.join(PREFERENCE_COLS)} FROM preferences ORDER BY rowid")
+        return self._frame(cur, PREFERENCE_COLS)
+
+    # --- Feature profiles ---
+    def has_profile(self, user_id):
+        row = self._conn().execute("SELECT 1 FROM users WHERE user_id = ?", (str(user_id),)).fetchone()
+        return row is not None
+
+    def delete_profile(self, user_id):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM users WHERE user_id = ?", (str(user_id),))
+
+    # --- Library ---
+    def user_library(self, user_id):
+        cur = self._conn().execute(
+            f"SELECT {', '.join(LIBRARY_COLS)} FROM library WHERE user_id = ? ORDER BY rowid", (str(user_id),)
+        )
+        return self._frame(cur, LIBRARY_COLS)
+
+    def upsert_library(self, user_id, game_id, status, date_added):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO library (user_id, game_id, status, date_added) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, game_id) DO UPDATE SET status = excluded.status, date_added = excluded.date_added",
+                (str(user_id), game_id, status, date_added),
+            )
+
+    def delete_library(self, user_id, game_id):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM library WHERE user_id = ? AND game_id = ?", (str(user_id), game_id))
+
+    # --- Accounts ---
+    def get_password_hash(self, username):
+        row = self._conn().execute(
+            "SELECT password_hash FROM accounts WHERE username = ?", (username,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def add_account(self, username, password_hash):
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO accounts (username, password_hash) VALUES (?, ?)", (username, password_hash)
+            )
+            return cur.rowcount == 1
+
+
+# ---------------------------------------------------------
+# FACTORY + ONE-SHOT CSV MIGRATION
+# ---------------------------------------------------------
+def journal_params():
+    """
+    CSV write journal settings from the environment (None when STORAGE_JOURNAL=0):
+    fsync batches every JOURNAL_SYNC_INTERVAL seconds (0: on every write), fold them
+    into the CSVs every JOURNAL_COMPACT_INTERVAL seconds.
+    """
+    if os.environ.get("STORAGE_JOURNAL", "1").lower() in ("0", "false", "off", "no"):
+        return None
+    return {
+        "sync_interval": float(os.environ.get("JOURNAL_SYNC_INTERVAL", 0.05)),
+        "compact_interval": float(os.environ.get("JOURNAL_COMPACT_INTERVAL", 30)),
+    }
+
+
+def open_storage(dataset_dir="dataset", backend=None, path=None):
+    backend = (backend or os.environ.get("STORAGE_BACKEND", "csv")).lower()
+    if backend == "sqlite":
+        return SqliteStorage(path or os.environ.get("STORAGE_PATH", os.path.join(dataset_dir, "recommender.db")))
+    if backend == "csv":
+        return CsvStorage(dataset_dir, journal=journal_params())
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def migrate_csv_to_sqlite(dataset_dir="dataset", db_path=None):
+    """Imports dataset/*.csv user tables into a SQLite store. Safe to re-run (rows are upserted)."""
+    db_path = db_path or os.path.join(dataset_dir, "recommender.db")
+    store = SqliteStorage(db_path)
+    src = CsvStorage(dataset_dir)
+    counts = {}
+
+    with store._transaction() as conn:
+        df = src.all_interactions()
+        conn.executemany(
+            "INSERT OR REPLACE INTO interactions (user_id, game_id, rating, playtime, implicit) VALUES (?, ?, ?, ?, ?)",
+            [
+                (str(r["user_id"]), int(r["game_id"]), _clean(r.get("rating")), _clean(r.get("playtime")), _implicit_to_db(r.get("implicit")))
+                for r in df.to_dict("records")
+            ],
+        )
+        counts["interactions"] = len(df)
+
+        df = src.tables["preferences"]
+        conn.executemany(
+            "INSERT OR REPLACE INTO preferences (user_id, genres, platforms, modes) VALUES (?, ?, ?, ?)",
+            [(str(r["user_id"]), _clean(r.get("genres")), _clean(r.get("platforms")), _clean(r.get("modes"))) for r in df.to_dict("records")],
+        )
+        counts["preferences"] = len(df)
+
+        df = src.tables["users"]
+        conn.executemany(
+            "INSERT OR REPLACE INTO users (user_id, features) VALUES (?, ?)",
+            [(str(r.pop("user_id")), json.dumps({k: _clean(v) for k, v in r.items()}, default=float)) for r in df.to_dict("records")],
+        )
+        counts["users"] = len(df)
+
+        df = src.tables["library"]
+        conn.executemany(
+            "INSERT OR REPLACE INTO library (user_id, game_id, status, date_added) VALUES (?, ?, ?, ?)",
+            [(str(r["user_id"]), int(r["game_id"]), _clean(r.get("status")), _clean(r.get("date_added"))) for r in df.to_dict("records")],
+        )
+        counts["library"] = len(df)
+
+        df = src.tables["accounts"]
+        conn.executemany(
+            "INSERT OR REPLACE INTO accounts (username, password_hash) VALUES (?, ?)",
+            [(str(r["username"]), str(r["password_hash"])) for r in df.to_dict("records")],
+        )
+        counts["accounts"] = len(df)
+
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import dataset/*.csv user tables into SQLite.")
+    parser.add_argument("--dataset", default="dataset", help="Directory holding the CSV files")
+    parser.add_argument("--db", default=None, help="SQLite file to create/update (default: <dataset>/recommender.db)")
+    args = parser.parse_args()
+
+    counts = migrate_csv_to_sqlite(args.dataset, args.db)
+    for table, n in counts.items():
+        print(f"{table:<13} {n} rows")
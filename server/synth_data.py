@@ -0,0 +1,173 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# SYNTHETIC DATASETS (Same CSV schemas as dataset/, any size)
+# ---------------------------------------------------------
+# Writes games / game_features / game_text / game_metadata / user_interactions
+# / user_preferences / users / user_library / users_accounts CSVs with the
+# columns load_data() and the storage backends expect. Everything is drawn
+# from one seeded generator, so a (size, seed) pair always gives the same files.
+#
+# Games belong to a latent genre, which drives their feature values, the
+# words in their description and which users rate them highly, so the
+# content / text / collaborative signals all have real structure to find.
+#
+#   python synth_data.py --out /tmp/synth --games 100000 --interactions 1000000
+
+FEATURE_COLS = ["singleplayer", "multiplayer", "story", "competitive", "rpg", "shooter", "open_world", "casual", "survival"]
+
+# Latent genre -> (feature means, description words, survey genre)
+GENRES = {
+    "rpg":      ([4, 1, 5, 1, 5, 0, 4, 1, 1], ["quest", "dragon", "magic", "party", "loot", "kingdom", "rpg"], "RPG"),
+    "shooter":  ([2, 5, 1, 5, 0, 5, 1, 1, 1], ["gun", "squad", "arena", "tactical", "sniper", "shooter", "battle"], "Shooter"),
+    "survival": ([4, 3, 2, 1, 1, 2, 4, 1, 5], ["craft", "zombie", "island", "hunger", "shelter", "survive", "horror"], "Survival"),
+    "casual":   ([4, 2, 1, 1, 0, 0, 1, 5, 0], ["puzzle", "cozy", "farm", "match", "relax", "colorful", "simulation"], "Puzzle"),
+    "sports":   ([2, 5, 0, 5, 0, 0, 0, 3, 0], ["league", "race", "football", "career", "championship", "racing", "sports"], "Sports"),
+    "open":     ([5, 2, 4, 1, 2, 2, 5, 1, 2], ["explore", "open", "world", "city", "adventure", "freedom", "map"], "Adventure"),
+}
+COMMON_WORDS = ["game", "play", "new", "story", "world", "mode", "players", "online", "campaign", "friends",
+                "challenging", "beautiful", "classic", "indie", "epic", "action", "strategy", "stealth", "fantasy"]
+PLATFORMS = ["PC", "Console", "Mobile", "PC;Console", "PC;Console;Mobile", "Console;Mobile", "PC;Mobile"]
+PUBLISHERS = [f"Publisher {i}" for i in range(200)]
+LIBRARY_STATUSES = ["Playing", "Completed", "Dropped", "Plan to Play"]
+
+PRESETS = {
+    "small":  {"games": 10_000, "users": 20_000, "interactions": 1_000_000},
+    "medium": {"games": 100_000, "users": 200_000, "interactions": 10_000_000},
+    "large":  {"games": 1_000_000, "users": 500_000, "interactions": 10_000_000},
+}
+
+
+def _write(frame, path, append=False):
+    frame.to_csv(path, index=False, mode="a" if append else "w", header=not append)
+
+
+def generate(out_dir, n_games=1000, n_users=2000, n_interactions=50_000, seed=0,
+             preference_share=0.5, library_per_user=2, n_accounts=100, chunk_size=1_000_000):
+    """Writes a synthetic dataset to out_dir. Returns the row count of every file written."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    path = lambda name: os.path.join(out_dir, name)
+    genre_names = list(GENRES)
+    counts = {}
+
+    # 1. Games: latent genre + features around the genre's means
+    game_ids = np.arange(1, n_games + 1)
+    game_genre = rng.integers(0, len(genre_names), n_games)
+    means = np.array([GENRES[g][0] for g in genre_names], dtype=np.float64)
+    features = np.clip(np.rint(means[game_genre] + rng.normal(0, 1.0, (n_games, len(FEATURE_COLS)))), 0, 5).astype(int)
+
+    _write(pd.DataFrame({"game_id": game_ids, "title": [f"Game {gid}" for gid in game_ids]}), path("games.csv"))
+    _write(pd.DataFrame(features, columns=FEATURE_COLS).assign(game_id=game_ids)[["game_id"] + FEATURE_COLS], path("game_features.csv"))
+
+    # 2. Descriptions: mostly genre words, some shared filler
+    genre_words = np.array([GENRES[g][1] for g in genre_names])
+    words = np.concatenate([
+        genre_words[game_genre[:, None], rng.integers(0, genre_words.shape[1], (n_games, 5))],
+        np.array(COMMON_WORDS)[rng.integers(0, len(COMMON_WORDS), (n_games, 7))],
+    ], axis=1)
+    words = np.take_along_axis(words, rng.random(words.shape).argsort(axis=1), axis=1)
+    descriptions = ["A " + " ".join(row) + "." for row in words.tolist()]
+    _write(pd.DataFrame({"game_id": game_ids, "description": descriptions}), path("game_text.csv"))
+
+    days = rng.integers(0, 365 * 20, n_games)
+    _write(pd.DataFrame({
+        "game_id": game_ids,
+        "release_date": (np.datetime64("2005-01-01") + days.astype("timedelta64[D]")).astype(str),
+        "platform": np.array(PLATFORMS)[rng.integers(0, len(PLATFORMS), n_games)],
+        "publisher": np.array(PUBLISHERS)[rng.integers(0, len(PUBLISHERS), n_games)],
+        "developer": np.array(PUBLISHERS)[rng.integers(0, len(PUBLISHERS), n_games)],
+        "image_url": [f"https://placehold.co/400x225?text={gid}" for gid in game_ids],
+    }), path("game_metadata.csv"))
+    counts.update({"games": n_games, "game_features": n_games, "game_text": n_games, "game_metadata": n_games})
+
+    # 3. Interactions: each user favours one genre; item popularity is Zipf-like
+    user_genre = rng.integers(0, len(genre_names), n_users)
+    popularity = 1.0 / np.arange(1, n_games + 1) ** 0.8
+    popularity = popularity[rng.permutation(n_games)]
+    by_genre = [np.flatnonzero(game_genre == g) for g in range(len(genre_names))]
+    genre_weights = [popularity[rows] / popularity[rows].sum() if len(rows) else None for rows in by_genre]
+    all_weights = popularity / popularity.sum()
+
+    written = 0
+    for start in range(0, n_interactions, chunk_size):
+        size = min(chunk_size, n_interactions - start)
+        users = rng.integers(0, n_users, size)
+        in_genre = rng.random(size) < 0.7
+        games = rng.choice(n_games, size, p=all_weights)
+        for g in range(len(genre_names)):
+            pick = in_genre & (user_genre[users] == g)
+            if pick.any() and genre_weights[g] is not None:
+                games[pick] = rng.choice(by_genre[g], int(pick.sum()), p=genre_weights[g])
+
+        match = game_genre[games] == user_genre[users]
+        ratings = np.clip(np.rint(np.where(match, 4.2, 2.6) + rng.normal(0, 1.0, size)), 1, 5)
+        chunk = pd.DataFrame({
+            "user_id": users + 1,
+            "game_id": games + 1,
+            "rating": ratings.astype(float),
+            "playtime": np.round(rng.exponential(30, size), 1),
+            "implicit": np.where(rng.random(size) < 0.05, "True", ""),
+        }).drop_duplicates(subset=["user_id", "game_id"])
+        _write(chunk, path("user_interactions.csv"), append=start > 0)
+        written += len(chunk)
+    if n_interactions == 0:
+        _write(pd.DataFrame(columns=["user_id", "game_id", "rating", "playtime", "implicit"]), path("user_interactions.csv"))
+    # Pairs can repeat across chunks (as they can in the real file); counted as written
+    counts["user_interactions"] = written
+
+    # 4. Survey answers + feature profiles for a share of the users
+    surveyed = np.flatnonzero(rng.random(n_users) < preference_share)
+    _write(pd.DataFrame({
+        "user_id": surveyed + 1,
+        "genres": [GENRES[genre_names[user_genre[u]]][2] for u in surveyed],
+        "platforms": np.array(PLATFORMS)[rng.integers(0, len(PLATFORMS), len(surveyed))],
+        "modes": np.array(["Singleplayer", "Multiplayer", "Singleplayer;Multiplayer"])[rng.integers(0, 3, len(surveyed))],
+    }), path("user_preferences.csv"))
+    _write(pd.DataFrame(means[user_genre[surveyed]].round().astype(int), columns=FEATURE_COLS)
+           .assign(user_id=surveyed + 1)[["user_id"] + FEATURE_COLS], path("users.csv"))
+    counts.update({"user_preferences": len(surveyed), "users": len(surveyed)})
+
+    # 5. Library entries
+    n_library = n_users * library_per_user
+    library = pd.DataFrame({
+        "user_id": rng.integers(1, n_users + 1, n_library),
+        "game_id": rng.integers(1, n_games + 1, n_library),
+        "status": np.array(LIBRARY_STATUSES)[rng.integers(0, len(LIBRARY_STATUSES), n_library)],
+        "date_added": "2024-01-01",
+    }).drop_duplicates(subset=["user_id", "game_id"])
+    _write(library, path("user_library.csv"))
+    counts["user_library"] = len(library)
+
+    # 6. Accounts: user<N> / "password" (one hash, cheap cost factor, reused for every account)
+    import bcrypt
+    pw_hash = bcrypt.hashpw(b"password", bcrypt.gensalt(rounds=4)).decode("utf-8")
+    _write(pd.DataFrame({"username": [f"user{i}" for i in range(1, n_accounts + 1)], "password_hash": pw_hash}),
+           path("users_accounts.csv"))
+    counts["users_accounts"] = n_accounts
+
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic dataset with the same CSV schemas as dataset/.")
+    parser.add_argument("--out", required=True, help="Directory to write the CSV files to")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default=None, help="Size preset (overridden by explicit sizes)")
+    parser.add_argument("--games", type=int, default=None)
+    parser.add_argument("--users", type=int, default=None)
+    parser.add_argument("--interactions", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = {"games": 1000, "users": 2000, "interactions": 50_000, **PRESETS.get(args.preset, {})}
+    for key in sizes:
+        if getattr(args, key) is not None: sizes[key] = getattr(args, key)
+
+    counts = generate(args.out, sizes["games"], sizes["users"], sizes["interactions"], seed=args.seed)
+    for name, n in counts.items():
+        print(f"{name:<18} {n} rows")
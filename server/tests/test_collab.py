@@ -0,0 +1,105 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from collab import BackgroundTrainer, RatingAggregate
+from snapshots import SnapshotManager
+
+
+class FakeModel:
+    def __init__(self):
+        self.applied = []
+
+    def apply(self, removed=None, added=None):
+        self.applied.append(added)
+
+
+def test_writes_during_training_are_replayed_before_the_swap():
+    published = []
+    trainer = BackgroundTrainer(None, published.append, interval=0)
+
+    def train():
+        trainer.record(added="during training")
+        return FakeModel()
+
+    trainer.train = train
+    model = trainer.run_once()
+    assert published == [model]
+    assert model.applied == ["during training"]
+
+    trainer.record(added="after")  # not training: the write path applies it to the live model itself
+    assert model.applied == ["during training"] and not trainer.training
+
+
+def test_record_during_swap_does_not_deadlock():
+    # The write path calls record() while holding the snapshot write lock; the swap takes that lock too
+    write_lock = threading.Lock()
+    swapping = threading.Event()
+    live = FakeModel()
+
+    def on_swap(model):
+        swapping.set()
+        with write_lock:
+            return live  # e.g. a copy reindexed to the current catalog
+
+    trainer = BackgroundTrainer(FakeModel, on_swap, interval=0)
+    retrain = threading.Thread(target=trainer.run_once, daemon=True)
+    with write_lock:
+        retrain.start()
+        assert swapping.wait(5)
+        writer = threading.Thread(target=trainer.record, kwargs={"added": "racing the swap"}, daemon=True)
+        writer.start()
+        writer.join(5)
+        assert not writer.is_alive(), "record() blocked behind the swap"
+    retrain.join(5)
+    assert not retrain.is_alive(), "swap blocked behind record()"
+
+    # Landed before the new model was installed, so it is replayed onto the published one
+    assert live.applied == ["racing the swap"]
+    assert not trainer.training and trainer.pending == []
+
+
+class FakeEngine:
+    def __init__(self):
+        self.catalog = {"game_ids": [1, 2, 3]}
+        self._collab = None
+
+
+class ReindexedModel(FakeModel):
+    def reindexed(self, game_ids):
+        return ReindexedModel()  # a copy aligned to the catalog, as ALSModel.reindexed may return
+
+
+def test_write_path_racing_swap_collab(tmp_path):
+    snapshots = SnapshotManager(None, str(tmp_path), initial=FakeEngine(), interval=0)
+    trained = threading.Event()
+
+    def train():
+        trained.set()
+        return ReindexedModel()
+
+    trainer = BackgroundTrainer(train, snapshots.swap_collab, interval=0)
+    retrain = threading.Thread(target=trainer.run_once, daemon=True)
+    # Same order as app.apply_interaction_changes: write_lock, then record()
+    with snapshots.write_lock:
+        retrain.start()
+        assert trained.wait(5)
+        trainer.record(added="write")
+    retrain.join(5)
+    assert not retrain.is_alive()
+
+    installed = snapshots.current._collab
+    assert isinstance(installed, ReindexedModel) and installed.applied == ["write"]
+
+
+def test_rating_aggregate_from_chunks_matches_one_frame():
+    frame = pd.DataFrame({
+        "user_id": [1, 1, 2, 3, 3, 4],
+        "game_id": [10, 11, 10, 99, 12, None],  # 99 is outside the catalog
+        "rating": [4.0, 2.0, 5.0, 3.0, None, 1.0],
+    })
+    whole = RatingAggregate.from_interactions([10, 11, 12], frame)
+    chunked = RatingAggregate.from_interactions([10, 11, 12], (frame.iloc[i:i + 2] for i in range(0, len(frame), 2)))
+    assert np.array_equal(whole.sums, chunked.sums) and np.array_equal(whole.counts, chunked.counts)
+    assert np.array_equal(whole.means, chunked.means) and whole._extra == chunked._extra == {99: (3.0, 1)}
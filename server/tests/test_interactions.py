@@ -0,0 +1,131 @@
+import math
+import random
+
+import pandas as pd
+import pytest
+
+from interactions import INTERACTION_COLS, InteractionStore
+
+BASE = pd.DataFrame([
+    {"user_id": 1, "game_id": 10, "rating": 4.0, "playtime": 12.0, "implicit": False},
+    {"user_id": 1, "game_id": 11, "rating": 5.0, "playtime": None, "implicit": True},
+    {"user_id": 2, "game_id": 10, "rating": 3.0, "playtime": 1.5, "implicit": None},
+    {"user_id": 2, "game_id": 10, "rating": 2.0, "playtime": 0.0, "implicit": False},  # duplicate row
+    {"user_id": 3, "game_id": 12, "rating": None, "playtime": 7.0, "implicit": None},
+], columns=INTERACTION_COLS)
+
+
+def value(v):
+    return None if v is None or (isinstance(v, float) and math.isnan(v)) else v
+
+
+def rows(frame):
+    """(user, game, rating, playtime, implicit) tuples in frame order, NaN as None."""
+    return [
+        (str(u), int(g), value(r), value(p), value(i))
+        for u, g, r, p, i in zip(*(frame[c].tolist() for c in INTERACTION_COLS))
+    ]
+
+
+class Reference:
+    """The store's write semantics over plain lists: str(user_id) -> [game, rating, playtime, implicit] rows."""
+
+    def __init__(self, frame):
+        self.users = {}
+        for user, *row in rows(frame):
+            self.users.setdefault(user, []).append(list(row))
+
+    def upsert(self, user_id, game_id, rating, implicit):
+        user = self.users.setdefault(str(user_id), [])
+        hits = [row for row in user if row[0] == game_id]
+        for row in hits:
+            row[1], row[3] = rating, implicit
+        if not hits:
+            user.append([game_id, rating, None, implicit])
+
+    def delete(self, user_id, game_id):
+        if str(user_id) in self.users:
+            self.users[str(user_id)] = [row for row in self.users[str(user_id)] if row[0] != game_id]
+
+    def replace_user(self, user_id, new_rows):
+        if new_rows or str(user_id) in self.users:
+            self.users[str(user_id)] = [[r["game_id"], r["rating"], None, r["implicit"]] for r in new_rows]
+
+    def rows(self, user=None):
+        users = [user] if user is not None else list(self.users)
+        return [(u, *row) for u in users for row in self.users.get(u, [])]
+
+
+def random_writes(store, reference, rng, n):
+    for _ in range(n):
+        user_id, game_id = rng.randint(1, 12), rng.randint(10, 25)
+        op = rng.random()
+        if op < 0.6:
+            rating, implicit = float(rng.randint(1, 5)), rng.choice([True, False])
+            store.upsert(user_id, game_id, rating, implicit)
+            reference.upsert(user_id, game_id, rating, implicit)
+        elif op < 0.85:
+            store.delete(user_id, game_id)
+            reference.delete(user_id, game_id)
+        else:
+            new_rows = [{"user_id": user_id, "game_id": g, "rating": 5.0, "implicit": True}
+                        for g in rng.sample(range(10, 25), rng.randint(0, 3))]
+            store.replace_user(user_id, new_rows)
+            reference.replace_user(user_id, new_rows)
+        if rng.random() < 0.1:
+            store.merge()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_writes_match_reference_across_merges(seed):
+    rng = random.Random(seed)
+    store, reference = InteractionStore.from_frame(BASE), Reference(BASE)
+    random_writes(store, reference, rng, 300)
+    store.upsert(99, 10, 1.0)
+    reference.upsert(99, 10, 1.0, False)
+
+    for user in reference.users:
+        assert rows(store.user_frame(user)) == reference.rows(user)
+    # Overrides still pending: iter_frames reads through them, to_frame merges them
+    assert store.overrides
+    chunked = pd.concat(list(store.iter_frames(chunk_rows=4)), ignore_index=True)
+    assert rows(chunked) == reference.rows()
+    assert rows(store.to_frame()) == reference.rows()
+    assert not store.overrides
+    assert len(store) == len(reference.rows())
+
+
+def test_iter_frames_ignores_later_writes():
+    store = InteractionStore.from_frame(BASE)
+    store.upsert(4, 13, 1.0)
+    frames = store.iter_frames(chunk_rows=2)
+    before = rows(store.to_frame())
+    store.upsert(4, 14, 2.0)
+    store.delete(1, 10)
+    store.merge()
+    assert rows(pd.concat(list(frames), ignore_index=True)) == before
+
+
+def test_blank_cells_round_trip(tmp_path):
+    path = tmp_path / "user_interactions.csv"
+    BASE.to_csv(path, index=False)
+    store = InteractionStore.from_frame(pd.read_csv(path))
+    store.upsert(1, 10, 5.0)  # rewrites user 1 through an override, then merges
+    store.merge()
+
+    store.to_frame().to_csv(path, index=False)
+    written = pd.read_csv(path, keep_default_na=False)
+    assert written["implicit"].tolist() == ["False", "True", "", "False", ""]
+    assert written["rating"].tolist()[-1] == ""
+    assert written["playtime"].tolist()[1] == ""
+
+
+def test_rows_without_a_game_id_are_dropped(capsys):
+    frame = pd.concat([BASE, pd.DataFrame([
+        {"user_id": 5, "game_id": None, "rating": 4.0},
+        {"user_id": 1, "game_id": "abc", "rating": 4.0},
+    ])], ignore_index=True)
+    store = InteractionStore.from_frame(frame)
+    assert "dropping 2 interaction rows" in capsys.readouterr().out
+    assert rows(store.to_frame()) == rows(BASE)
+    assert -1 not in store.game_codes
@@ -0,0 +1,160 @@
+import os
+
+import pandas as pd
+import pytest
+
+import storage
+from journal import WriteJournal
+from storage import JOURNAL_FILE, CsvStorage
+
+# No writer thread: every append is fsynced before it returns, nothing compacts on its own
+JOURNAL = {"sync_interval": 0, "compact_interval": 0}
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    pd.DataFrame([
+        {"user_id": 1, "game_id": 10, "rating": 4.0, "playtime": 12.0, "implicit": False},
+        {"user_id": 2, "game_id": 20, "rating": 3.0, "playtime": 0.0, "implicit": False},
+    ]).to_csv(tmp_path / "user_interactions.csv", index=False)
+    pd.DataFrame([
+        {"user_id": 1, "game_id": 10, "status": "Playing", "date_added": "2024-01-01"},
+    ]).to_csv(tmp_path / "user_library.csv", index=False)
+    return tmp_path
+
+
+def interactions_csv(path):
+    df = pd.read_csv(path / "user_interactions.csv")
+    return sorted(zip(df["user_id"], df["game_id"], df["rating"]))
+
+
+def library_csv(path):
+    df = pd.read_csv(path / "user_library.csv")
+    return sorted(zip(df["user_id"], df["game_id"], df["status"]))
+
+
+def journal_files(path):
+    return sorted(name for name in os.listdir(path) if name.startswith(JOURNAL_FILE))
+
+
+def write_some(store):
+    store.upsert_interaction(1, 10, 5.0)           # update
+    store.upsert_interaction(3, 30, 2.0)           # new user
+    store.delete_interaction(2, 20)
+    store.upsert_library(1, 11, "Completed", "2024-02-01")
+    store.delete_library(1, 10)
+
+
+def failing_write_csv(frame, path):
+    raise OSError("disk full")
+
+
+EXPECTED_INTERACTIONS = [(1, 10, 5.0), (3, 30, 2.0)]
+EXPECTED_LIBRARY = [(1, 11, "Completed")]
+
+
+def test_writes_stay_in_the_journal_until_compaction(dataset):
+    store = CsvStorage(str(dataset), journal=JOURNAL)
+    write_some(store)
+    assert interactions_csv(dataset) == [(1, 10, 4.0), (2, 20, 3.0)]
+    assert journal_files(dataset) == [JOURNAL_FILE]
+
+    store.compact()
+    assert interactions_csv(dataset) == EXPECTED_INTERACTIONS
+    assert library_csv(dataset) == EXPECTED_LIBRARY
+    assert journal_files(dataset) == []
+
+
+def test_crash_replays_journal_on_restart(dataset):
+    store = CsvStorage(str(dataset), journal=JOURNAL)
+    write_some(store)
+    del store  # crash: never compacted, never closed
+
+    restarted = CsvStorage(str(dataset))
+    assert interactions_csv(dataset) == EXPECTED_INTERACTIONS
+    assert library_csv(dataset) == EXPECTED_LIBRARY
+    assert journal_files(dataset) == []
+    assert sorted(restarted.all_interactions()["game_id"]) == [10, 30]
+
+
+def test_replay_is_idempotent(dataset):
+    store = CsvStorage(str(dataset), journal=JOURNAL)
+    write_some(store)
+    journal_path = dataset / JOURNAL_FILE
+    logged = journal_path.read_text()
+    store.compact()
+
+    # Crash after the CSVs were written but before the journal was dropped
+    journal_path.write_text(logged)
+    CsvStorage(str(dataset))
+    assert interactions_csv(dataset) == EXPECTED_INTERACTIONS
+    assert library_csv(dataset) == EXPECTED_LIBRARY
+
+
+def test_torn_last_line_is_skipped(dataset, capsys):
+    store = CsvStorage(str(dataset), journal=JOURNAL)
+    write_some(store)
+    with open(dataset / JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write('{"op": "upsert_interaction", "user_id": 9, "game_')  # crash mid-write
+
+    CsvStorage(str(dataset))
+    assert "unreadable journal entry" in capsys.readouterr().out
+    assert interactions_csv(dataset) == EXPECTED_INTERACTIONS
+    assert journal_files(dataset) == []
+
+
+def test_failed_compaction_keeps_rotated_log(dataset, monkeypatch):
+    store = CsvStorage(str(dataset), journal=JOURNAL)
+    write_some(store)
+
+    with monkeypatch.context() as m:
+        m.setattr(storage, "write_csv", failing_write_csv)
+        with pytest.raises(OSError):
+            store.compact()
+    assert journal_files(dataset) == [JOURNAL_FILE + ".compacting"]
+    assert interactions_csv(dataset) == [(1, 10, 4.0), (2, 20, 3.0)]
+
+    # Writes keep going to a fresh live log meanwhile
+    store.upsert_interaction(4, 40, 1.0)
+    assert journal_files(dataset) == [JOURNAL_FILE, JOURNAL_FILE + ".compacting"]
+
+    # Retry: the live log is appended to the rotated one and everything is folded in
+    store.compact()
+    assert interactions_csv(dataset) == EXPECTED_INTERACTIONS + [(4, 40, 1.0)]
+    assert library_csv(dataset) == EXPECTED_LIBRARY
+    assert journal_files(dataset) == []
+
+
+def test_crash_after_failed_compaction_replays_both_logs(dataset, monkeypatch):
+    store = CsvStorage(str(dataset), journal=JOURNAL)
+    write_some(store)
+    with monkeypatch.context() as m:
+        m.setattr(storage, "write_csv", failing_write_csv)
+        with pytest.raises(OSError):
+            store.compact()
+    store.upsert_interaction(3, 30, 4.0)  # overrides an entry in the rotated log
+    del store
+
+    CsvStorage(str(dataset))
+    assert interactions_csv(dataset) == [(1, 10, 5.0), (3, 30, 4.0)]
+    assert journal_files(dataset) == []
+
+
+def test_failed_sync_keeps_the_batch(tmp_path, monkeypatch):
+    journal = WriteJournal(str(tmp_path / "log"))
+    journal.append({"op": "a"})
+
+    def fail(fd):
+        raise OSError("io error")
+
+    with monkeypatch.context() as m:
+        m.setattr(os, "fsync", fail)
+        with pytest.raises(OSError):
+            journal.append({"op": "b"})
+    assert journal.stats()["pending"] == 1
+
+    journal.append({"op": "c"})
+    ops = [entry["op"] for entry in journal.entries()]
+    # "b" may be on disk twice (written before the failed fsync); replaying it again is harmless
+    assert ops[0] == "a" and ops[-2:] == ["b", "c"]
+    journal.close()
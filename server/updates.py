@@ -0,0 +1,220 @@
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from catalog import remove_catalog_game, upsert_catalog_game
+from metrics import METRICS
+from neighbours import patch_neighbours
+from storage import write_csv
+
+# ---------------------------------------------------------
+# CATALOG UPDATES (Hot add / update / remove games)
+# ---------------------------------------------------------
+# Adding a title used to mean editing four CSVs and restarting, which refits
+# TF-IDF and rebuilds every neighbour list. Here one game is patched into a
+# clone of the serving snapshot instead:
+#   - the four catalog tables (in memory + CSV) get the game's row,
+#   - the catalog index gets a new/updated row (see catalog.upsert_catalog_game),
+#   - the feature matrix gets the row appended/replaced, the description is
+#     transformed with the already-fitted TF-IDF vectorizer, and only that
+#     row's neighbours are computed (see neighbours.patch_neighbours),
+#   - popularity / ALS arrays and user profiles follow when the edited
+#     snapshot is swapped in (see snapshots.py).
+# Terms the fitted vectorizer has never seen are dropped by transform(); once
+# they add up to CATALOG_REFIT_DRIFT of the fitted TF-IDF entries, the whole
+# model is refit (a full snapshot reload).
+#
+# Removing a game leaves a tombstone row (no listing, no filters, zero
+# vectors) so row positions stay stable until the next refit.
+
+# Table name -> CSV file (the catalog tables load_data() reads)
+CATALOG_FILES = {
+    "games": "games.csv",
+    "features": "game_features.csv",
+    "text": "game_text.csv",
+    "metadata": "game_metadata.csv",
+}
+
+
+def _upsert_frame(frame, game_id, record):
+    """`frame` with the game's row replaced by `record` (or appended, keeping the file order)."""
+    mask = pd.to_numeric(frame["game_id"], errors="coerce") == game_id
+    row = pd.DataFrame([record], columns=frame.columns)
+    if not mask.any():
+        return pd.concat([frame, row], ignore_index=True) if len(frame) else row
+    frame = frame.copy()
+    first = np.flatnonzero(mask.to_numpy())[0]
+    frame.iloc[first] = row.iloc[0]
+    return frame[~mask | (np.arange(len(frame)) == first)].reset_index(drop=True)
+
+
+class CatalogUpdater:
+    """
+    Applies admin catalog edits as new snapshots (see snapshots.SnapshotManager.derive):
+    each edit patches a clone of the serving engine and publishes it in one swap.
+    """
+
+    def __init__(self, snapshots, drift_threshold=None):
+        self.snapshots = snapshots
+        self.drift_threshold = (
+            float(os.environ.get("CATALOG_REFIT_DRIFT", 0.05)) if drift_threshold is None else drift_threshold
+        )
+        self._reset_drift()
+
+    # --- Vocabulary drift ---
+    def _reset_drift(self):
+        tfidf_matrix = self.snapshots.current.matrices.get("tfidf_matrix")
+        self.fitted_terms = int(tfidf_matrix.nnz) if tfidf_matrix is not None else 0
+        self.unseen_terms = 0
+
+    @property
+    def drift(self):
+        """Unseen terms added since the last fit, relative to the fitted TF-IDF entries."""
+        return self.unseen_terms / max(1, self.fitted_terms)
+
+    # --- Edits ---
+    def upsert(self, fields):
+        """
+        Adds or updates one game from a flat dict of catalog columns (any of games.csv,
+        game_features.csv, game_text.csv and game_metadata.csv). Columns left out keep their
+        current values. Returns {"game_id", "created", "refit", "drift"}; raises ValueError
+        for a bad request.
+        """
+        try:
+            game_id = int(fields["game_id"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("A numeric game_id is required")
+
+        created = self.snapshots.derive(lambda engine: self._upsert(engine, game_id, fields))
+        refit = False
+        if self.fitted_terms and self.drift > self.drift_threshold:
+            print(f"Catalog vocabulary drift {self.drift:.3f} > {self.drift_threshold}: refitting")
+            self.refit()
+            refit = True
+        return {"game_id": game_id, "created": created, "refit": refit, "drift": round(self.drift, 6)}
+
+    def remove(self, game_id):
+        """Removes one game from the catalog tables and every listing. Returns False for an unknown game."""
+        catalog = self.snapshots.current.catalog
+        row = catalog["pos"].get(int(game_id))
+        if row is None or not (catalog["has_core"][row] or catalog["has_features"][row]):
+            return False
+        self.snapshots.derive(lambda engine: self._remove(engine, int(game_id)))
+        return True
+
+    def refit(self):
+        """Full rebuild of the matrices and catalog from the (already updated) CSVs."""
+        with METRICS.stage("/admin/games", "refit"):
+            self.snapshots.reload()
+        self._reset_drift()
+
+    # --- Internals (run on the clone, before it is published) ---
+    def _upsert(self, engine, game_id, fields):
+        db, catalog = engine.db, engine.catalog
+        known = {"game_id"}.union(*(db[name].columns for name in CATALOG_FILES if name in db))
+        unknown = sorted(set(fields) - known)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        # 1. Catalog tables: merge the given fields into the game's current rows
+        tables, changed = {}, []
+        for name in CATALOG_FILES:
+            frame = db.get(name)
+            if frame is None: continue
+            columns = [c for c in frame.columns if c != "game_id"]
+            current = frame[pd.to_numeric(frame["game_id"], errors="coerce") == game_id]
+            given = {c: fields[c] for c in columns if c in fields}
+            if current.empty and name == "games" and not given.get("title"):
+                raise ValueError("A title is required for a new game")
+            if current.empty and not given:
+                tables[name] = None
+                continue
+            default = 0 if name == "features" else None
+            record = {c: default for c in columns} if current.empty else current.iloc[0].to_dict()
+            record.update(given, game_id=game_id)
+            tables[name] = pd.DataFrame([record], columns=frame.columns)
+            if given or current.empty:
+                db[name] = _upsert_frame(frame, game_id, record)
+                changed.append(name)
+
+        # 2. Catalog index
+        created = game_id not in catalog["pos"]
+        row = upsert_catalog_game(catalog, tables)
+
+        # 3. Matrices (only this row)
+        if catalog["has_features"][row]:
+            description = catalog["descriptions"][row] or ""
+            with METRICS.stage("/admin/games", "matrices"):
+                self._patch_row(engine, row, catalog["features"][row], str(description))
+
+        # 4. CSVs
+        self._save(engine, changed)
+        return created
+
+    def _remove(self, engine, game_id):
+        db, catalog = engine.db, engine.catalog
+        row = remove_catalog_game(catalog, game_id)
+        if row < len(engine.matrices.get("feature_norm", [])):
+            with METRICS.stage("/admin/games", "matrices"):
+                self._patch_row(engine, row, np.zeros(len(catalog["feature_cols"])), "", count_drift=False)
+
+        changed = []
+        for name in CATALOG_FILES:
+            frame = db.get(name)
+            if frame is None: continue
+            mask = pd.to_numeric(frame["game_id"], errors="coerce") == game_id
+            if mask.any():
+                db[name] = frame[~mask].reset_index(drop=True)
+                changed.append(name)
+        self._save(engine, changed)
+
+    def _patch_row(self, engine, row, values, description, count_drift=True):
+        """Writes one feature-matrix row (append when row == N) and replaces everything derived from it."""
+        matrices = engine.matrices
+        if "feature_matrix" not in matrices:
+            return
+        k = engine.params["neighbours_k"]
+        values = np.asarray(values, dtype=np.float64)
+        norm = np.linalg.norm(values)
+        normed = values / norm if norm > 0 else np.zeros_like(values)
+
+        feat_mat = matrices["feature_matrix"]
+        game_id = int(engine.catalog["game_ids"][row])
+        if row == len(feat_mat):
+            new_row = pd.DataFrame([values], columns=feat_mat.columns, index=pd.Index([game_id], name=feat_mat.index.name))
+            feat_mat = pd.concat([feat_mat, new_row])
+            feature_norm = np.vstack([matrices["feature_norm"], normed[None, :]])
+        else:
+            feat_mat = feat_mat.copy()
+            feat_mat.iloc[row] = values
+            feature_norm = np.array(matrices["feature_norm"])
+            feature_norm[row] = normed
+        matrices["feature_matrix"] = feat_mat
+        matrices["feature_norm"] = feature_norm
+        if "content_nbrs" in matrices:
+            matrices["content_nbrs"] = patch_neighbours(matrices["content_nbrs"], feature_norm, row, k)
+
+        if "tfidf" in matrices:
+            vectorizer = matrices["tfidf"]
+            vector = vectorizer.transform([description])
+            tfidf_matrix = sp.csr_matrix(matrices["tfidf_matrix"])
+            if row == tfidf_matrix.shape[0]:
+                tfidf_matrix = sp.vstack([tfidf_matrix, vector]).tocsr()
+            else:
+                tfidf_matrix = sp.vstack([tfidf_matrix[:row], vector, tfidf_matrix[row + 1:]]).tocsr()
+            matrices["tfidf_matrix"] = tfidf_matrix
+            matrices["text_nbrs"] = patch_neighbours(matrices["text_nbrs"], tfidf_matrix, row, k)
+            if count_drift:
+                terms = set(vectorizer.build_analyzer()(description))
+                self.unseen_terms += len(terms - vectorizer.vocabulary_.keys())
+
+        if "ann" in matrices:
+            matrices["ann"] = matrices["ann"].assign(row, normed)
+
+    def _save(self, engine, names):
+        for name in names:
+            write_csv(engine.db[name], os.path.join(engine.dataset_dir, CATALOG_FILES[name]))
+        # Our own writes are already in the published snapshot: the file watcher can skip them
+        self.snapshots.mark_current()